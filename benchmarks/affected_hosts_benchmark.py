@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Compares the time needed to determine the hosts affected by a change set
+    using the svn path index with the former approach, which compared every
+    changed path with every svn path of every host.
+
+    Usage: python benchmarks/affected_hosts_benchmark.py
+"""
+
+import sys
+
+from os.path import abspath, dirname, join
+from time import time
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from config_rpm_maker.segment import OVERLAY_ORDER
+from config_rpm_maker.svnpathindex import SvnPathIndex
+
+LOCATIONS = ['ber', 'ham', 'dev', 'tuv', 'dia']
+TYPES = ['web', 'app', 'sql', 'mem', 'log', 'bak']
+HOST_COUNTS = [100, 1000, 10000]
+CHANGED_PATH_COUNT = 50
+
+
+def create_hosts(count):
+    return ['%s%s%04d' % (LOCATIONS[number % len(LOCATIONS)], TYPES[number % len(TYPES)], number) for number in range(count)]
+
+
+def create_changed_paths(hosts):
+    """ Simulates a merge commit touching some hosts, some location types and a file below all. """
+
+    changed_paths = ['all/etc/motd', 'typ/web/etc/httpd.conf', 'loctyp/devapp/etc/app.properties']
+    step = max(1, len(hosts) // CHANGED_PATH_COUNT)
+    changed_paths += ['host/%s/etc/hosts' % host for host in hosts[::step]]
+    return changed_paths[:CHANGED_PATH_COUNT]
+
+
+def get_affected_hosts_by_comparing_every_path(changed_paths, hosts):
+    result = set()
+    for segment in OVERLAY_ORDER:
+        for changed_path in changed_paths:
+            for host in hosts:
+                for path in segment.get_svn_paths(host):
+                    if changed_path.startswith(path):
+                        result.add(host)
+                        break
+    return result
+
+
+def get_affected_hosts_using_index(changed_paths, hosts):
+    svn_path_index = SvnPathIndex(hosts)
+    result = set()
+    for changed_path in changed_paths:
+        result |= svn_path_index.get_affected_hosts(changed_path)
+    return result
+
+
+def measure(function, *arguments):
+    start_time = time()
+    result = function(*arguments)
+    return time() - start_time, result
+
+
+def main():
+    print '%8s %14s %14s %9s' % ('hosts', 'compare [s]', 'index [s]', 'speedup')
+
+    for host_count in HOST_COUNTS:
+        hosts = create_hosts(host_count)
+        changed_paths = create_changed_paths(hosts)
+
+        elapsed_comparing, expected_hosts = measure(get_affected_hosts_by_comparing_every_path, changed_paths, hosts)
+        elapsed_index, actual_hosts = measure(get_affected_hosts_using_index, changed_paths, hosts)
+
+        if expected_hosts != actual_hosts:
+            raise Exception('Index returned different hosts for %d hosts.' % host_count)
+
+        print '%8d %14.3f %14.3f %8.1fx' % (host_count, elapsed_comparing, elapsed_index, elapsed_comparing / elapsed_index)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Compares the throughput of building hosts in a pool of threads with
+    building them in a pool of processes. Building a host is simulated by
+    resolving its variables and filtering the files shared by all hosts,
+    which is the part of a build not waiting for subversion or rpmbuild.
+
+    Usage: python benchmarks/build_mode_benchmark.py
+"""
+
+import sys
+
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
+from os.path import abspath, dirname, join
+from time import time
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from config_rpm_maker.token.tokenreplacer import TokenReplacer
+
+HOST_COUNT = 400
+FILE_COUNT = 20
+FILE_SIZE = 10 * 1024
+DISTINCT_TOKEN_COUNT = 50
+WORKER_COUNTS = [1, 2, 4]
+HOSTS_PER_PROCESS = 50
+
+
+def create_token_values(host_number):
+    token_values = dict(('VARIABLE_%d' % number, 'value-%d-of-host-%d' % (number, host_number)) for number in range(DISTINCT_TOKEN_COUNT))
+    token_values['HOST'] = 'host-%d' % host_number
+    token_values['FQDN'] = '@@@HOST@@@.example.com'
+    return token_values
+
+
+def create_content(file_number):
+    """ Creates a property file like content where every fourth line references a token. """
+
+    lines = []
+    length = 0
+    number = 0
+    while length < FILE_SIZE:
+        if number % 4:
+            line = 'key.%d.%d = some literal value\n' % (file_number, number)
+        else:
+            line = 'key.%d.%d = @@@VARIABLE_%d@@@ on @@@FQDN@@@\n' % (file_number, number, number % DISTINCT_TOKEN_COUNT)
+        lines.append(line)
+        length += len(line)
+        number += 1
+    return ''.join(lines)
+
+
+CONTENTS = [create_content(file_number) for file_number in range(FILE_COUNT)]
+
+
+def build_host(host_number):
+    token_replacer = TokenReplacer(create_token_values(host_number))
+    return sum(len(token_replacer.filter(content, encoding='utf-8')) for content in CONTENTS)
+
+
+def measure(pool):
+    start_time = time()
+    try:
+        filtered_bytes = sum(pool.imap_unordered(build_host, range(HOST_COUNT)))
+    finally:
+        pool.terminate()
+        pool.join()
+    return time() - start_time, filtered_bytes
+
+
+def main():
+    print 'Building %d hosts with %d files of %d bytes each, %d cpu(s) available.' % (HOST_COUNT, FILE_COUNT, FILE_SIZE, cpu_count())
+    print '%8s %15s %17s %9s' % ('workers', 'threads [h/s]', 'processes [h/s]', 'speedup')
+
+    for worker_count in WORKER_COUNTS:
+        elapsed_threads, expected_bytes = measure(ThreadPool(worker_count))
+        elapsed_processes, actual_bytes = measure(Pool(worker_count, maxtasksperchild=HOSTS_PER_PROCESS))
+
+        if expected_bytes != actual_bytes:
+            raise Exception('Processes filtered %d bytes instead of %d bytes.' % (actual_bytes, expected_bytes))
+
+        print '%8d %15.1f %17.1f %8.1fx' % (worker_count, HOST_COUNT / elapsed_threads, HOST_COUNT / elapsed_processes, elapsed_threads / elapsed_processes)
+
+
+if __name__ == '__main__':
+    main()
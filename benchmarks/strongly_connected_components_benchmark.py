@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Compares the iterative find_strongly_connected_components with the former
+    recursive implementation, which checked whether a node is on the stack by
+    searching the list. The recursion limit is raised for the recursive
+    implementation and it runs in a thread with a big stack, otherwise it
+    would fail on long chains.
+
+    Usage: python benchmarks/strongly_connected_components_benchmark.py
+"""
+
+import random
+import sys
+import threading
+
+from os.path import abspath, dirname, join
+from time import time
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from config_rpm_maker.utilities.graph import find_strongly_connected_components
+
+NODE_COUNTS = [1000, 10000, 20000]
+
+
+def recursive_tarjan_scc(graph):
+    index_counter = [0]
+    stack = []
+    lowlinks = {}
+    index = {}
+    result = []
+
+    def strongconnect(node):
+        index[node] = index_counter[0]
+        lowlinks[node] = index_counter[0]
+        index_counter[0] += 1
+        stack.append(node)
+
+        try:
+            successors = graph[node]
+        except:
+            successors = []
+        for successor in successors:
+            if successor not in lowlinks:
+                strongconnect(successor)
+                lowlinks[node] = min(lowlinks[node], lowlinks[successor])
+            elif successor in stack:
+                lowlinks[node] = min(lowlinks[node], index[successor])
+
+        if lowlinks[node] == index[node]:
+            connected_component = []
+
+            while True:
+                successor = stack.pop()
+                connected_component.append(successor)
+                if successor == node:
+                    break
+            result.append(tuple(connected_component))
+
+    for node in graph:
+        if node not in lowlinks:
+            strongconnect(node)
+
+    return result
+
+
+def create_chain(node_count):
+    """ A variable referencing the next variable, like a long chain of VARIABLES. """
+
+    return dict(('VARIABLE_%d' % number, ['VARIABLE_%d' % (number + 1)]) for number in range(node_count))
+
+
+def create_random_graph(node_count):
+    """ Every variable references up to three variables with a higher number, so the graph has no cycles. """
+
+    generator = random.Random(42)
+    graph = {}
+    for number in range(node_count):
+        successors = range(number + 1, min(node_count, number + 50))
+        graph['VARIABLE_%d' % number] = ['VARIABLE_%d' % successor for successor in generator.sample(successors, min(3, len(successors)))]
+    return graph
+
+
+def create_ring(node_count):
+    """ Variables forming one big cycle with additional references back, the worst case for the on stack check. """
+
+    graph = {}
+    for number in range(node_count):
+        graph['VARIABLE_%d' % number] = ['VARIABLE_%d' % ((number + 1) % node_count), 'VARIABLE_%d' % max(0, number - 10)]
+    return graph
+
+
+def measure(function, *arguments):
+    start_time = time()
+    result = function(*arguments)
+    return time() - start_time, result
+
+
+def measure_in_thread_with_big_stack(function, *arguments):
+    measurement = []
+    threading.stack_size(512 * 1024 * 1024)
+    thread = threading.Thread(target=lambda: measurement.append(measure(function, *arguments)))
+    thread.start()
+    thread.join()
+    threading.stack_size(0)
+    return measurement[0]
+
+
+def main():
+    sys.setrecursionlimit(10 * max(NODE_COUNTS))
+
+    print '%8s %8s %16s %16s %9s' % ('graph', 'nodes', 'recursive [s]', 'iterative [s]', 'speedup')
+
+    for (name, create_graph) in [('chain', create_chain), ('random', create_random_graph), ('ring', create_ring)]:
+        for node_count in NODE_COUNTS:
+            graph = create_graph(node_count)
+
+            elapsed_recursive, expected_components = measure_in_thread_with_big_stack(recursive_tarjan_scc, graph)
+            elapsed_iterative, actual_components = measure(find_strongly_connected_components, graph)
+
+            if sorted(expected_components) != sorted(actual_components):
+                raise Exception('Iterative implementation returned different components for %s graph with %d nodes.' % (name, node_count))
+
+            print '%8s %8d %16.3f %16.3f %8.1fx' % (name, node_count, elapsed_recursive, elapsed_iterative, elapsed_recursive / elapsed_iterative)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Compares filtering a file shared by many hosts using the cached template
+    of the file with scanning every copy of the file for tokens again. Every
+    host has its own token values, the content of the file is the same.
+
+    Usage: python benchmarks/template_cache_benchmark.py
+"""
+
+import sys
+
+from os.path import abspath, dirname, join
+from time import time
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from config_rpm_maker.token.tokenreplacer import TokenReplacer
+
+FILE_SIZES = [1024, 10 * 1024, 100 * 1024]
+HOST_COUNTS = [100, 1000]
+DISTINCT_TOKEN_COUNT = 50
+
+
+def create_token_values(count, host_number):
+    return dict(('VARIABLE_%d' % number, 'value-%d-of-host-%d' % (number, host_number)) for number in range(count))
+
+
+def create_content(size, token_names):
+    """ Creates a property file like content where every fourth line references a token. """
+
+    lines = []
+    length = 0
+    number = 0
+    while length < size:
+        if number % 4:
+            line = 'key.%d = some literal value\n' % number
+        else:
+            line = 'key.%d = @@@%s@@@\n' % (number, token_names[number % len(token_names)])
+        lines.append(line)
+        length += len(line)
+        number += 1
+    return ''.join(lines)
+
+
+def filter_scanning_every_copy(token_replacer, content):
+    def replace_token(match):
+        return token_replacer.token_values[match.group(1)].encode('utf-8')
+
+    return TokenReplacer.TOKEN_PATTERN.sub(replace_token, content)
+
+
+def filter_using_template(token_replacer, content):
+    return token_replacer.filter(content, encoding='utf-8')
+
+
+def measure(function, token_replacers, content):
+    start_time = time()
+    results = [function(token_replacer, content) for token_replacer in token_replacers]
+    return time() - start_time, results
+
+
+def main():
+    print '%8s %8s %14s %15s %9s' % ('hosts', 'bytes', 'scanning [ms]', 'template [ms]', 'speedup')
+
+    for host_count in HOST_COUNTS:
+        token_replacers = [TokenReplacer(create_token_values(DISTINCT_TOKEN_COUNT, host_number)) for host_number in range(host_count)]
+
+        for file_size in FILE_SIZES:
+            content = create_content(file_size, sorted(token_replacers[0].token_values.keys()))
+
+            elapsed_scanning, expected_contents = measure(filter_scanning_every_copy, token_replacers, content)
+            elapsed_template, actual_contents = measure(filter_using_template, token_replacers, content)
+
+            if expected_contents != actual_contents:
+                raise Exception('Template returned different content for %d hosts and %d bytes.' % (host_count, file_size))
+
+            print '%8d %8d %14.2f %15.2f %8.1fx' % (host_count, file_size, elapsed_scanning * 1000, elapsed_template * 1000, elapsed_scanning / elapsed_template)
+
+
+if __name__ == '__main__':
+    main()
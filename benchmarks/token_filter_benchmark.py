@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Compares the single pass TokenReplacer.filter with the former approach,
+    which searched the next token, replaced all of its occurrences and started
+    searching from the beginning again. The files are token dense and grow up
+    to the default max_file_size of 100 KiB.
+
+    Usage: python benchmarks/token_filter_benchmark.py
+"""
+
+import sys
+
+from os.path import abspath, dirname, join
+from time import time
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from config_rpm_maker.token.tokenreplacer import MissingTokenException, TokenReplacer
+
+FILE_SIZES = [1024, 10 * 1024, 50 * 1024, 100 * 1024]
+DISTINCT_TOKEN_COUNTS = [10, 100, 500]
+REPETITIONS = 3
+
+
+def create_token_values(count):
+    return dict(('VARIABLE_%d' % number, 'value-%d' % number) for number in range(count))
+
+
+def create_content(size, token_names):
+    """ Creates a property file like content where every line references a token. """
+
+    lines = []
+    length = 0
+    number = 0
+    while length < size:
+        line = u'key.%d = @@@%s@@@\n' % (number, token_names[number % len(token_names)])
+        lines.append(line)
+        length += len(line)
+        number += 1
+    return u''.join(lines)[:size]
+
+
+def filter_searching_from_the_beginning(token_replacer, content):
+    while True:
+        match = TokenReplacer.TOKEN_PATTERN.search(content)
+        if not match:
+            return content
+        token_name = match.group(1)
+        if token_name not in token_replacer.token_values:
+            raise MissingTokenException(token_name)
+        replacement = token_replacer.replacer_function(token_name, token_replacer.token_values[token_name])
+        content = content.replace("@@@%s@@@" % token_name, replacement)
+        token_replacer.token_used.add(token_name)
+
+
+def measure(function, *arguments):
+    start_time = time()
+    for _ in range(REPETITIONS):
+        result = function(*arguments)
+    return (time() - start_time) / REPETITIONS, result
+
+
+def main():
+    print '%8s %8s %14s %14s %9s' % ('tokens', 'bytes', 'search [ms]', 'single [ms]', 'speedup')
+
+    for distinct_token_count in DISTINCT_TOKEN_COUNTS:
+        token_values = create_token_values(distinct_token_count)
+        token_replacer = TokenReplacer(token_values)
+
+        for file_size in FILE_SIZES:
+            content = create_content(file_size, sorted(token_values.keys()))
+            # the last line might have been cut in the middle of a token
+            content = content[:content.rfind(u'\n') + 1]
+
+            elapsed_searching, expected_content = measure(filter_searching_from_the_beginning, token_replacer, content)
+            elapsed_single_pass, actual_content = measure(token_replacer.filter, content)
+
+            if expected_content != actual_content:
+                raise Exception('Single pass filter returned different content for %d tokens and %d bytes.' % (distinct_token_count, file_size))
+
+            print '%8d %8d %14.2f %14.2f %8.1fx' % (distinct_token_count, file_size, elapsed_searching * 1000, elapsed_single_pass * 1000, elapsed_searching / elapsed_single_pass)
+
+
+if __name__ == '__main__':
+    main()
@@ -32,10 +32,15 @@ from config_rpm_maker.cli.parsearguments import (ARGUMENT_REPOSITORY,
                                                  apply_arguments_to_config,
                                                  determine_console_log_level,
                                                  parse_arguments)
-from config_rpm_maker.configuration import get_svn_path_to_config, ConfigurationException, load_configuration_file
+from config_rpm_maker.configuration import (get_segment_tree_cache_directory,
+                                            get_segment_tree_cache_max_size,
+                                            get_svn_path_to_config,
+                                            ConfigurationException,
+                                            load_configuration_file)
 from config_rpm_maker.configrpmmaker import ConfigRpmMaker
 from config_rpm_maker.cleaner import clean_up_deleted_hosts_data
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+from config_rpm_maker.segmenttreecache import SegmentTreeCache
 from config_rpm_maker.utilities.logutils import (append_console_logger,
                                                  create_sys_log_handler,
                                                  log_additional_information,
@@ -120,12 +125,24 @@ def initialize_logging_to_syslog(arguments, revision):
         LOGGER.info("Logging to syslog on level %s", getLevelName(sys_log_handler.level))
 
 
+def create_segment_tree_cache():
+    """ Returns a segment tree cache if a directory for it has been configured, otherwise None. """
+
+    segment_tree_cache_directory = get_segment_tree_cache_directory()
+
+    if not segment_tree_cache_directory:
+        return None
+
+    LOGGER.debug('Using segment tree cache in "%s".', segment_tree_cache_directory)
+    return SegmentTreeCache(segment_tree_cache_directory, get_segment_tree_cache_max_size())
+
+
 def building_configuration_rpms_and_clean_host_directories(repository, revision):
     """ This function will start the process of building configuration rpms
         for the given configuration repository and the revision. """
 
     path_to_config = get_svn_path_to_config()
-    svn_service = SvnService(base_url=repository, path_to_config=path_to_config)
+    svn_service = SvnService(base_url=repository, path_to_config=path_to_config, segment_tree_cache=create_segment_tree_cache())
     svn_service.log_change_set_meta_information(revision)
     ConfigRpmMaker(revision=revision, svn_service=svn_service).build()
     clean_up_deleted_hosts_data(svn_service, revision)
@@ -0,0 +1,109 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import traceback
+
+from logging import getLogger
+from multiprocessing.util import Finalize
+from os import getpid
+from os.path import join
+from shutil import rmtree
+
+from config_rpm_maker.configuration import set_configuration_snapshot
+from config_rpm_maker.configuration.properties import is_no_clean_up_enabled
+from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+from config_rpm_maker.exportcache import ExportCache
+from config_rpm_maker.grouprpmregistry import GROUP_RPM_REGISTRY_DIRECTORY_NAME, GroupRpmRegistry
+from config_rpm_maker.hostrpmbuilder import HostRpmBuilder
+from config_rpm_maker.overlayplanner import OverlayPlanner
+from config_rpm_maker.overlaystagecache import OverlayStageCache
+from config_rpm_maker.svnlogcache import SvnLogCache
+from config_rpm_maker.svnservice import SvnServicePool
+from config_rpm_maker.variablelayercache import VariableLayerCache
+
+LOGGER = getLogger(__name__)
+
+BUILD_PROCESSES_DIRECTORY_NAME = 'build-processes'
+
+# The context of the current build process, set by initialize_build_process.
+_build_process_context = None
+
+
+class BuildProcessContext(object):
+    """ The svn client and the caches used by one build process. The caches are shared
+        by the hosts built in the same process and are staged in a directory of the process,
+        since a recycled process is replaced by a new one with empty caches. The directory is
+        removed when the process exits. The group rpm registry is shared by all processes. """
+
+    def __init__(self, revision, work_dir, svn_service, error_logging_handler=None, config_tree=None):
+        self.name = 'Process-%d' % getpid()
+        self.revision = revision
+        self.work_dir = work_dir
+        self.error_logging_handler = error_logging_handler
+
+        process_directory = join(work_dir, BUILD_PROCESSES_DIRECTORY_NAME, str(getpid()))
+        self.svn_service_queue = SvnServicePool(svn_service.clone(), 1)
+        self.export_cache = ExportCache(join(process_directory, 'svn-exports'))
+        self.svn_log_cache = SvnLogCache()
+        self.variable_layer_cache = VariableLayerCache()
+        self.overlay_stage_cache = OverlayStageCache(join(process_directory, 'overlay-stages'))
+        self.overlay_planner = OverlayPlanner(revision, self.export_cache, config_tree=config_tree)
+        self.group_rpm_registry = GroupRpmRegistry(join(work_dir, GROUP_RPM_REGISTRY_DIRECTORY_NAME))
+
+        if not is_no_clean_up_enabled():
+            Finalize(self, rmtree, args=(process_directory,), kwargs={'ignore_errors': True}, exitpriority=0)
+
+    def build(self, hostname):
+        """ Builds the rpms of the given host and returns their paths. """
+
+        return HostRpmBuilder(thread_name=self.name,
+                              hostname=hostname,
+                              revision=self.revision,
+                              work_dir=self.work_dir,
+                              svn_service_queue=self.svn_service_queue,
+                              error_logging_handler=self.error_logging_handler,
+                              export_cache=self.export_cache,
+                              svn_log_cache=self.svn_log_cache,
+                              variable_layer_cache=self.variable_layer_cache,
+                              overlay_stage_cache=self.overlay_stage_cache,
+                              overlay_planner=self.overlay_planner,
+                              group_rpm_registry=self.group_rpm_registry).build()
+
+
+def initialize_build_process(configuration_snapshot, revision, work_dir, svn_service, error_logging_handler=None, config_tree=None):
+    """ Initializer of the build process pool: restores the configuration of the parent
+        process and creates the context used to build the hosts in this process. """
+
+    global _build_process_context
+
+    set_configuration_snapshot(configuration_snapshot)
+    _build_process_context = BuildProcessContext(revision, work_dir, svn_service, error_logging_handler, config_tree)
+    LOGGER.debug('%s: started.', _build_process_context.name)
+
+
+def build_host_in_process(hostname):
+    """ Builds the given host using the context of the current build process.
+        Returns the host name, the paths of the built rpms and the error
+        message or None, since exceptions are not sent back to the parent. """
+
+    try:
+        return hostname, _build_process_context.build(hostname), None
+
+    except BaseConfigRpmMakerException as e:
+        return hostname, [], str(e)
+
+    except Exception:
+        return hostname, [], traceback.format_exc()
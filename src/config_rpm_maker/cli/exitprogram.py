@@ -23,7 +23,7 @@ from time import time, strftime
 
 from config_rpm_maker.configuration import DATE_FORMAT
 from config_rpm_maker.cli.returncodes import RETURN_CODE_SUCCESS
-from config_rpm_maker.utilities.profiler import log_execution_time_summaries
+from config_rpm_maker.utilities.profiler import log_cache_summaries, log_execution_time_summaries
 
 LOGGER = getLogger(__name__)
 
@@ -55,6 +55,7 @@ def exit_program(message, return_code):
     timestamp_from_start = get_timestamp_from_start()
     if timestamp_from_start is not None:
         log_execution_time_summaries(LOGGER.debug)
+        log_cache_summaries(LOGGER.debug)
 
         elapsed_time_in_seconds = time() - timestamp_from_start
         elapsed_time_in_seconds = ceil(elapsed_time_in_seconds * 100) / 100
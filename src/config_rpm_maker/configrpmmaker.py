@@ -16,10 +16,10 @@
 
 import os
 import shutil
-import subprocess
 import tempfile
 import traceback
 from logging import ERROR, FileHandler, Formatter, getLogger
+from multiprocessing import Pool
 from os import makedirs, remove
 from os.path import exists, join
 from Queue import Queue
@@ -28,32 +28,60 @@ from threading import Thread
 from tempfile import mkdtemp
 
 import configuration
-from config_rpm_maker.configuration.properties import (get_error_log_url,
+from config_rpm_maker.configuration.properties import (get_build_process_count,
+                                                       get_error_log_url,
                                                        get_error_log_directory,
+                                                       get_hosts_per_build_process,
                                                        get_max_failed_hosts,
                                                        is_no_clean_up_enabled,
+                                                       is_pruning_of_shadowed_changes_enabled,
+                                                       is_pruning_of_unused_variable_changes_enabled,
+                                                       get_path_to_spec_file,
                                                        get_rpm_upload_command,
+                                                       get_rpm_upload_chunk_max_bytes,
                                                        get_rpm_upload_chunk_size,
+                                                       get_rpm_upload_parallel_uploads,
+                                                       get_rpm_upload_time_window,
+                                                       get_svn_client_pool_size,
                                                        get_thread_count,
                                                        get_temporary_directory,
+                                                       is_rpm_upload_while_building_enabled,
                                                        is_verbose_enabled)
-from config_rpm_maker.configuration import build_config_viewer_host_directory
+from config_rpm_maker.configuration import build_config_viewer_host_directory, get_configuration_snapshot
+from config_rpm_maker.buildprocess import BUILD_PROCESSES_DIRECTORY_NAME, build_host_in_process, initialize_build_process
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
-from config_rpm_maker.hostrpmbuilder import HostRpmBuilder
+from config_rpm_maker.exportcache import ExportCache
+from config_rpm_maker.grouprpmregistry import GROUP_RPM_REGISTRY_DIRECTORY_NAME, GroupRpmRegistry
+from config_rpm_maker.hostrpmbuilder import SVN_LOG_LIMIT, HostRpmBuilder
+from config_rpm_maker.overlayplanner import ConfigTree, OverlayPlanner, is_affected_by_change
+from config_rpm_maker.overlaystagecache import OverlayStageCache
+from config_rpm_maker.rpmuploader import CouldNotUploadRpmsException, ParallelRpmUploader, RpmUploader
+from config_rpm_maker.segment import OVERLAY_ORDER, Host
+from config_rpm_maker.svnlogcache import SvnLogCache
+from config_rpm_maker.svnpathindex import SvnPathIndex
+from config_rpm_maker.svnservice import SvnServicePool
+from config_rpm_maker.variableimpact import VariableImpactAnalyzer
+from config_rpm_maker.variablelayercache import VariableLayerCache
 from config_rpm_maker.utilities.logutils import log_elements_of_list
 from config_rpm_maker.utilities.profiler import measure_execution_time, log_directories_summary
-from config_rpm_maker.segment import OVERLAY_ORDER
 
 LOGGER = getLogger(__name__)
 
 
 class BuildHostThread(Thread):
 
-    def __init__(self, revision, host_queue, svn_service_queue, rpm_queue, notify_that_host_failed, work_dir, name=None, error_logging_handler=None):
+    def __init__(self, revision, host_queue, svn_service_queue, rpm_queue, notify_that_host_failed, work_dir, name=None, error_logging_handler=None, export_cache=None, svn_log_cache=None,
+                 variable_layer_cache=None, overlay_stage_cache=None, overlay_planner=None, group_rpm_registry=None):
         super(BuildHostThread, self).__init__(name=name)
         self.revision = revision
         self.host_queue = host_queue
         self.svn_service_queue = svn_service_queue
+        self.export_cache = export_cache
+        self.svn_log_cache = svn_log_cache
+        self.variable_layer_cache = variable_layer_cache
+        self.overlay_stage_cache = overlay_stage_cache
+        self.overlay_planner = overlay_planner
+        self.group_rpm_registry = group_rpm_registry
         self.rpm_queue = rpm_queue
         self.work_dir = work_dir
         self.notify_that_host_failed = notify_that_host_failed
@@ -70,7 +98,13 @@ class BuildHostThread(Thread):
                                       revision=self.revision,
                                       work_dir=self.work_dir,
                                       svn_service_queue=self.svn_service_queue,
-                                      error_logging_handler=self.error_logging_handler).build()
+                                      error_logging_handler=self.error_logging_handler,
+                                      export_cache=self.export_cache,
+                                      svn_log_cache=self.svn_log_cache,
+                                      variable_layer_cache=self.variable_layer_cache,
+                                      overlay_stage_cache=self.overlay_stage_cache,
+                                      overlay_planner=self.overlay_planner,
+                                      group_rpm_registry=self.group_rpm_registry).build()
                 for rpm in rpms:
                     self.rpm_queue.put(rpm)
 
@@ -91,10 +125,6 @@ class CouldNotBuildSomeRpmsException(BaseConfigRpmMakerException):
     error_info = "Could not build all rpms\n"
 
 
-class CouldNotUploadRpmsException(BaseConfigRpmMakerException):
-    error_info = "Could not upload rpms!\n"
-
-
 class ConfigurationException(BaseConfigRpmMakerException):
     error_info = "Configuration error, please fix it\n"
 
@@ -119,6 +149,8 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
         self._assure_temp_dir_if_set()
         self._create_logger()
         self.work_dir = None
+        self.export_cache = None
+        self.config_tree = None
         self.host_queue = Queue()
         self.failed_host_queue = Queue()
 
@@ -136,6 +168,10 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
         self.logger.info("Starting with revision %s", self.revision)
         try:
             changed_paths = self.svn_service.get_changed_paths(self.revision)
+            if not self._is_any_segment_affected(changed_paths):
+                LOGGER.info("No rpm(s) built. Change set does not touch any segment: %s", str(changed_paths))
+                return
+
             available_hosts = self.svn_service.get_hosts(self.revision)
 
             affected_hosts = list(self._get_affected_hosts(changed_paths, available_hosts))
@@ -143,11 +179,28 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
                 LOGGER.info("No rpm(s) built. No host affected by change set: %s", str(changed_paths))
                 return
 
+            if is_pruning_of_shadowed_changes_enabled():
+                affected_hosts = self._prune_hosts_with_shadowed_changes(changed_paths, affected_hosts)
+                if not affected_hosts:
+                    LOGGER.info("No rpm(s) built. All hosts override the changed files: %s", str(changed_paths))
+                    return
+
+            if is_pruning_of_unused_variable_changes_enabled():
+                self._prepare_work_dir()
+                affected_hosts = self._prune_hosts_not_using_changed_variables(changed_paths, affected_hosts)
+                if not affected_hosts:
+                    LOGGER.info("No rpm(s) built. No host references the changed variables: %s", str(changed_paths))
+                    self._clean_up_work_dir()
+                    return
+
             log_elements_of_list(LOGGER.debug, 'Detected %s affected host(s).', affected_hosts)
 
-            self._prepare_work_dir()
-            rpms = self._build_hosts(affected_hosts)
-            self._upload_rpms(rpms)
+            if not self.work_dir:
+                self._prepare_work_dir()
+            rpm_uploader = self._create_rpm_uploader()
+            rpms = self._build_hosts(affected_hosts, rpm_uploader)
+            if not rpm_uploader:
+                self._upload_rpms(rpms)
             self._move_configviewer_dirs_to_final_destination(affected_hosts)
 
         except BaseConfigRpmMakerException as exception:
@@ -229,19 +282,56 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
             LOGGER.error('Stopping to build more hosts since the maximum of %d failed hosts has been reached' % maximum_allowed_failed_hosts)
             self.host_queue.queue.clear()
 
-    def _build_hosts(self, hosts):
+    def _build_hosts(self, hosts, rpm_uploader=None):
+        """ Builds the rpms of the given hosts. If a rpm uploader is given it uploads
+            the rpms while building, otherwise the built rpms have to be uploaded afterwards. """
+
         if not hosts:
             LOGGER.warn('Trying to build rpms for hosts, but no hosts given!')
             return
 
+        rpm_queue = Queue()
+        if rpm_uploader:
+            rpm_uploader.start(rpm_queue)
+
+        if self._get_build_process_count():
+            self._build_hosts_in_processes(hosts, rpm_queue)
+        else:
+            self._build_hosts_in_threads(hosts, rpm_queue)
+
+        if rpm_uploader:
+            rpm_uploader.finish()
+            rpm_uploader.log_statistics(LOGGER.debug)
+
+        failed_hosts = dict(self._consume_queue(self.failed_host_queue))
+        if failed_hosts:
+            if rpm_uploader:
+                log_elements_of_list(LOGGER.error, 'Uploaded %s rpm(s) of successfully built hosts before the build failed.', rpm_uploader.uploaded_rpms)
+            failed_hosts_str = ['\n%s:\n\n%s\n\n' % (key, value) for (key, value) in failed_hosts.iteritems()]
+            raise CouldNotBuildSomeRpmsException("Could not build config rpm for some host(s): %s" % '\n'.join(failed_hosts_str))
+
+        if rpm_uploader and rpm_uploader.error:
+            raise rpm_uploader.error
+
+        LOGGER.info("Finished building configuration rpm(s).")
+        built_rpms = _remove_duplicates(rpm_uploader.rpms if rpm_uploader else self._consume_queue(rpm_queue))
+        log_elements_of_list(LOGGER.debug, 'Built %s rpm(s).', built_rpms)
+
+        return built_rpms
+
+    def _build_hosts_in_threads(self, hosts, rpm_queue):
         for host in hosts:
             self.host_queue.put(host)
 
-        rpm_queue = Queue()
-        svn_service_queue = Queue()
-        svn_service_queue.put(self.svn_service)
-
         thread_count = self._get_thread_count(hosts)
+        svn_service_queue = SvnServicePool(self.svn_service, self._get_svn_client_pool_size(thread_count))
+        svn_log_cache = SvnLogCache()
+        variable_layer_cache = VariableLayerCache()
+        overlay_stage_cache = OverlayStageCache(join(self.work_dir, 'overlay-stages'))
+        overlay_planner = OverlayPlanner(self.revision, self.export_cache, config_tree=self.config_tree)
+        group_rpm_registry = GroupRpmRegistry(join(self.work_dir, GROUP_RPM_REGISTRY_DIRECTORY_NAME))
+        self._prefetch_svn_logs_of_shared_svn_paths(svn_log_cache, svn_service_queue, hosts)
+
         thread_pool = [BuildHostThread(name='Thread-%d' % i,
                                        revision=self.revision,
                                        svn_service_queue=svn_service_queue,
@@ -249,7 +339,13 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
                                        notify_that_host_failed=self._notify_that_host_failed,
                                        host_queue=self.host_queue,
                                        work_dir=self.work_dir,
-                                       error_logging_handler=self.error_handler) for i in range(thread_count)]
+                                       error_logging_handler=self.error_handler,
+                                       export_cache=self.export_cache,
+                                       svn_log_cache=svn_log_cache,
+                                       variable_layer_cache=variable_layer_cache,
+                                       overlay_stage_cache=overlay_stage_cache,
+                                       overlay_planner=overlay_planner,
+                                       group_rpm_registry=group_rpm_registry) for i in range(thread_count)]
 
         for thread in thread_pool:
             LOGGER.debug('%s: starting ...', thread.name)
@@ -258,16 +354,68 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
         for thread in thread_pool:
             thread.join()
 
-        failed_hosts = dict(self._consume_queue(self.failed_host_queue))
-        if failed_hosts:
-            failed_hosts_str = ['\n%s:\n\n%s\n\n' % (key, value) for (key, value) in failed_hosts.iteritems()]
-            raise CouldNotBuildSomeRpmsException("Could not build config rpm for some host(s): %s" % '\n'.join(failed_hosts_str))
+        svn_service_queue.log_statistics(LOGGER.debug)
+        if self.export_cache:
+            self.export_cache.log_statistics(LOGGER.debug)
+        svn_log_cache.log_statistics(LOGGER.debug)
+        variable_layer_cache.log_statistics(LOGGER.debug)
+        overlay_stage_cache.log_statistics(LOGGER.debug)
+        overlay_planner.log_statistics(LOGGER.debug)
+        group_rpm_registry.log_statistics(LOGGER.debug)
+        if self.svn_service.segment_tree_cache:
+            self.svn_service.segment_tree_cache.log_statistics(LOGGER.debug)
+
+    def _build_hosts_in_processes(self, hosts, rpm_queue):
+        """ Builds the hosts in a pool of processes. The processes are forked with a snapshot of
+            the configuration and send the paths of the built rpms or the error back for each host. """
+
+        process_count = min(self._get_build_process_count(), len(hosts))
+        hosts_per_process = self._get_hosts_per_build_process()
+        LOGGER.info('Building %d host(s) using %d process(es).', len(hosts), process_count)
+
+        pool = Pool(processes=process_count,
+                    initializer=initialize_build_process,
+                    initargs=(get_configuration_snapshot(), self.revision, self.work_dir, self.svn_service, self.error_handler, self.config_tree),
+                    maxtasksperchild=hosts_per_process or None)
 
-        LOGGER.info("Finished building configuration rpm(s).")
-        built_rpms = self._consume_queue(rpm_queue)
-        log_elements_of_list(LOGGER.debug, 'Built %s rpm(s).', built_rpms)
+        try:
+            self._collect_results_of_build_processes(pool.imap_unordered(build_host_in_process, hosts), rpm_queue)
+        finally:
+            pool.terminate()
+            pool.join()
+            self._remove_directories_of_build_processes()
 
-        return built_rpms
+    def _remove_directories_of_build_processes(self):
+        """ Removes the caches of the build processes, terminated processes could not remove them on their own. """
+
+        if not self._keep_work_dir():
+            rmtree(join(self.work_dir, BUILD_PROCESSES_DIRECTORY_NAME), ignore_errors=True)
+
+    def _collect_results_of_build_processes(self, results, rpm_queue):
+        maximum_allowed_failed_hosts = get_max_failed_hosts()
+
+        for host, rpms, error in results:
+            if error is not None:
+                self._notify_that_host_failed(host, error)
+                if self.failed_host_queue.qsize() >= maximum_allowed_failed_hosts:
+                    return
+
+            for rpm in rpms:
+                rpm_queue.put(rpm)
+
+    @measure_execution_time
+    def _prefetch_svn_logs_of_shared_svn_paths(self, svn_log_cache, svn_service_queue, hosts):
+        shared_svn_paths = set()
+        for segment in OVERLAY_ORDER:
+            if not isinstance(segment, Host):
+                for host in hosts:
+                    shared_svn_paths.update(segment.get_svn_paths(host))
+
+        LOGGER.debug('Prefetching svn logs of %d shared svn path(s).', len(shared_svn_paths))
+        try:
+            svn_log_cache.prefetch(svn_service_queue, sorted(shared_svn_paths), self.revision, SVN_LOG_LIMIT)
+        except Exception as e:
+            LOGGER.warn('Could not prefetch svn logs of shared svn paths, the build threads will request them: %s', str(e))
 
     @measure_execution_time
     def _upload_rpms(self, rpms):
@@ -278,40 +426,116 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
             LOGGER.info("Uploading %s rpm(s).", len(rpms))
             LOGGER.debug('Uploading rpm(s) using command "%s" and chunk_size "%s"', rpm_upload_cmd, chunk_size)
 
-            pos = 0
-            while pos < len(rpms):
-                rpm_chunk = rpms[pos:pos + chunk_size]
-                cmd = '%s %s' % (rpm_upload_cmd, ' '.join(rpm_chunk))
-                process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                stdout, stderr = process.communicate()
-                if process.returncode:
-                    error_message = 'Rpm upload failed with exit code %s. Executed command "%s"\n' % (process.returncode, cmd)
-                    if stdout:
-                        error_message += 'stdout: "%s"\n' % stdout.strip()
-                    if stderr:
-                        error_message += 'stderr: "%s"\n' % stderr.strip()
-                    raise CouldNotUploadRpmsException(error_message)
-                pos += chunk_size
+            rpm_uploader = ParallelRpmUploader(rpm_upload_cmd, chunk_size, self._get_rpm_upload_chunk_max_bytes(), self._get_rpm_upload_parallel_uploads())
+            rpm_uploader.upload(rpms)
+            rpm_uploader.finish()
+            rpm_uploader.log_statistics(LOGGER.debug)
+
+            if rpm_uploader.error:
+                raise rpm_uploader.error
         else:
             LOGGER.info("Rpms will not be uploaded since no upload command has been configured.")
 
-    def _get_affected_hosts(self, changed_paths, available_host):
+    def _create_rpm_uploader(self):
+        """ Returns a rpm uploader if the rpms should be uploaded while building, otherwise None. """
+
+        rpm_upload_cmd = get_rpm_upload_command()
+        if not rpm_upload_cmd or not is_rpm_upload_while_building_enabled():
+            return None
+
+        time_window = get_rpm_upload_time_window()
+        if time_window < 0:
+            raise ConfigurationException('%s is %s, values <0 are not allowed)' % (get_rpm_upload_time_window, time_window))
+
+        chunk_size = self._get_chunk_size([])
+        LOGGER.info('Uploading rpm(s) while building in chunks of %s rpm(s) or every %s second(s).', chunk_size or 'all', time_window)
+        return RpmUploader(rpm_upload_cmd, chunk_size, time_window, self._get_rpm_upload_chunk_max_bytes(), self._get_rpm_upload_parallel_uploads())
+
+    def _get_rpm_upload_chunk_max_bytes(self):
+        chunk_max_bytes = get_rpm_upload_chunk_max_bytes()
+        if chunk_max_bytes < 0:
+            raise ConfigurationException('%s is %s, values <0 are not allowed)' % (get_rpm_upload_chunk_max_bytes, chunk_max_bytes))
+
+        return chunk_max_bytes
+
+    def _get_rpm_upload_parallel_uploads(self):
+        parallel_uploads = get_rpm_upload_parallel_uploads()
+        if parallel_uploads < 1:
+            raise ConfigurationException('%s is %s, values <1 are not allowed)' % (get_rpm_upload_parallel_uploads, parallel_uploads))
+
+        return parallel_uploads
+
+    def _is_any_segment_affected(self, changed_paths):
+        svn_root_paths = tuple(segment.get_svn_root_path() for segment in OVERLAY_ORDER)
+
+        for changed_path in changed_paths:
+            if changed_path.startswith(svn_root_paths):
+                return True
+
+        return False
+
+    @measure_execution_time
+    def _get_affected_hosts(self, changed_paths, available_hosts):
+        svn_path_index = SvnPathIndex(available_hosts)
+
         result = set()
-        for segment in OVERLAY_ORDER:
-            for changed_path in changed_paths:
-                result |= set(self._find_matching_hosts(segment, changed_path, available_host))
+        for changed_path in changed_paths:
+            result |= svn_path_index.get_affected_hosts(changed_path)
 
         return result
 
-    def _find_matching_hosts(self, segment, svn_path, available_hosts):
-        result = []
-        for host in available_hosts:
-            for path in segment.get_svn_paths(host):
-                if svn_path.startswith(path):
-                    result.append(host)
-                    break
+    @measure_execution_time
+    def _prune_hosts_with_shadowed_changes(self, changed_paths, affected_hosts):
+        """ Returns the affected hosts without the hosts which override every changed file in a more specific segment. """
 
-        return result
+        config_tree = self._get_config_tree()
+
+        remaining_hosts = []
+        pruned_hosts = []
+        for host in affected_hosts:
+            svn_paths = [svn_path for segment in OVERLAY_ORDER for svn_path in segment.get_svn_paths(host)]
+            if any(is_affected_by_change(config_tree, svn_paths, changed_path) for changed_path in changed_paths):
+                remaining_hosts.append(host)
+            else:
+                pruned_hosts.append(host)
+
+        log_elements_of_list(LOGGER.debug, 'Pruned %s host(s) overriding all changed files.', pruned_hosts)
+        return remaining_hosts
+
+    @measure_execution_time
+    def _prune_hosts_not_using_changed_variables(self, changed_paths, affected_hosts):
+        """ Returns the affected hosts without the hosts which do not reference any changed variable. """
+
+        spec_file_path = join(self.work_dir, 'impact-analysis.spec')
+        self.svn_service.export(get_path_to_spec_file(), spec_file_path, self.revision)
+        variable_impact_analyzer = VariableImpactAnalyzer(self.revision, self._get_config_tree(), SvnServicePool(self.svn_service, 1),
+                                                          self.export_cache, spec_file_path)
+
+        added_or_deleted_paths = set(self.svn_service.get_added_or_deleted_paths(self.revision))
+
+        remaining_hosts = []
+        pruned_hosts_by_reason = {}
+        for host in affected_hosts:
+            reason = variable_impact_analyzer.get_reason_to_skip(host, changed_paths, added_or_deleted_paths)
+            if reason is None:
+                remaining_hosts.append(host)
+            else:
+                pruned_hosts_by_reason.setdefault(reason, []).append(host)
+
+        for reason, pruned_hosts in sorted(pruned_hosts_by_reason.items()):
+            LOGGER.info('Pruned %d host(s) since %s: %s', len(pruned_hosts), reason, ', '.join(sorted(pruned_hosts)))
+
+        LOGGER.info('Pruned %d of %d affected host(s) since the changed variables can not change their rpms.',
+                    len(affected_hosts) - len(remaining_hosts), len(affected_hosts))
+        return remaining_hosts
+
+    def _get_config_tree(self):
+        """ Lists the config directory of the revision only once. """
+
+        if self.config_tree is None:
+            self.config_tree = ConfigTree(self.svn_service.list_config_tree(self.revision))
+
+        return self.config_tree
 
     def _get_thread_count(self, affected_hosts):
         thread_count = int(get_thread_count())
@@ -327,6 +551,31 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
             LOGGER.info("%s: using one thread for each affected host." % (reason))
         return thread_count
 
+    def _get_build_process_count(self):
+        build_process_count = get_build_process_count()
+        if build_process_count < 0:
+            raise ConfigurationException('%s is %s, values <0 are not allowed)' % (get_build_process_count, build_process_count))
+
+        return build_process_count
+
+    def _get_hosts_per_build_process(self):
+        hosts_per_build_process = get_hosts_per_build_process()
+        if hosts_per_build_process < 0:
+            raise ConfigurationException('%s is %s, values <0 are not allowed)' % (get_hosts_per_build_process, hosts_per_build_process))
+
+        return hosts_per_build_process
+
+    def _get_svn_client_pool_size(self, thread_count):
+        pool_size = get_svn_client_pool_size()
+        if pool_size < 0:
+            raise ConfigurationException('%s is %s, values <0 are not allowed)' % (get_svn_client_pool_size, pool_size))
+
+        if not pool_size or pool_size > thread_count:
+            pool_size = thread_count
+
+        LOGGER.debug('Using %d svn client(s) for %d build thread(s).', pool_size, thread_count)
+        return pool_size
+
     def _consume_queue(self, queue):
         items = []
 
@@ -360,6 +609,8 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
                                 suffix='.' + self.revision,
                                 dir=self.temp_dir)
 
+        self.export_cache = ExportCache(join(self.work_dir, 'svn-exports'))
+
         self.rpm_build_dir = join(self.work_dir, 'rpmbuild')
         LOGGER.debug('Creating directory structure for rpmbuild in "%s"', self.rpm_build_dir)
         for name in ['tmp', 'RPMS', 'RPMS/x86_64', 'RPMS/noarch', 'BUILD', 'BUILDROOT', 'SRPMS', 'SPECS', 'SOURCES']:
@@ -380,3 +631,16 @@ Please fix the issues and trigger the RPM creation with a dummy commit.
             chunk_size = len(rpms)
 
         return chunk_size
+
+
+def _remove_duplicates(rpms):
+    """ Returns the rpms in the given order without the rpms which have been returned by more than one build. """
+
+    seen_rpms = set()
+    unique_rpms = []
+    for rpm in rpms:
+        if rpm not in seen_rpms:
+            seen_rpms.add(rpm)
+            unique_rpms.append(rpm)
+
+    return unique_rpms
@@ -139,6 +139,20 @@ def set_properties(new_properties):
     _properties = new_properties
 
 
+def get_configuration_snapshot():
+    """ Returns the application configuration properties as a picklable dictionary
+        which maps the keys of the properties to their values """
+
+    return dict((configuration_property.key, value) for configuration_property, value in (get_properties() or {}).items())
+
+
+def set_configuration_snapshot(snapshot):
+    """ Sets the application configuration properties from a dictionary returned by get_configuration_snapshot """
+
+    configuration_properties = dict((value.key, value) for value in globals().values() if isinstance(value, ConfigurationProperty))
+    set_properties(dict((configuration_properties[key], value) for key, value in snapshot.items()))
+
+
 def get_file_path_of_loaded_configuration():
     """ Returns the path to the loaded configuration file (if it has been loaded) """
 
@@ -187,37 +201,66 @@ def _ensure_properties_are_valid(raw_properties):
     allow_unknown_hosts = raw_properties.get(unknown_hosts_are_allowed.key, unknown_hosts_are_allowed.default)
     config_rpm_prefix = raw_properties.get(get_config_rpm_prefix.key, get_config_rpm_prefix.default)
     config_viewer_hosts_dir = raw_properties.get(get_config_viewer_host_directory.key, get_config_viewer_host_directory.default)
+    build_process_count = raw_properties.get(get_build_process_count.key, get_build_process_count.default)
     custom_dns_searchlist = raw_properties.get(get_custom_dns_search_list.key, get_custom_dns_search_list.default)
     error_log_directory = raw_properties.get(get_error_log_directory.key, get_error_log_directory.default)
     error_log_url = raw_properties.get(get_error_log_url.key, get_error_log_url.default)
+    hosts_per_build_process = raw_properties.get(get_hosts_per_build_process.key, get_hosts_per_build_process.default)
     log_level = raw_properties.get(get_log_level.key, get_log_level.default)
     max_file_size = raw_properties.get(get_max_file_size.key, get_max_file_size.default)
     max_failed_hosts = raw_properties.get(get_max_failed_hosts.key, get_max_failed_hosts.default)
     path_to_spec_file = raw_properties.get(get_path_to_spec_file.key, get_path_to_spec_file.default)
+    prune_shadowed_changes = raw_properties.get(is_pruning_of_shadowed_changes_enabled.key, is_pruning_of_shadowed_changes_enabled.default)
+    prune_unused_variable_changes = raw_properties.get(is_pruning_of_unused_variable_changes_enabled.key, is_pruning_of_unused_variable_changes_enabled.default)
+    rendered_output_cache_size = raw_properties.get(get_rendered_output_cache_size.key, get_rendered_output_cache_size.default)
     repo_packages_regex = raw_properties.get(get_repo_packages_regex.key, get_repo_packages_regex.default)
+    rpm_upload_chunk_max_bytes = raw_properties.get(get_rpm_upload_chunk_max_bytes.key, get_rpm_upload_chunk_max_bytes.default)
     rpm_upload_chunk_size = raw_properties.get(get_rpm_upload_chunk_size.key, get_rpm_upload_chunk_size.default)
     rpm_upload_command = raw_properties.get(get_rpm_upload_command.key, get_rpm_upload_command.default)
+    rpm_upload_parallel_uploads = raw_properties.get(get_rpm_upload_parallel_uploads.key, get_rpm_upload_parallel_uploads.default)
+    rpm_upload_time_window = raw_properties.get(get_rpm_upload_time_window.key, get_rpm_upload_time_window.default)
+    rpm_upload_while_building = raw_properties.get(is_rpm_upload_while_building_enabled.key, is_rpm_upload_while_building_enabled.default)
+    segment_tree_cache_directory = raw_properties.get(get_segment_tree_cache_directory.key, get_segment_tree_cache_directory.default)
+    segment_tree_cache_max_size = raw_properties.get(get_segment_tree_cache_max_size.key, get_segment_tree_cache_max_size.default)
+    source_tar_compression_level = raw_properties.get(get_source_tar_compression_level.key, get_source_tar_compression_level.default)
+    svn_client_pool_size = raw_properties.get(get_svn_client_pool_size.key, get_svn_client_pool_size.default)
     svn_path_to_config = raw_properties.get(get_svn_path_to_config.key, get_svn_path_to_config.default)
+    template_cache_size = raw_properties.get(get_template_cache_size.key, get_template_cache_size.default)
     temporary_directory = raw_properties.get(get_temporary_directory.key, get_temporary_directory.default)
     thread_count = raw_properties.get(get_thread_count.key, get_thread_count.default)
 
     valid_properties = {
         get_log_level: _ensure_valid_log_level(log_level),
         unknown_hosts_are_allowed: _ensure_is_a_boolean_value(unknown_hosts_are_allowed, allow_unknown_hosts),
+        get_build_process_count: _ensure_is_an_integer(get_build_process_count, build_process_count),
         get_config_rpm_prefix: _ensure_is_a_string(get_config_rpm_prefix, config_rpm_prefix),
         is_config_viewer_only_enabled: is_config_viewer_only_enabled.default,
         get_config_viewer_host_directory: _ensure_is_a_string(get_config_viewer_host_directory, config_viewer_hosts_dir),
         get_custom_dns_search_list: _ensure_is_a_list_of_strings(get_custom_dns_search_list, custom_dns_searchlist),
         get_error_log_directory: _ensure_is_a_string(get_error_log_directory, error_log_directory),
         get_error_log_url: _ensure_is_a_string(get_error_log_url, error_log_url),
+        get_hosts_per_build_process: _ensure_is_an_integer(get_hosts_per_build_process, hosts_per_build_process),
         get_max_failed_hosts: _ensure_is_an_integer(get_max_failed_hosts, max_failed_hosts),
         get_max_file_size: _ensure_is_an_integer(get_max_file_size, max_file_size),
         is_no_clean_up_enabled: is_no_clean_up_enabled.default,
         get_path_to_spec_file: _ensure_is_a_string(get_path_to_spec_file, path_to_spec_file),
+        is_pruning_of_shadowed_changes_enabled: _ensure_is_a_boolean_value(is_pruning_of_shadowed_changes_enabled, prune_shadowed_changes),
+        is_pruning_of_unused_variable_changes_enabled: _ensure_is_a_boolean_value(is_pruning_of_unused_variable_changes_enabled,
+                                                                                  prune_unused_variable_changes),
+        get_rendered_output_cache_size: _ensure_is_an_integer(get_rendered_output_cache_size, rendered_output_cache_size),
         get_repo_packages_regex: _ensure_repo_packages_regex_is_a_valid_regular_expression(repo_packages_regex),
+        get_rpm_upload_chunk_max_bytes: _ensure_is_an_integer(get_rpm_upload_chunk_max_bytes, rpm_upload_chunk_max_bytes),
         get_rpm_upload_chunk_size: _ensure_is_an_integer(get_rpm_upload_chunk_size, rpm_upload_chunk_size),
         get_rpm_upload_command: _ensure_is_a_string_or_none(get_rpm_upload_command, rpm_upload_command),
+        get_rpm_upload_parallel_uploads: _ensure_is_an_integer(get_rpm_upload_parallel_uploads, rpm_upload_parallel_uploads),
+        get_rpm_upload_time_window: _ensure_is_an_integer(get_rpm_upload_time_window, rpm_upload_time_window),
+        is_rpm_upload_while_building_enabled: _ensure_is_a_boolean_value(is_rpm_upload_while_building_enabled, rpm_upload_while_building),
+        get_segment_tree_cache_directory: _ensure_is_a_string(get_segment_tree_cache_directory, segment_tree_cache_directory),
+        get_segment_tree_cache_max_size: _ensure_is_an_integer(get_segment_tree_cache_max_size, segment_tree_cache_max_size),
+        get_source_tar_compression_level: _ensure_is_a_compression_level(get_source_tar_compression_level, source_tar_compression_level),
+        get_svn_client_pool_size: _ensure_is_an_integer(get_svn_client_pool_size, svn_client_pool_size),
         get_svn_path_to_config: _ensure_is_a_string(get_svn_path_to_config, svn_path_to_config),
+        get_template_cache_size: _ensure_is_an_integer(get_template_cache_size, template_cache_size),
         get_thread_count: _ensure_is_an_integer(get_thread_count, thread_count),
         get_temporary_directory: _ensure_is_a_string(get_temporary_directory, temporary_directory),
         is_verbose_enabled: is_verbose_enabled.default
@@ -281,6 +324,18 @@ def _ensure_is_an_integer(key, value):
     return value
 
 
+def _ensure_is_a_compression_level(key, value):
+    """ Returns the given int or raises an exception if the given value is not an integer between 0 and 9 """
+
+    _ensure_is_an_integer(key, value)
+
+    if value < 0 or value > 9:
+        raise ConfigurationException('Configuration parameter "%s": invalid value "%s"! Please use an integer between 0 (no compression) and 9.'
+                                     % (key, str(value)))
+
+    return value
+
+
 def _ensure_repo_packages_regex_is_a_valid_regular_expression(value):
     """ returns the given value if it is a valid regular expression or raises an exception if not """
 
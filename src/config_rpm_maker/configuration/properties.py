@@ -22,25 +22,39 @@
 
 from config_rpm_maker.configuration import ConfigurationProperty
 
+get_build_process_count = ConfigurationProperty(key='build_process_count', default=0)
 get_config_viewer_host_directory = ConfigurationProperty(key='config_viewer_hosts_dir', default='/tmp')
 get_config_rpm_prefix = ConfigurationProperty(key='config_rpm_prefix', default='yadt-config-')
 get_custom_dns_search_list = ConfigurationProperty(key='custom_dns_searchlist', default=[])
 get_error_log_directory = ConfigurationProperty(key='error_log_dir', default="")
 get_error_log_url = ConfigurationProperty(key='error_log_url', default='')
+get_hosts_per_build_process = ConfigurationProperty(key='hosts_per_build_process', default=50)
 get_log_format = ConfigurationProperty(key="log_format", default="[%(levelname)5s] %(message)s")
 get_log_level = ConfigurationProperty(key="log_level", default='DEBUG')
 get_max_failed_hosts = ConfigurationProperty(key='max_failed_hosts', default=3)
 get_max_file_size = ConfigurationProperty(key='max_file_size', default=100 * 1024)
 get_path_to_spec_file = ConfigurationProperty(key='path_to_spec_file', default='default.spec')
+get_rendered_output_cache_size = ConfigurationProperty(key='rendered_output_cache_size', default=64 * 1024 * 1024)
 get_repo_packages_regex = ConfigurationProperty(key='repo_packages_regex', default='.*-repo.*')
+get_rpm_upload_chunk_max_bytes = ConfigurationProperty(key='rpm_upload_chunk_max_bytes', default=0)
 get_rpm_upload_chunk_size = ConfigurationProperty(key='rpm_upload_chunk_size', default=10)
 get_rpm_upload_command = ConfigurationProperty(key='rpm_upload_cmd', default=None)
+get_rpm_upload_parallel_uploads = ConfigurationProperty(key='rpm_upload_parallel_uploads', default=1)
+get_rpm_upload_time_window = ConfigurationProperty(key='rpm_upload_time_window', default=10)
+get_segment_tree_cache_directory = ConfigurationProperty(key='segment_tree_cache_dir', default='')
+get_segment_tree_cache_max_size = ConfigurationProperty(key='segment_tree_cache_max_size', default=512 * 1024 * 1024)
+get_source_tar_compression_level = ConfigurationProperty(key='source_tar_compression_level', default=6)
+get_svn_client_pool_size = ConfigurationProperty(key='svn_client_pool_size', default=0)
 get_svn_path_to_config = ConfigurationProperty(key='svn_path_to_config', default='/config')
+get_template_cache_size = ConfigurationProperty(key='template_cache_size', default=64 * 1024 * 1024)
 get_thread_count = ConfigurationProperty(key='thread_count', default=1)
 get_temporary_directory = ConfigurationProperty(key='temp_dir', default='/tmp')
 
 is_config_viewer_only_enabled = ConfigurationProperty(key='config_viewer_only', default=False)
 is_no_clean_up_enabled = ConfigurationProperty(key='no_clean_up', default=False)
+is_pruning_of_shadowed_changes_enabled = ConfigurationProperty(key='prune_shadowed_changes', default=False)
+is_pruning_of_unused_variable_changes_enabled = ConfigurationProperty(key='prune_unused_variable_changes', default=False)
+is_rpm_upload_while_building_enabled = ConfigurationProperty(key='rpm_upload_while_building', default=False)
 is_verbose_enabled = ConfigurationProperty(key='verbose', default=False)
 
 unknown_hosts_are_allowed = ConfigurationProperty(key='allow_unknown_hosts', default=True)
@@ -0,0 +1,111 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from logging import getLogger
+from os.path import join
+from shutil import rmtree
+from threading import Lock
+
+from config_rpm_maker.utilities.filesystem import copy_tree
+
+LOGGER = getLogger(__name__)
+
+
+class ExportCacheEntry(object):
+    """ The result of exporting one svn path in one revision into the staging directory. """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = Lock()
+        self.exported = False
+        self.exported_paths = []
+
+
+class ExportCache(object):
+    """ Exports each svn path only once per revision into a staging directory.
+        Every host which needs the svn path afterwards gets a local copy of the
+        staged files instead of exporting them from the svn server again. """
+
+    def __init__(self, staging_directory):
+        self.staging_directory = staging_directory
+        self.lock = Lock()
+        self.entries = {}
+        self.count_of_entries = 0
+        self.count_of_exports = 0
+        self.count_of_copies = 0
+
+    def export(self, svn_service_queue, svn_path, target_directory, revision):
+        """ Works like SvnService.export, but takes a svn service from the given queue
+            only if the svn path has not been exported in the given revision yet.
+            A failed export is not cached, the next host exports the svn path again. """
+
+        entry = self._get_exported_entry(svn_service_queue, svn_path, revision)
+
+        copy_tree(entry.directory, target_directory)
+
+        with self.lock:
+            self.count_of_copies += 1
+
+        return list(entry.exported_paths)
+
+    def get_directory(self, svn_service_queue, svn_path, revision):
+        """ Returns the staging directory of the svn path, exporting it if it has not been
+            exported in the given revision yet. The files in it must not be changed. """
+
+        return self._get_exported_entry(svn_service_queue, svn_path, revision).directory
+
+    def _get_exported_entry(self, svn_service_queue, svn_path, revision):
+        key = (svn_path, revision)
+
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = ExportCacheEntry(join(self.staging_directory, str(self.count_of_entries)))
+                self.count_of_entries += 1
+
+            entry = self.entries[key]
+
+        with entry.lock:
+            if not entry.exported:
+                self._export_entry(key, entry, svn_service_queue, svn_path, revision)
+
+        return entry
+
+    def _export_entry(self, key, entry, svn_service_queue, svn_path, revision):
+        """ Removes the entry if the export fails, so the next host exports the svn path again.
+            A host which has been waiting for the failed export tries to export it, too. """
+
+        svn_service = svn_service_queue.get()
+        try:
+            entry.exported_paths = svn_service.export(svn_path, entry.directory, revision)
+        except Exception:
+            with self.lock:
+                if self.entries.get(key) is entry:
+                    del self.entries[key]
+            rmtree(entry.directory, ignore_errors=True)
+            raise
+        finally:
+            svn_service_queue.put(svn_service)
+            svn_service_queue.task_done()
+
+        entry.exported = True
+
+        with self.lock:
+            self.entries.setdefault(key, entry)
+            self.count_of_exports += 1
+
+    def log_statistics(self, logging_function):
+        logging_function('Export cache summary: %d svn export(s) served %d copies into host directories.',
+                         self.count_of_exports, self.count_of_copies)
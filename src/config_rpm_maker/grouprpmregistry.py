@@ -0,0 +1,79 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import errno
+
+from logging import getLogger
+from os import makedirs, mkdir
+from os.path import exists, join
+from threading import Lock
+from urllib import quote
+
+LOGGER = getLogger(__name__)
+
+GROUP_RPM_REGISTRY_DIRECTORY_NAME = 'group-rpms'
+OWNER_FILE_NAME = 'host'
+
+
+class GroupRpmRegistry(object):
+    """ Records which member host builds a group rpm, so each group rpm is built only
+        once per revision. A claim is a directory created in the registry directory,
+        creating it is atomic, hence it works for build threads and build processes. """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = Lock()
+        self.count_of_claims = 0
+        self.count_of_skipped_builds = 0
+
+        if not exists(self.directory):
+            makedirs(self.directory)
+
+    def claim(self, rpm_name, hostname):
+        """ Returns True if the given host is the first one claiming the group rpm and has to build it. """
+
+        claim_directory = join(self.directory, quote(rpm_name, safe=''))
+
+        try:
+            mkdir(claim_directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+            with self.lock:
+                self.count_of_skipped_builds += 1
+            LOGGER.debug('Group rpm "%s" is built by host "%s", not by host "%s".', rpm_name, self.get_owner(rpm_name), hostname)
+            return False
+
+        with open(join(claim_directory, OWNER_FILE_NAME), 'w') as owner_file:
+            owner_file.write(hostname)
+
+        with self.lock:
+            self.count_of_claims += 1
+        return True
+
+    def get_owner(self, rpm_name):
+        """ Returns the host which claimed the group rpm or None. """
+
+        try:
+            with open(join(self.directory, quote(rpm_name, safe=''), OWNER_FILE_NAME)) as owner_file:
+                return owner_file.read()
+        except IOError:
+            return None
+
+    def log_statistics(self, logging_function):
+        logging_function('Group rpm registry summary: %d group rpm(s) claimed, %d build(s) of member hosts skipped.',
+                         self.count_of_claims, self.count_of_skipped_builds)
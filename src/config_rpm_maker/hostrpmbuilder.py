@@ -16,7 +16,6 @@
 
 import os
 import shutil
-import subprocess
 
 from pysvn import ClientError
 from datetime import datetime
@@ -25,6 +24,7 @@ from os import mkdir, remove, environ
 from os.path import exists, abspath
 from shutil import rmtree
 from subprocess import PIPE, Popen
+from tarfile import TarError
 
 from config_rpm_maker import configuration
 from config_rpm_maker.configuration.properties import (is_no_clean_up_enabled,
@@ -32,11 +32,13 @@ from config_rpm_maker.configuration.properties import (is_no_clean_up_enabled,
                                                        get_repo_packages_regex,
                                                        get_config_rpm_prefix,
                                                        is_config_viewer_only_enabled,
-                                                       get_path_to_spec_file)
+                                                       get_path_to_spec_file,
+                                                       get_source_tar_compression_level)
 from config_rpm_maker.configuration import build_config_viewer_host_directory
 from config_rpm_maker.dependency import Dependency
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
 from config_rpm_maker.hostresolver import HostResolver
+from config_rpm_maker.utilities.filesystem import break_hard_link, create_tar_file
 from config_rpm_maker.utilities.logutils import verbose
 from config_rpm_maker.segment import OVERLAY_ORDER, ALL_SEGEMENTS
 from config_rpm_maker.token.tokenreplacer import TokenReplacer
@@ -45,6 +47,10 @@ from config_rpm_maker.utilities.profiler import measure_execution_time
 
 LOGGER = getLogger(__name__)
 
+# Number of log entries shown in the SVNLOG variable.
+SVN_LOG_LIMIT = 5
+
+
 
 class CouldNotCreateConfigDirException(BaseConfigRpmMakerException):
     error_info = "Could not create host configuration directory :"
@@ -63,7 +69,8 @@ class CouldNotTarConfigurationDirectoryException(BaseConfigRpmMakerException):
 
 
 class HostRpmBuilder(object):
-    def __init__(self, thread_name, hostname, revision, work_dir, svn_service_queue, error_logging_handler=None):
+    def __init__(self, thread_name, hostname, revision, work_dir, svn_service_queue, error_logging_handler=None, export_cache=None, svn_log_cache=None,
+                 variable_layer_cache=None, overlay_stage_cache=None, overlay_planner=None, group_rpm_registry=None):
         self.thread_name = thread_name
         self.hostname = hostname
         self.revision = revision
@@ -73,6 +80,15 @@ class HostRpmBuilder(object):
         self.error_file_path = os.path.join(self.work_dir, self.hostname + '.error')
         self.logger = self._create_logger()
         self.svn_service_queue = svn_service_queue
+        self.export_cache = export_cache
+        self.svn_log_cache = svn_log_cache
+        self.variable_layer_cache = variable_layer_cache
+        self.overlay_stage_cache = overlay_stage_cache
+        self.overlay_planner = overlay_planner
+        self.group_rpm_registry = group_rpm_registry
+        self.variable_layer = None
+        self.written_variable_names = set()
+        self.exported_host_variable_names = set()
         self.config_rpm_prefix = get_config_rpm_prefix()
         self.host_config_dir = os.path.join(self.work_dir, self.config_rpm_prefix + self.hostname)
         self.variables_dir = os.path.join(self.host_config_dir, 'VARIABLES')
@@ -81,6 +97,7 @@ class HostRpmBuilder(object):
         self.spec_file_path = os.path.join(self.host_config_dir, self.config_rpm_prefix + self.hostname + '.spec')
         self.config_viewer_host_dir = build_config_viewer_host_directory(hostname, revision=self.revision)
         self.rpm_build_dir = os.path.join(self.work_dir, 'rpmbuild')
+        self.rpm_source_paths = None
 
     def build(self):
         LOGGER.info('%s: building configuration rpm(s) for host "%s"', self.thread_name, self.hostname)
@@ -99,8 +116,7 @@ class HostRpmBuilder(object):
         overall_svn_paths = []
         overall_exported = {}
 
-        for segment in OVERLAY_ORDER:
-            svn_paths, exported_paths, requires, provides = self._overlay_segment(segment)
+        for segment, (svn_paths, exported_paths, requires, provides) in self._overlay_segments():
             overall_exported[segment] = exported_paths
             overall_svn_paths += svn_paths
             overall_requires += requires
@@ -111,6 +127,8 @@ class HostRpmBuilder(object):
         self.logger.info("Overall_provides: %s", str(overall_provides))
         self.logger.debug("Overall_svn_paths: %s", str(overall_svn_paths))
 
+        self.exported_host_variable_names = self._get_names_of_exported_variables(overall_exported[OVERLAY_ORDER[-1]])
+
         if not exists(self.variables_dir):
             mkdir(self.variables_dir)
 
@@ -125,12 +143,7 @@ class HostRpmBuilder(object):
         self._save_segment_variables(do_not_write_host_segment_variable)
 
         if self.is_a_group_rpm:
-            try:
-                TokenReplacer.filter_directory(os.path.dirname(self.variables_dir), self.variables_dir, thread_name=self.thread_name, skip=False)
-            except Exception as e:
-                LOGGER.warning("Problem during preliminary filtering of variables for group {0}: {1}".format(self.hostname, e))
-            with open(rpm_name_variable_file) as f:
-                self.rpm_name = f.read().rstrip()
+            self.rpm_name = self._resolve_group_rpm_name(rpm_name_variable_file)
             LOGGER.info('Host {0} will trigger group rpm build with name {1}'.format(self.hostname, self.rpm_name))
             self.spec_file_path = os.path.join(self.host_config_dir, self.config_rpm_prefix + self.rpm_name + '.spec')
             self._write_file(os.path.join(self.variables_dir, 'INSTALL_PROTECTION_DEPENDENCY'), '')
@@ -154,27 +167,56 @@ class HostRpmBuilder(object):
 
         patch_info = self._generate_patch_info()
 
-        self._copy_files_for_config_viewer()
+        self._create_config_viewer_host_directory()
 
         # write patch info into variable and config viewer
         self._write_file(os.path.join(self.variables_dir, 'VARIABLES'), patch_info)
         self._write_file(os.path.join(self.config_viewer_host_dir, self.hostname + '.variables'), patch_info)
 
-        self._filter_tokens_in_rpm_sources()
+        LOGGER.debug('%s: writing configviewer data for host "%s"', self.thread_name, self.hostname)
+        self._filter_tokens_in_rpm_sources_and_config_viewer()
 
+        rpm_is_built_by_other_host = False
         if not is_config_viewer_only_enabled():
-            self._build_rpm_using_rpmbuild()
+            rpm_is_built_by_other_host = not self._claim_rpm()
+            if not rpm_is_built_by_other_host:
+                self._build_rpm_using_rpmbuild()
 
-        LOGGER.debug('%s: writing configviewer data for host "%s"', self.thread_name, self.hostname)
-        self._filter_tokens_in_config_viewer()
         self._write_revision_file_for_config_viewer()
         self._write_overlaying_for_config_viewer(overall_exported)
 
         self._remove_logger_handlers()
         self._clean_up()
 
+        if rpm_is_built_by_other_host:
+            return []
+
         return self._find_rpms()
 
+    def _claim_rpm(self):
+        """ Returns False if the rpm is a group rpm which is built by another member host. """
+
+        if not self.is_a_group_rpm or not self.group_rpm_registry:
+            return True
+
+        if self.group_rpm_registry.claim(self.rpm_name, self.hostname):
+            return True
+
+        LOGGER.info('%s: group rpm "%s" is built by another member host, writing only configviewer data for host "%s"',
+                    self.thread_name, self.rpm_name, self.hostname)
+        return False
+
+    def _resolve_group_rpm_name(self, rpm_name_variable_file):
+        """ Resolves only the tokens RPM_NAME depends on instead of filtering the whole host config directory. """
+
+        try:
+            return TokenReplacer.from_directory(self.variables_dir, lazy=True).resolve('RPM_NAME').encode('UTF-8')
+        except Exception as e:
+            LOGGER.warning("Problem during preliminary filtering of variables for group {0}: {1}".format(self.hostname, e))
+
+        with open(rpm_name_variable_file) as f:
+            return f.read().rstrip()
+
     def _clean_up(self):
         if is_no_clean_up_enabled():
             verbose(LOGGER).debug('Not cleaning up anything for host "%s"', self.hostname)
@@ -187,22 +229,6 @@ class HostRpmBuilder(object):
         remove(self.output_file_path)
         remove(self.error_file_path)
 
-    def _filter_tokens_in_config_viewer(self):
-
-        def configviewer_token_replacer(token, replacement):
-            filtered_replacement = replacement.rstrip()
-            return '<strong title="%s">%s</strong>' % (token, filtered_replacement)
-
-        token_replacer = TokenReplacer.filter_directory(self.config_viewer_host_dir,
-                                                        self.variables_dir,
-                                                        html_escape=True,
-                                                        replacer_function=configviewer_token_replacer,
-                                                        thread_name=self.thread_name)
-        tokens_unused = set(token_replacer.token_values.keys()) - token_replacer.token_used
-        path_to_unused_variables = os.path.join(self.config_viewer_host_dir, 'unused_variables.txt')
-        self._write_file(path_to_unused_variables, '\n'.join(sorted(tokens_unused)))
-        token_replacer.filter_file(path_to_unused_variables, html_escape=True)
-
     def _write_revision_file_for_config_viewer(self):
         revision_file_path = os.path.join(self.config_viewer_host_dir, self.hostname + '.rev')
         self._write_file(revision_file_path, self.revision)
@@ -257,35 +283,93 @@ class HostRpmBuilder(object):
             group_config_dir = os.path.join(self.work_dir, self.config_rpm_prefix + self.rpm_name)
             shutil.move(self.host_config_dir, group_config_dir)
             self.host_config_dir = group_config_dir
-            output_file = group_config_dir + '.tar.gz'
-            tar_cmd = 'tar -cvzf "%s" -C %s %s' % (output_file, self.work_dir, self.config_rpm_prefix + self.rpm_name)
+            archive_name = self.config_rpm_prefix + self.rpm_name
         else:
-            output_file = self.host_config_dir + '.tar.gz'
-            tar_cmd = 'tar -cvzf "%s" -C %s %s' % (output_file, self.work_dir, self.config_rpm_prefix + self.hostname)
-
-        self.logger.debug("Executing %s ...", tar_cmd)
-        process = subprocess.Popen(tar_cmd,
-                                   shell=True,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
-        if process.returncode:
-            stdout = stdout.strip()
-            stderr = stderr.strip()
-            raise CouldNotTarConfigurationDirectoryException('Creating tar of config dir failed:\n  stdout="%s",\n  stderr="%s"' % (stdout, stderr))
+            archive_name = self.config_rpm_prefix + self.hostname
+
+        # Source0 of the spec file names a .tar.gz, rpmbuild detects an uncompressed tar by its content anyway.
+        output_file = self.host_config_dir + '.tar.gz'
+        compression_level = get_source_tar_compression_level()
+
+        self.logger.debug('Writing "%s" using compression level %d ...', output_file, compression_level)
+        try:
+            create_tar_file(output_file, self.host_config_dir, archive_name, compression_level, self.rpm_source_paths)
+        except (IOError, OSError, TarError) as e:
+            raise CouldNotTarConfigurationDirectoryException('Creating tar of config dir failed:\n  %s' % str(e))
         return output_file
 
     @measure_execution_time
-    def _filter_tokens_in_rpm_sources(self):
-        TokenReplacer.filter_directory(self.host_config_dir, self.variables_dir, thread_name=self.thread_name)
+    def _filter_tokens_in_rpm_sources_and_config_viewer(self):
+        """ Reads every file of the rpm sources only once to filter it in place and
+            to write its html rendering into the config viewer host directory. """
+
+        def configviewer_token_replacer(token, replacement):
+            filtered_replacement = replacement.rstrip()
+            return '<strong title="%s">%s</strong>' % (token, filtered_replacement)
+
+        token_replacer = self._create_token_replacer()
+        config_viewer_token_replacer = token_replacer.with_replacer_function(configviewer_token_replacer)
+
+        for root, directory_names, file_names in os.walk(self.host_config_dir):
+            config_viewer_root = os.path.join(self.config_viewer_host_dir, os.path.relpath(root, self.host_config_dir))
+            if not exists(config_viewer_root):
+                mkdir(config_viewer_root)
+
+            for name in directory_names + file_names:
+                path = os.path.join(root, name)
+                config_viewer_path = os.path.join(config_viewer_root, name)
+
+                if os.path.islink(path):
+                    os.symlink(os.readlink(path), config_viewer_path)
+                elif os.path.isfile(path):
+                    token_replacer.filter_file(path, config_viewer_filename=config_viewer_path, config_viewer_token_replacer=config_viewer_token_replacer)
+
+        config_viewer_variables_dir = os.path.join(self.config_viewer_host_dir, 'VARIABLES')
+        mkdir(config_viewer_variables_dir)
+        for name in os.listdir(self.variables_dir):
+            if name != 'VARIABLES':
+                config_viewer_path = os.path.join(config_viewer_variables_dir, name)
+                shutil.copy(os.path.join(self.variables_dir, name), config_viewer_path)
+                config_viewer_token_replacer.filter_file(config_viewer_path, html_escape=True)
+
+        config_viewer_token_replacer.filter_file(os.path.join(self.config_viewer_host_dir, self.hostname + '.variables'), html_escape=True)
+
+        tokens_unused = set(config_viewer_token_replacer.token_values.keys()) - config_viewer_token_replacer.token_used
+        path_to_unused_variables = os.path.join(self.config_viewer_host_dir, 'unused_variables.txt')
+        self._write_file(path_to_unused_variables, '\n'.join(sorted(tokens_unused)))
+        config_viewer_token_replacer.filter_file(path_to_unused_variables, html_escape=True)
+
+    def _create_token_replacer(self):
+        """ Uses the variables of the layer shared with other hosts of the same location and type,
+            unless the host overrides them. The variable files are read as they have been exported,
+            since tokens are resolved by the token replacer only. """
+
+        if not self.variable_layer:
+            return TokenReplacer.from_directory(abspath(self.variables_dir))
+
+        overridden_variable_names = self.written_variable_names | self.exported_host_variable_names
+        token_values, resolved_token_values = self.variable_layer.get_token_values(overridden_variable_names)
+
+        return TokenReplacer.from_directory(abspath(self.variables_dir), token_values=token_values, resolved_token_values=resolved_token_values)
+
+    def _get_variable_layer(self, svn_paths):
+        if self.variable_layer_cache:
+            self.variable_layer = self.variable_layer_cache.get(svn_paths, self.variables_dir)
+
+    def _get_names_of_exported_variables(self, exported_paths):
+        names = set()
+        for _, path in exported_paths:
+            directory, name = os.path.split(path)
+            if directory == 'VARIABLES':
+                names.add(name)
+        return names
 
     @measure_execution_time
-    def _copy_files_for_config_viewer(self):
+    def _create_config_viewer_host_directory(self):
         if os.path.exists(self.config_viewer_host_dir):
             shutil.rmtree(self.config_viewer_host_dir)
 
-        shutil.copytree(self.host_config_dir, self.config_viewer_host_dir, symlinks=True)
-        shutil.copytree(self.variables_dir, os.path.join(self.config_viewer_host_dir, 'VARIABLES'))
+        os.makedirs(self.config_viewer_host_dir)
 
     def _generate_patch_info(self):
         variables = filter(lambda name: name != 'SVNLOG' and name != 'OVERLAYING', os.listdir(self.variables_dir))
@@ -309,10 +393,17 @@ class HostRpmBuilder(object):
             self._write_file(os.path.join(self.variables_dir, segment.get_variable_name()), segment.get(self.hostname)[-1])
 
     def _save_file_list(self):
+        """ Writes the list of files of the rpm sources and remembers the paths of their
+            directories and files, so they are not walked again when creating the tar file. """
+
+        self.rpm_source_paths = []
         f = open(os.path.join(self.work_dir, 'filelist.' + self.hostname), 'w')
         try:
             for root, dirs, files in os.walk(self.host_config_dir):
+                for directory in dirs:
+                    self.rpm_source_paths.append(os.path.relpath(os.path.join(root, directory), self.host_config_dir))
                 for file in files:
+                    self.rpm_source_paths.append(os.path.relpath(os.path.join(root, file), self.host_config_dir))
                     f.write(os.path.join(root, file))
                     f.write("\n")
         finally:
@@ -324,24 +415,36 @@ class HostRpmBuilder(object):
         self.variables_dir = new_var_dir
 
     def _save_log_entries_to_variable(self, svn_paths):
-        svn_service = self._get_next_svn_service_from_queue()
         logs = []
         try:
             for svn_path in svn_paths:
-                for log_entry in svn_service.log(svn_path, self.revision, 5):
-                    logs.append(log_entry)
+                logs += self._get_log_entries(svn_path)
         except ClientError:
             pass
-        finally:
-            self.svn_service_queue.put(svn_service)
-            self.svn_service_queue.task_done()
 
         logs = sorted(logs, key=lambda log: log['revision'].number, reverse=True)
-        logs = logs[:5]
-        logs_text = [self._render_log(log) for log in logs]
+        logs = logs[:SVN_LOG_LIMIT]
+        logs_text = [self._render_log_entry(log) for log in logs]
         svn_log = "\n".join(logs_text)
         self._write_file(os.path.join(self.variables_dir, 'SVNLOG'), svn_log)
 
+    def _get_log_entries(self, svn_path):
+        if self.svn_log_cache:
+            return self.svn_log_cache.log(self.svn_service_queue, svn_path, self.revision, SVN_LOG_LIMIT)
+
+        svn_service = self._get_next_svn_service_from_queue()
+        try:
+            return svn_service.log(svn_path, self.revision, SVN_LOG_LIMIT)
+        finally:
+            self.svn_service_queue.put(svn_service)
+            self.svn_service_queue.task_done()
+
+    def _render_log_entry(self, log):
+        if self.svn_log_cache:
+            return self.svn_log_cache.render(log, self._render_log)
+
+        return self._render_log(log)
+
     def _save_overlaying_to_variable(self, exported_dict):
         overlaying = {}
         for segment in OVERLAY_ORDER:
@@ -389,45 +492,118 @@ Change set:
     def _get_next_svn_service_from_queue(self):
         return self.svn_service_queue.get()
 
+    def _overlay_segments(self):
+        """ Overlays the segments in overlay order and returns the result of each segment.
+            The shared segments are cloned from the overlay stage of the location and type
+            of the host if there is an overlay stage cache. """
+
+        shared_segments = OVERLAY_ORDER[:-1]
+        shared_svn_paths = [svn_path for segment in shared_segments for svn_path in segment.get_svn_paths(self.hostname)]
+
+        def overlay(segments):
+            if self.overlay_planner:
+                return self._overlay_planned_segments(segments)
+
+            return [(segment, self._overlay_segment(segment)) for segment in segments]
+
+        if self.overlay_stage_cache:
+            results = self.overlay_stage_cache.overlay(shared_svn_paths, self.host_config_dir, lambda: overlay(shared_segments))
+        else:
+            results = overlay(shared_segments)
+
+        self._get_variable_layer(shared_svn_paths)
+
+        return results + overlay(OVERLAY_ORDER[-1:])
+
     def _overlay_segment(self, segment):
         requires = []
         provides = []
         svn_base_paths = []
         exported_paths = []
         for svn_path in segment.get_svn_paths(self.hostname):
-            svn_service = self._get_next_svn_service_from_queue()
             try:
-                new_exported_paths = svn_service.export(svn_path, self.host_config_dir, self.revision)
-                exported_paths += new_exported_paths
-
+                exported_paths += self._export_svn_path(svn_path)
             except ClientError:
                 pass
-            finally:
-                self.svn_service_queue.put(svn_service)
-                self.svn_service_queue.task_done()
             svn_base_paths.append(svn_path)
             requires += self._parse_dependency_file(self.rpm_requires_path)
             provides += self._parse_dependency_file(self.rpm_provides_path)
 
         return svn_base_paths, exported_paths, requires, provides
 
+    def _overlay_planned_segments(self, segments):
+        """ Works like _overlay_segment for each of the segments, but does not write
+            files which are overridden by a later svn path of the segments. """
+
+        svn_paths = [svn_path for segment in segments for svn_path in segment.get_svn_paths(self.hostname)]
+        plan = self.overlay_planner.plan(self.svn_service_queue, svn_paths)
+
+        requires_before_overlay = self._parse_dependency_file(self.rpm_requires_path)
+        provides_before_overlay = self._parse_dependency_file(self.rpm_provides_path)
+
+        self.overlay_planner.overlay(self.svn_service_queue, plan, self.host_config_dir, self._export_svn_path)
+
+        results = []
+        for segment in segments:
+            requires = []
+            provides = []
+            svn_base_paths = []
+            exported_paths = []
+            for svn_path in segment.get_svn_paths(self.hostname):
+                exported_paths += plan.get_exported_paths(svn_path)
+                svn_base_paths.append(svn_path)
+                requires += self._parse_planned_dependency_file(plan, svn_path, self.rpm_requires_path, requires_before_overlay)
+                provides += self._parse_planned_dependency_file(plan, svn_path, self.rpm_provides_path, provides_before_overlay)
+
+            results.append((segment, (svn_base_paths, exported_paths, requires, provides)))
+
+        return results
+
+    def _parse_planned_dependency_file(self, plan, svn_path, path, dependencies_before_overlay):
+        """ Returns the dependencies of the file as it would have been after overlaying the svn path. """
+
+        relative_path = os.path.relpath(path, self.host_config_dir)
+        visible_svn_path = plan.get_visible_svn_path(relative_path, svn_path)
+
+        if visible_svn_path is None:
+            return dependencies_before_overlay
+
+        return self._parse_dependencies(self.overlay_planner.read(self.svn_service_queue, visible_svn_path, relative_path))
+
+    def _export_svn_path(self, svn_path):
+        if self.export_cache:
+            return self.export_cache.export(self.svn_service_queue, svn_path, self.host_config_dir, self.revision)
+
+        svn_service = self._get_next_svn_service_from_queue()
+        try:
+            return svn_service.export(svn_path, self.host_config_dir, self.revision)
+        finally:
+            self.svn_service_queue.put(svn_service)
+            self.svn_service_queue.task_done()
+
     def _parse_dependency_file(self, path):
         if os.path.exists(path):
             f = open(path)
             try:
-                content = f.read()
-                return [item for line in content.split('\n') for item in line.split(',')]
+                return self._parse_dependencies(f.read())
             finally:
                 f.close()
 
         return []
 
+    def _parse_dependencies(self, content):
+        return [item for line in content.split('\n') for item in line.split(',')]
+
     def _write_dependency_file(self, dependencies, file_path, collapse_duplicates=False, filter_regex='.*', positive_filter=True):
         dep = Dependency(collapse_dependencies=collapse_duplicates, filter_regex=filter_regex, positive_filter=positive_filter)
         dep.add(dependencies)
         self._write_file(file_path, dep.__repr__())
 
     def _write_file(self, file_path, content):
+        if os.path.dirname(file_path) == self.variables_dir:
+            self.written_variable_names.add(os.path.basename(file_path))
+
+        break_hard_link(file_path)
         f = open(file_path, 'w')
         try:
             f.write(content)
@@ -0,0 +1,223 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from logging import getLogger
+from os.path import dirname, join
+from threading import Lock
+
+from config_rpm_maker.utilities.filesystem import copy_file, ensure_directory_exists
+
+LOGGER = getLogger(__name__)
+
+# The dependencies of every svn path are collected, hence these files are never overridden.
+DEPENDENCY_FILES = ('VARIABLES/RPM_REQUIRES', 'VARIABLES/RPM_PROVIDES')
+
+
+class ConfigTree(object):
+    """ The files and directories of the config directory in one revision.
+        Directories are dictionaries mapping the names of their children to
+        their child nodes, files are represented by None. """
+
+    def __init__(self, listing):
+        self.root = {}
+
+        for path, is_directory in listing:
+            node = self.root
+            names = path.split('/')
+            for name in names[:-1]:
+                node = node.setdefault(name, {})
+
+            if is_directory:
+                node.setdefault(names[-1], {})
+            else:
+                node[names[-1]] = None
+
+    def list(self, svn_path):
+        """ Returns the paths below the directory svn_path relative to svn_path, each
+            together with True for directories and False for files. Returns None if
+            there is no directory svn_path. """
+
+        node = self.root
+        for name in svn_path.split('/'):
+            node = node.get(name)
+            if node is None:
+                return None
+
+        entries = []
+        self._list_node(node, '', entries)
+        return entries
+
+    def is_file(self, path):
+        node = self.root
+        for name in path.split('/'):
+            if not node or name not in node:
+                return False
+            node = node[name]
+
+        return node is None
+
+    def _list_node(self, node, prefix, entries):
+        for name in sorted(node.keys()):
+            path = prefix + name
+            child = node[name]
+            entries.append((path, child is not None))
+            if child:
+                self._list_node(child, path + '/', entries)
+
+
+def is_affected_by_change(config_tree, svn_paths, changed_path):
+    """ Returns True if the changed path is below one of the svn paths, unless it is
+        a file which is overridden by a later one of the svn paths. """
+
+    for index, svn_path in enumerate(svn_paths):
+        if changed_path == svn_path:
+            return True
+
+        if changed_path.startswith(svn_path + '/'):
+            relative_path = changed_path[len(svn_path) + 1:]
+            if relative_path in DEPENDENCY_FILES:
+                return True
+
+            return not any(config_tree.is_file(later_svn_path + '/' + relative_path) for later_svn_path in svn_paths[index + 1:])
+
+    return False
+
+
+class OverlayPlan(object):
+    """ The merged overlay manifest of the svn paths of a host. For every path it
+        knows which svn path wins, i.e. which one has been overlaid last. """
+
+    def __init__(self, config_tree, svn_paths):
+        self.svn_paths = list(svn_paths)
+        self.exported_paths = {}
+        self.winners = {}
+        self.versions = {}
+
+        for index, svn_path in enumerate(self.svn_paths):
+            entries = config_tree.list(svn_path)
+            self.exported_paths[svn_path] = entries
+
+            for path, is_directory in entries or []:
+                self.winners[path] = (svn_path, is_directory)
+                self.versions.setdefault(path, []).append(index)
+
+    def exists(self, svn_path):
+        return self.exported_paths[svn_path] is not None
+
+    def get_exported_paths(self, svn_path):
+        """ Returns the paths of the svn path like SvnService.export would. """
+
+        return [(svn_path, path) for path, _ in self.exported_paths[svn_path] or []]
+
+    def get_files(self, svn_path):
+        return [path for path, is_directory in self.exported_paths[svn_path] or [] if not is_directory]
+
+    def get_winning_files(self, svn_path):
+        return [path for path in self.get_files(svn_path) if self.winners[path] == (svn_path, False)]
+
+    def get_directories(self):
+        return sorted(path for path, (_, is_directory) in self.winners.items() if is_directory)
+
+    def is_shadowed(self, svn_path):
+        """ Returns True if a later svn path overrides files of the svn path. """
+
+        return len(self.get_winning_files(svn_path)) < len(self.get_files(svn_path))
+
+    def get_visible_svn_path(self, path, svn_path):
+        """ Returns the svn path providing path after svn_path has been overlaid or None. """
+
+        index_of_svn_path = self.svn_paths.index(svn_path)
+        visible_indices = [index for index in self.versions.get(path, []) if index <= index_of_svn_path]
+
+        if not visible_indices:
+            return None
+
+        return self.svn_paths[visible_indices[-1]]
+
+
+class OverlayPlanner(object):
+    """ Overlays the svn paths of a host without writing files which are
+        overridden by a later svn path anyway. The config directory is listed
+        once per revision, the resulting manifest tells which svn path wins
+        for each file. Svn paths whose files all win are exported as a whole,
+        otherwise the svn path is staged by the export cache (only once per
+        revision) and only its winning files are linked into the host
+        directories. """
+
+    def __init__(self, revision, export_cache, config_tree=None):
+        self.revision = revision
+        self.export_cache = export_cache
+        self.lock = Lock()
+        self.config_tree_lock = Lock()
+        self.config_tree = config_tree
+        self.count_of_linked_files = 0
+        self.count_of_skipped_files = 0
+
+    def plan(self, svn_service_queue, svn_paths):
+        """ Returns the overlay plan of the given svn paths in overlay order. """
+
+        return OverlayPlan(self._get_config_tree(svn_service_queue), svn_paths)
+
+    def overlay(self, svn_service_queue, plan, target_directory, export_svn_path):
+        """ Overlays the svn paths of the plan into the target directory. Svn paths
+            which are not shadowed are exported calling export_svn_path. """
+
+        for directory in plan.get_directories():
+            ensure_directory_exists(join(target_directory, directory))
+
+        for svn_path in plan.svn_paths:
+            if not plan.exists(svn_path):
+                continue
+
+            if not plan.is_shadowed(svn_path):
+                export_svn_path(svn_path)
+                continue
+
+            staged_directory = self.export_cache.get_directory(svn_service_queue, svn_path, self.revision)
+            winning_files = plan.get_winning_files(svn_path)
+            for path in winning_files:
+                target_path = join(target_directory, path)
+                ensure_directory_exists(dirname(target_path))
+                copy_file(join(staged_directory, path), target_path, link_file=True)
+
+            with self.lock:
+                self.count_of_linked_files += len(winning_files)
+                self.count_of_skipped_files += len(plan.get_files(svn_path)) - len(winning_files)
+
+    def read(self, svn_service_queue, svn_path, path):
+        """ Returns the content of the file path below the svn path. """
+
+        staged_directory = self.export_cache.get_directory(svn_service_queue, svn_path, self.revision)
+
+        with open(join(staged_directory, path)) as staged_file:
+            return staged_file.read()
+
+    def _get_config_tree(self, svn_service_queue):
+        with self.config_tree_lock:
+            if self.config_tree is None:
+                svn_service = svn_service_queue.get()
+                try:
+                    self.config_tree = ConfigTree(svn_service.list_config_tree(self.revision))
+                finally:
+                    svn_service_queue.put(svn_service)
+                    svn_service_queue.task_done()
+
+            return self.config_tree
+
+    def log_statistics(self, logging_function):
+        logging_function('Overlay planner summary: %d file(s) linked into host directories, %d overridden file(s) skipped.',
+                         self.count_of_linked_files, self.count_of_skipped_files)
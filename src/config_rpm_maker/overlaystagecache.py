@@ -0,0 +1,86 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from logging import getLogger
+from os.path import join
+from threading import Lock
+
+from config_rpm_maker.utilities.filesystem import copy_tree
+
+LOGGER = getLogger(__name__)
+
+
+class OverlayStageCacheEntry(object):
+    """ The overlay of the shared segments of one location and type. """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = Lock()
+        self.staged = False
+        self.results = []
+
+
+class OverlayStageCache(object):
+    """ Overlays the segments all, typ, loc and loctyp only once per location
+        and type while building the hosts of one revision. The first host
+        overlays the segments into its own directory, which is staged using
+        hard links. The other hosts get hard links to the staged files, so
+        everybody writing into a host directory has to break the hard link
+        of a file first (see utilities.filesystem.break_hard_link). """
+
+    def __init__(self, staging_directory):
+        self.staging_directory = staging_directory
+        self.lock = Lock()
+        self.entries = {}
+        self.count_of_overlays = 0
+        self.count_of_clones = 0
+
+    def overlay(self, svn_paths, target_directory, overlay_segments):
+        """ Calls overlay_segments to overlay the segments of the given svn paths into the
+            target directory, unless they have been staged already. Then the staged files
+            are linked into the target directory. Returns the results of overlay_segments. """
+
+        entry = self._get_entry(tuple(svn_paths))
+
+        with entry.lock:
+            if not entry.staged:
+                entry.results = overlay_segments()
+                copy_tree(target_directory, entry.directory, link_files=True)
+                entry.staged = True
+
+                with self.lock:
+                    self.count_of_overlays += 1
+
+                return list(entry.results)
+
+        copy_tree(entry.directory, target_directory, link_files=True)
+
+        with self.lock:
+            self.count_of_clones += 1
+
+        return list(entry.results)
+
+    def _get_entry(self, key):
+        with self.lock:
+            if key not in self.entries:
+                directory = join(self.staging_directory, str(len(self.entries)))
+                self.entries[key] = OverlayStageCacheEntry(directory)
+
+            return self.entries[key]
+
+    def log_statistics(self, logging_function):
+        logging_function('Overlay stage cache summary: %d overlay(s) of shared segments served %d clones.',
+                         self.count_of_overlays, self.count_of_clones)
@@ -0,0 +1,270 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import subprocess
+
+from logging import getLogger
+from os import environ, sysconf
+from os.path import getsize
+from Queue import Empty, Queue
+from threading import Lock, Thread
+from time import time
+
+from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+
+LOGGER = getLogger(__name__)
+
+# Put into the rpm queue after the last rpm has been built and into the chunk queue after the last chunk.
+END_OF_RPMS = None
+
+# Linux limits the length of a single argument (MAX_ARG_STRLEN), the shell gets the whole upload command as one argument.
+MAXIMUM_ARGUMENT_LENGTH = 128 * 1024
+
+# Used if the operating system does not tell the maximum length of the arguments and the environment.
+DEFAULT_ARG_MAX = 128 * 1024
+
+# Kept free for the arguments of the shell and alignment of the argument pointers.
+ARG_MAX_SAFETY_MARGIN = 4 * 1024
+
+MEBIBYTE = 1024 * 1024
+
+
+class CouldNotUploadRpmsException(BaseConfigRpmMakerException):
+    error_info = "Could not upload rpms!\n"
+
+
+def upload_rpm_chunk(rpm_upload_command, rpm_chunk):
+    """ Executes the upload command with the given rpms as arguments.
+        Raises a CouldNotUploadRpmsException if the command fails. """
+
+    cmd = '%s %s' % (rpm_upload_command, ' '.join(rpm_chunk))
+    process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    if process.returncode:
+        error_message = 'Rpm upload failed with exit code %s. Executed command "%s"\n' % (process.returncode, cmd)
+        if stdout:
+            error_message += 'stdout: "%s"\n' % stdout.strip()
+        if stderr:
+            error_message += 'stderr: "%s"\n' % stderr.strip()
+        raise CouldNotUploadRpmsException(error_message)
+
+
+def get_maximum_command_length():
+    """ Returns how long a command executed using the shell may be, which
+        is limited by ARG_MAX minus the size of the environment and by the
+        maximum length of a single argument. """
+
+    try:
+        arg_max = sysconf('SC_ARG_MAX')
+    except (ValueError, OSError):
+        arg_max = DEFAULT_ARG_MAX
+
+    if arg_max <= 0:
+        arg_max = DEFAULT_ARG_MAX
+
+    size_of_environment = sum(len(key) + len(value) + 2 for key, value in environ.items())
+    return min(arg_max - size_of_environment - ARG_MAX_SAFETY_MARGIN, MAXIMUM_ARGUMENT_LENGTH - 1)
+
+
+def split_into_chunks(rpms, chunk_size, maximum_chunk_bytes, maximum_arguments_length, get_size=None):
+    """ Splits the rpms into chunks of at most chunk_size rpms and maximum_chunk_bytes bytes,
+        where the rpms of a chunk joined by spaces are not longer than maximum_arguments_length.
+        A chunk_size or maximum_chunk_bytes of 0 means no limit. A rpm exceeding a limit on
+        its own is put into a chunk of its own. """
+
+    get_size = get_size or _get_size_of_rpm
+
+    chunks = []
+    chunk = []
+    chunk_bytes = 0
+    chunk_length = 0
+
+    for rpm in rpms:
+        size = get_size(rpm)
+        length = len(rpm) + (1 if chunk else 0)
+
+        if chunk and ((chunk_size and len(chunk) >= chunk_size)
+                      or (maximum_chunk_bytes and chunk_bytes + size > maximum_chunk_bytes)
+                      or chunk_length + length > maximum_arguments_length):
+            chunks.append(chunk)
+            chunk, chunk_bytes, chunk_length = [], 0, 0
+            length = len(rpm)
+
+        chunk.append(rpm)
+        chunk_bytes += size
+        chunk_length += length
+
+    if chunk:
+        chunks.append(chunk)
+
+    return chunks
+
+
+def _get_size_of_rpm(rpm):
+    try:
+        return getsize(rpm)
+    except OSError:
+        return 0
+
+
+class ParallelRpmUploader(object):
+    """ Uploads rpms running up to parallel_uploads upload commands at the same time.
+        The rpms are split into chunks by count, size in bytes and the length of the
+        command line. Once an upload failed no more chunks are uploaded. The latency
+        and throughput of each chunk are recorded. """
+
+    def __init__(self, rpm_upload_command, chunk_size, maximum_chunk_bytes=0, parallel_uploads=1):
+        self.rpm_upload_command = rpm_upload_command
+        self.chunk_size = chunk_size
+        self.maximum_chunk_bytes = maximum_chunk_bytes
+        self.parallel_uploads = parallel_uploads
+        self.maximum_arguments_length = get_maximum_command_length() - len(rpm_upload_command) - 1
+        self.lock = Lock()
+        self.chunk_queue = Queue()
+        self.upload_threads = []
+        self.uploaded_rpms = []
+        self.chunk_statistics = []
+        self.error = None
+
+    def upload(self, rpms):
+        """ Splits the rpms into chunks which are uploaded by the upload threads. Returns immediately. """
+
+        if not self.upload_threads:
+            self._start_upload_threads()
+
+        for rpm_chunk in split_into_chunks(rpms, self.chunk_size, self.maximum_chunk_bytes, self.maximum_arguments_length):
+            self.chunk_queue.put(rpm_chunk)
+
+    def finish(self):
+        """ Waits until all chunks have been uploaded. """
+
+        for _ in self.upload_threads:
+            self.chunk_queue.put(END_OF_RPMS)
+
+        for upload_thread in self.upload_threads:
+            upload_thread.join()
+
+    def _start_upload_threads(self):
+        for number in range(max(1, self.parallel_uploads)):
+            upload_thread = Thread(target=self._upload_chunks, name='RpmUpload-%d' % number)
+            upload_thread.daemon = True
+            upload_thread.start()
+            self.upload_threads.append(upload_thread)
+
+    def _upload_chunks(self):
+        while True:
+            rpm_chunk = self.chunk_queue.get()
+            if rpm_chunk is END_OF_RPMS:
+                return
+
+            if not self.error:
+                self._upload_chunk(rpm_chunk)
+
+    def _upload_chunk(self, rpm_chunk):
+        chunk_bytes = sum(_get_size_of_rpm(rpm) for rpm in rpm_chunk)
+        start_time = time()
+
+        try:
+            upload_rpm_chunk(self.rpm_upload_command, rpm_chunk)
+        except Exception as e:
+            LOGGER.error('Stopping to upload rpms: %s', str(e))
+            with self.lock:
+                if not self.error:
+                    self.error = e
+            return
+
+        elapsed_time_in_seconds = time() - start_time
+        LOGGER.debug('Uploaded %d rpm(s) with %d bytes in %.2fs (%.2f MiB/s).', len(rpm_chunk), chunk_bytes, elapsed_time_in_seconds,
+                     _get_throughput(chunk_bytes, elapsed_time_in_seconds))
+
+        with self.lock:
+            self.uploaded_rpms.extend(rpm_chunk)
+            self.chunk_statistics.append((len(rpm_chunk), chunk_bytes, elapsed_time_in_seconds))
+
+    def log_statistics(self, logging_function):
+        count_of_bytes = sum(chunk_bytes for _, chunk_bytes, _ in self.chunk_statistics)
+        elapsed_times = [elapsed_time_in_seconds for _, _, elapsed_time_in_seconds in self.chunk_statistics] or [0]
+
+        logging_function('Rpm upload summary: %d rpm(s) with %d bytes uploaded in %d chunk(s) using %d upload(s) at the same time, '
+                         'slowest chunk %.2fs, average %.2fs, %.2f MiB/s per chunk.',
+                         len(self.uploaded_rpms), count_of_bytes, len(self.chunk_statistics), max(1, self.parallel_uploads),
+                         max(elapsed_times), sum(elapsed_times) / len(elapsed_times), _get_throughput(count_of_bytes, sum(elapsed_times)))
+
+
+def _get_throughput(count_of_bytes, elapsed_time_in_seconds):
+    if not elapsed_time_in_seconds:
+        return 0.0
+    return count_of_bytes / elapsed_time_in_seconds / MEBIBYTE
+
+
+class RpmUploader(ParallelRpmUploader):
+    """ Uploads the rpms while the hosts are still being built. The rpms are taken from
+        the rpm queue and uploaded as soon as chunk_size rpms are ready or time_window
+        seconds have passed since the first rpm of the chunk has been taken. A chunk_size
+        of 0 uploads the rpms only when the time window expires or the build has finished. """
+
+    def __init__(self, rpm_upload_command, chunk_size, time_window, maximum_chunk_bytes=0, parallel_uploads=1):
+        super(RpmUploader, self).__init__(rpm_upload_command, chunk_size, maximum_chunk_bytes, parallel_uploads)
+        self.time_window = time_window
+        self.rpm_queue = None
+        self.thread = None
+        self.rpms = []
+        self.taken_rpms = set()
+
+    def start(self, rpm_queue):
+        """ Starts to take the rpms from the given queue in a separate thread. """
+
+        self.rpm_queue = rpm_queue
+        self.thread = Thread(target=self._upload_while_building, name='RpmUploader')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def finish(self):
+        """ Uploads the remaining rpms after the last host has been built and waits until they have been uploaded. """
+
+        self.rpm_queue.put(END_OF_RPMS)
+        self.thread.join()
+        super(RpmUploader, self).finish()
+
+    def _upload_while_building(self):
+        rpm_chunk = []
+        deadline = None
+
+        while True:
+            try:
+                rpm = self.rpm_queue.get(timeout=None if deadline is None else max(0, deadline - time()))
+                self.rpm_queue.task_done()
+            except Empty:
+                self.upload(rpm_chunk)
+                rpm_chunk, deadline = [], None
+                continue
+
+            if rpm is END_OF_RPMS:
+                self.upload(rpm_chunk)
+                return
+
+            if rpm in self.taken_rpms:
+                continue
+
+            self.taken_rpms.add(rpm)
+            self.rpms.append(rpm)
+            rpm_chunk.append(rpm)
+            if deadline is None:
+                deadline = time() + self.time_window
+
+            if len(rpm_chunk) == self.chunk_size:
+                self.upload(rpm_chunk)
+                rpm_chunk, deadline = [], None
@@ -28,6 +28,9 @@ class HostnameSegment(object):
     def get_svn_paths(self, hostname):
         return [self.get_svn_prefix() + part for part in self.get(hostname)]
 
+    def get_svn_root_path(self):
+        return self.get_svn_prefix()
+
     def get_variable_name(self):
         return self.__class__.__name__.upper()
 
@@ -40,6 +43,9 @@ class All(HostnameSegment):
     def get_svn_prefix(self):
         return ''
 
+    def get_svn_root_path(self):
+        return 'all'
+
 
 class Typ(HostnameSegment):
 
@@ -0,0 +1,160 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from logging import getLogger
+from os import listdir, lstat, makedirs, rename, utime, walk
+from os.path import exists, getmtime, isdir, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Lock
+from urllib import quote
+
+from config_rpm_maker.utilities.filesystem import copy_tree
+
+LOGGER = getLogger(__name__)
+
+MANIFEST_FILE_NAME = 'exported-paths'
+SIZE_FILE_NAME = 'size'
+TREE_DIRECTORY_NAME = 'tree'
+TEMPORARY_DIRECTORY_PREFIX = '.incomplete-'
+
+
+class SegmentTreeCache(object):
+    """ Keeps exported segment trees on disk across runs. A tree is identified
+        by its svn path and the revision in which it has been changed last,
+        so it will be exported again only after somebody committed a change
+        below the svn path. When the cache grows beyond maximum_size the least
+        recently used trees are removed. """
+
+    def __init__(self, directory, maximum_size):
+        self.directory = directory
+        self.maximum_size = maximum_size
+        self.lock = Lock()
+        self.count_of_hits = 0
+        self.count_of_misses = 0
+
+        if not exists(self.directory):
+            makedirs(self.directory)
+
+    def export(self, svn_service, svn_path, target_directory, revision):
+        """ Works like SvnService.export, but copies the tree from the cache if the
+            svn path has not been changed since it has been exported the last time. """
+
+        last_changed_revision = svn_service.get_last_changed_revision_of_directory(svn_path, revision)
+
+        if last_changed_revision is None:
+            return svn_service.export_without_cache(svn_path, target_directory, revision)
+
+        entry_directory = self._get_entry_directory(svn_path, last_changed_revision)
+
+        if exists(join(entry_directory, MANIFEST_FILE_NAME)):
+            try:
+                exported_paths = self._copy_entry(entry_directory, target_directory)
+                self._count(hit=True)
+                LOGGER.debug('Copied "%s" (last changed in revision %s) from segment tree cache.', svn_path, last_changed_revision)
+                return [(svn_path, path) for path in exported_paths]
+            except (IOError, OSError) as e:
+                LOGGER.warn('Could not copy "%s" from segment tree cache: %s', svn_path, str(e))
+
+        self._count(hit=False)
+        exported_paths = self._add_entry(svn_service, svn_path, revision, entry_directory)
+        copy_tree(join(entry_directory, TREE_DIRECTORY_NAME), target_directory)
+        self._evict_least_recently_used_entries()
+
+        return [(svn_path, path) for path in exported_paths]
+
+    def _get_entry_directory(self, svn_path, last_changed_revision):
+        return join(self.directory, '%s@%s' % (quote(svn_path, safe=''), last_changed_revision))
+
+    def _copy_entry(self, entry_directory, target_directory):
+        utime(entry_directory, None)
+        copy_tree(join(entry_directory, TREE_DIRECTORY_NAME), target_directory)
+
+        with open(join(entry_directory, MANIFEST_FILE_NAME)) as manifest_file:
+            return manifest_file.read().splitlines()
+
+    def _add_entry(self, svn_service, svn_path, revision, entry_directory):
+        """ Exports the svn path into a temporary directory which is renamed to the entry
+            directory when it is complete, so other runs never see a partial tree. """
+
+        temporary_directory = mkdtemp(prefix=TEMPORARY_DIRECTORY_PREFIX, dir=self.directory)
+        try:
+            exported = svn_service.export_without_cache(svn_path, join(temporary_directory, TREE_DIRECTORY_NAME), revision)
+            exported_paths = [path for _, path in exported]
+
+            with open(join(temporary_directory, MANIFEST_FILE_NAME), 'w') as manifest_file:
+                manifest_file.write(''.join(path + '\n' for path in exported_paths))
+
+            with open(join(temporary_directory, SIZE_FILE_NAME), 'w') as size_file:
+                size_file.write(str(_get_size_of_tree(join(temporary_directory, TREE_DIRECTORY_NAME))))
+
+            if exists(entry_directory):
+                rmtree(temporary_directory)
+            else:
+                rename(temporary_directory, entry_directory)
+
+        except:
+            rmtree(temporary_directory, ignore_errors=True)
+            raise
+
+        return exported_paths
+
+    def _evict_least_recently_used_entries(self):
+        with self.lock:
+            entries = []
+            for entry_name in listdir(self.directory):
+                entry_directory = join(self.directory, entry_name)
+                if entry_name.startswith(TEMPORARY_DIRECTORY_PREFIX) or not isdir(entry_directory):
+                    continue
+
+                try:
+                    entries.append((getmtime(entry_directory), _read_size(entry_directory), entry_directory))
+                except (IOError, OSError, ValueError):
+                    continue
+
+            size_of_cache = sum(size for _, size, _ in entries)
+
+            for _, size, entry_directory in sorted(entries):
+                if size_of_cache <= self.maximum_size:
+                    break
+
+                LOGGER.debug('Removing least recently used "%s" from segment tree cache.', entry_directory)
+                rmtree(entry_directory, ignore_errors=True)
+                size_of_cache -= size
+
+    def _count(self, hit):
+        with self.lock:
+            if hit:
+                self.count_of_hits += 1
+            else:
+                self.count_of_misses += 1
+
+    def log_statistics(self, logging_function):
+        logging_function('Segment tree cache summary: %d tree(s) copied from cache, %d tree(s) exported.',
+                         self.count_of_hits, self.count_of_misses)
+
+
+def _read_size(entry_directory):
+    with open(join(entry_directory, SIZE_FILE_NAME)) as size_file:
+        return int(size_file.read())
+
+
+def _get_size_of_tree(directory):
+    size = 0
+    for root, directory_names, file_names in walk(directory):
+        for file_name in file_names:
+            size += lstat(join(root, file_name)).st_size
+    return size
@@ -0,0 +1,117 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from logging import getLogger
+from threading import Lock
+
+LOGGER = getLogger(__name__)
+
+
+class SvnLogCacheEntry(object):
+    """ The result of requesting the log of one svn path. """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.requested = False
+        self.log_entries = []
+        self.error = None
+
+
+class SvnLogCache(object):
+    """ Requests the log of each svn path only once while building the hosts.
+        Most svn paths (e.g. all, typ/web) are shared by a lot of hosts, hence
+        the hosts get the log entries from memory instead of the svn server. """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.entries = {}
+        self.rendered_log_entries = {}
+        self.count_of_requests = 0
+        self.count_of_lookups = 0
+
+    def log(self, svn_service_queue, svn_path, revision, limit):
+        """ Works like SvnService.log, but takes a svn service from the given queue only
+            if the log has not been requested yet. Raises the error of the first request
+            again if the request failed. """
+
+        entry = self._get_entry(svn_path, revision, limit)
+
+        with entry.lock:
+            if not entry.requested:
+                svn_service = svn_service_queue.get()
+                try:
+                    self._request_entry(entry, svn_service, svn_path, revision, limit)
+                finally:
+                    svn_service_queue.put(svn_service)
+                    svn_service_queue.task_done()
+
+        with self.lock:
+            self.count_of_lookups += 1
+
+        if entry.error:
+            raise entry.error
+
+        return list(entry.log_entries)
+
+    def prefetch(self, svn_service_queue, svn_paths, revision, limit):
+        """ Requests the logs of the given svn paths one after another using one svn
+            service, so the build threads find the logs of shared paths in memory. """
+
+        svn_service = svn_service_queue.get()
+        try:
+            for svn_path in svn_paths:
+                entry = self._get_entry(svn_path, revision, limit)
+                with entry.lock:
+                    if not entry.requested:
+                        self._request_entry(entry, svn_service, svn_path, revision, limit)
+        finally:
+            svn_service_queue.put(svn_service)
+            svn_service_queue.task_done()
+
+    def render(self, log_entry, render_function):
+        """ Renders each log entry only once, since the same revisions show up in the logs of a lot of svn paths. """
+
+        revision_number = log_entry['revision'].number
+
+        with self.lock:
+            if revision_number not in self.rendered_log_entries:
+                self.rendered_log_entries[revision_number] = render_function(log_entry)
+
+            return self.rendered_log_entries[revision_number]
+
+    def _get_entry(self, svn_path, revision, limit):
+        key = (svn_path, revision, limit)
+
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = SvnLogCacheEntry()
+
+            return self.entries[key]
+
+    def _request_entry(self, entry, svn_service, svn_path, revision, limit):
+        try:
+            entry.log_entries = svn_service.log(svn_path, revision, limit)
+        except Exception as e:
+            entry.error = e
+        finally:
+            entry.requested = True
+
+        with self.lock:
+            self.count_of_requests += 1
+
+    def log_statistics(self, logging_function):
+        logging_function('Svn log cache summary: %d svn log request(s) served %d lookups.',
+                         self.count_of_requests, self.count_of_lookups)
@@ -0,0 +1,58 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from config_rpm_maker.segment import OVERLAY_ORDER
+
+# Key of the host set within a trie node, can not clash with the single characters used as keys for child nodes.
+HOSTS = None
+
+
+class SvnPathIndex(object):
+    """ Maps the svn paths of the segments to the hosts which are using them.
+        The svn paths are stored in a character trie, so the hosts affected by
+        a changed path are found by walking along the characters of the changed
+        path once, instead of comparing it with the svn paths of every host. """
+
+    def __init__(self, hosts, segments=OVERLAY_ORDER):
+        self.root = {}
+
+        for host in hosts:
+            for segment in segments:
+                for svn_path in segment.get_svn_paths(host):
+                    self._add(svn_path, host)
+
+    def _add(self, svn_path, host):
+        node = self.root
+        for character in svn_path:
+            node = node.setdefault(character, {})
+
+        node.setdefault(HOSTS, set()).add(host)
+
+    def get_affected_hosts(self, changed_path):
+        """ Returns the set of hosts using a svn path the changed path starts with. """
+
+        affected_hosts = set()
+        node = self.root
+
+        for character in changed_path:
+            node = node.get(character)
+            if node is None:
+                break
+
+            if HOSTS in node:
+                affected_hosts |= node[HOSTS]
+
+        return affected_hosts
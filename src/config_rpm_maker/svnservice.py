@@ -16,10 +16,14 @@
 
 import pysvn
 import os
+import sys
 
+from functools import wraps
 from logging import getLogger
+from Queue import Queue
+from threading import Lock
+from time import ctime, time
 
-from time import ctime
 from config_rpm_maker.utilities.logutils import log_elements_of_list
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
 from config_rpm_maker.utilities.profiler import measure_execution_time
@@ -27,24 +31,130 @@ from config_rpm_maker.utilities.profiler import measure_execution_time
 LOGGER = getLogger(__name__)
 
 HOST_NAME_ENCODING = 'ascii'
+PATH_ENCODING = 'utf-8'
 PYSVN_DELETE_ACTION = 'D'
+# A replaced path has been deleted and added again in the same commit.
+PYSVN_ADDING_OR_DELETING_ACTIONS = ('A', PYSVN_DELETE_ACTION, 'R')
+
+# After this many failed calls in a row a svn service has to prove that it can still reach the repository.
+MAXIMUM_CONSECUTIVE_FAILURES = 5
+
+# Subversion groups its error codes in categories of this size.
+SVN_ERROR_CATEGORY_SIZE = 5000
+# Categories of the repository access layers: ra, ra_dav, ra_local, ra_svn and ra_serf.
+SVN_REPOSITORY_ACCESS_ERROR_CATEGORIES = (170000, 175000, 180000, 210000, 230000)
+# Repository access errors which only say that the requested url or path does not exist.
+SVN_PATH_NOT_FOUND_ERRORS = (170000, 175007)
+# Codes below this one are errors of the operating system like "connection refused".
+SVN_FIRST_ERROR_CODE = 120000
+# Codes starting with this one are address resolution errors.
+APR_FIRST_RESOLVER_ERROR_CODE = 670000
 
 
 class SvnServiceException(BaseConfigRpmMakerException):
     error_info = "SVN Service error:\n"
 
 
+def _is_connection_error(client_error):
+    """ Returns True if one of the svn error codes of the given pysvn client error
+        says that the repository could not be reached. Errors like a path that does
+        not exist in a revision are expected answers of the repository. """
+
+    if len(client_error.args) < 2:
+        return False
+
+    for _, code in client_error.args[1]:
+        if code < SVN_FIRST_ERROR_CODE or code >= APR_FIRST_RESOLVER_ERROR_CODE:
+            return True
+
+        category = code - code % SVN_ERROR_CATEGORY_SIZE
+        if category in SVN_REPOSITORY_ACCESS_ERROR_CATEGORIES and code not in SVN_PATH_NOT_FOUND_ERRORS:
+            return True
+
+    return False
+
+
+def record_statistics(original_function):
+    """ Counts the calls, failures and the time spent in the decorated method of a svn service.
+        Raises pysvn client errors with their message only, as they would be raised without error codes. """
+
+    @wraps(original_function)
+    def wrapped_function(svn_service, *args, **kwargs):
+        start_time = time()
+        try:
+            return_value = original_function(svn_service, *args, **kwargs)
+        except pysvn.ClientError as e:
+            traceback = sys.exc_info()[2]
+            svn_service._record_call(time() - start_time, failed=True, connection_failed=_is_connection_error(e))
+            raise pysvn.ClientError, pysvn.ClientError(_get_error_message(e)), traceback
+        except Exception:
+            svn_service._record_call(time() - start_time, failed=True)
+            raise
+
+        svn_service._record_call(time() - start_time, failed=False)
+        return return_value
+
+    return wrapped_function
+
+
 class SvnService(object):
 
-    def __init__(self, base_url, username=None, password=None, path_to_config='/config'):
+    def __init__(self, base_url, username=None, password=None, path_to_config='/config', segment_tree_cache=None):
         self.path_to_config = path_to_config
         self.base_url = base_url
         self.config_url = base_url + path_to_config
+        self.username = username
+        self.password = password
+        self.segment_tree_cache = segment_tree_cache
+        self.change_set_lock = Lock()
+        self.change_sets = {}
+        self.count_of_calls = 0
+        self.count_of_failures = 0
+        self.consecutive_failures = 0
+        self.elapsed_time_in_seconds = 0
         LOGGER.info('Configuration repository is "%s".', self.config_url)
         self._initialize_pysvn_client(username, password)
 
+    def clone(self):
+        """ Returns a new svn service for the same repository which uses its own pysvn client. """
+
+        return SvnService(base_url=self.base_url,
+                          username=self.username,
+                          password=self.password,
+                          path_to_config=self.path_to_config,
+                          segment_tree_cache=self.segment_tree_cache)
+
+    def is_healthy(self):
+        """ Returns True as long as the recent calls did not fail to reach the repository in a row. Otherwise it
+            checks if the repository can still be reached using the pysvn client. """
+
+        if self.consecutive_failures < MAXIMUM_CONSECUTIVE_FAILURES:
+            return True
+
+        try:
+            self.client.info2(self.config_url, revision=pysvn.Revision(pysvn.opt_revision_kind.head), recurse=False)
+        except Exception as e:
+            LOGGER.warn('%s could not reach repository after %d failed calls in a row: %s', self, self.consecutive_failures, _get_error_message(e))
+            return False
+
+        self.consecutive_failures = 0
+        return True
+
+    def _record_call(self, elapsed_time_in_seconds, failed, connection_failed=False):
+        self.count_of_calls += 1
+        self.elapsed_time_in_seconds += elapsed_time_in_seconds
+
+        if failed:
+            self.count_of_failures += 1
+
+        if connection_failed:
+            self.consecutive_failures += 1
+        elif not failed:
+            self.consecutive_failures = 0
+
     def _initialize_pysvn_client(self, username, password):
         self.client = pysvn.Client()
+        self.client.exception_style = 1
         self.client.set_auth_cache(True)
 
         if username:
@@ -67,15 +177,23 @@ class SvnService(object):
             LOGGER.info('Commit message is "%s" (%s, %s)', info.message.strip(), author, ctime(info.date))
 
     def get_logs_for_revision(self, revision):
-        """ Returns the logs for the given revision of the repository at the config_url """
+        """ Returns the logs for the given revision of the repository at the config_url.
+            The logs are requested only once per revision and kept in memory afterwards. """
 
+        with self.change_set_lock:
+            if int(revision) not in self.change_sets:
+                self.change_sets[int(revision)] = self._request_logs_for_revision(revision)
+
+            return self.change_sets[int(revision)]
+
+    def _request_logs_for_revision(self, revision):
         try:
             logs = self.client.log(self.config_url, self._rev(revision), self._rev(revision),
                                    discover_changed_paths=True)
         except Exception as e:
             LOGGER.error('Retrieving change set information for revision "%s" in repository "%s" failed.',
                          revision, self.config_url)
-            raise SvnServiceException(str(e))
+            raise SvnServiceException(_get_error_message(e))
         return logs
 
     def get_changed_paths_with_action(self, revision):
@@ -99,6 +217,13 @@ class SvnService(object):
 
         return [element[0] for element in paths_with_action if element[1] == PYSVN_DELETE_ACTION]
 
+    def get_added_or_deleted_paths(self, revision):
+        """ Returns all paths which have been added, deleted or replaced in the given revision """
+
+        paths_with_action = self.get_changed_paths_with_action(revision)
+
+        return [element[0] for element in paths_with_action if element[1] in PYSVN_ADDING_OR_DELETING_ACTIONS]
+
     @measure_execution_time
     def get_changed_paths(self, revision):
         """ Returns the list of all changed paths from the change set with the given revision """
@@ -115,6 +240,7 @@ class SvnService(object):
         return changed_paths
 
     @measure_execution_time
+    @record_statistics
     def get_hosts(self, revision):
         url = self.config_url + '/host'
 
@@ -126,8 +252,31 @@ class SvnService(object):
         repos_paths = [item[0].repos_path.encode(HOST_NAME_ENCODING) for item in items]
         return [os.path.basename(repos_path) for repos_path in repos_paths]
 
+    @measure_execution_time
+    @record_statistics
+    def list_config_tree(self, revision):
+        """ Returns the path of every file and directory below the config_url relative to
+            the config_url, together with True for directories and False for files. """
+
+        items = self.client.list(self.config_url, revision=self._rev(revision), depth=pysvn.depth.infinity)
+
+        # remove first item, which is the config directory itself
+        items = items[1:]
+
+        start_pos = len(self.path_to_config + '/')
+        return [(_encode_path(item[0].repos_path[start_pos:]), item[0].kind == pysvn.node_kind.dir) for item in items]
+
     @measure_execution_time
     def export(self, svn_path, target_dir, revision):
+        """ Exports the svn path into the target directory. Uses the segment tree cache if there is one. """
+
+        if self.segment_tree_cache:
+            return self.segment_tree_cache.export(self, svn_path, target_dir, revision)
+
+        return self.export_without_cache(svn_path, target_dir, revision)
+
+    @record_statistics
+    def export_without_cache(self, svn_path, target_dir, revision):
         url = self._get_url(svn_path)
 
         self.exported_files = []
@@ -141,7 +290,20 @@ class SvnService(object):
 
         return [(svn_path, path) for path in normalized_paths]
 
+    @record_statistics
+    def get_last_changed_revision_of_directory(self, svn_path, revision):
+        """ Returns the revision in which the directory has been changed last or None if the svn path is not a directory. """
+
+        url = self._get_url(svn_path)
+        _, info = self.client.info2(url, revision=self._rev(revision), recurse=False)[0]
+
+        if info.kind != pysvn.node_kind.dir:
+            return None
+
+        return info.last_changed_rev.number
+
     @measure_execution_time
+    @record_statistics
     def log(self, svn_path, revision, limit=0):
         url = self._get_url(svn_path)
         return self.client.log(url, pysvn.Revision(pysvn.opt_revision_kind.head), self._rev(revision), discover_changed_paths=True, limit=limit)
@@ -161,3 +323,66 @@ class SvnService(object):
 
     def __str__(self):
         return '{0}(base_url="{1}", path_to_config="{2}")'.format(SvnService.__name__, self.base_url, self.path_to_config)
+
+
+def _get_error_message(exception):
+    if isinstance(exception, pysvn.ClientError) and exception.args:
+        return str(exception.args[0])
+    return str(exception)
+
+
+def _encode_path(path):
+    if isinstance(path, unicode):
+        return path.encode(PATH_ENCODING)
+    return path
+
+
+class SvnServicePool(object):
+    """ A pool of svn services where each service uses its own pysvn client,
+        so the build threads do not have to wait for each other when
+        exporting or logging. The pool offers the get/put/task_done methods
+        of a queue, hence it can be used as svn_service_queue. """
+
+    def __init__(self, svn_service, size):
+        self.lock = Lock()
+        self.queue = Queue()
+        self.svn_services = [svn_service] + [svn_service.clone() for _ in range(size - 1)]
+        self.retired_svn_services = []
+
+        for pooled_svn_service in self.svn_services:
+            self.queue.put(pooled_svn_service)
+
+    def get(self):
+        """ Returns the next available svn service, replacing it if it is not healthy anymore. """
+
+        svn_service = self.queue.get()
+
+        if not svn_service.is_healthy():
+            svn_service = self._replace(svn_service)
+
+        return svn_service
+
+    def put(self, svn_service):
+        self.queue.put(svn_service)
+
+    def task_done(self):
+        self.queue.task_done()
+
+    def _replace(self, unhealthy_svn_service):
+        LOGGER.warn('Replacing unhealthy %s with a new svn client.', unhealthy_svn_service)
+        replacement = unhealthy_svn_service.clone()
+
+        with self.lock:
+            self.svn_services[self.svn_services.index(unhealthy_svn_service)] = replacement
+            self.retired_svn_services.append(unhealthy_svn_service)
+
+        return replacement
+
+    def log_statistics(self, logging_function):
+        """ Logs how many calls each pooled svn client performed, how many of them failed and how long they took. """
+
+        logging_function('Svn client pool summary (%d client(s), %d replaced):', len(self.svn_services), len(self.retired_svn_services))
+
+        for number, svn_service in enumerate(self.svn_services + self.retired_svn_services):
+            logging_function('    client #%d: %5d calls, %5d failed, sum %7.2fs',
+                             number, svn_service.count_of_calls, svn_service.count_of_failures, svn_service.elapsed_time_in_seconds)
@@ -18,6 +18,7 @@ from logging import getLogger
 
 from config_rpm_maker.utilities.logutils import verbose
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+from config_rpm_maker.utilities.graph import find_strongly_connected_components
 
 LOGGER = getLogger(__name__)
 
@@ -43,11 +44,14 @@ class TokenCycleChecking(object):
         self.edges = edges
 
     def assert_no_cycles_present(self):
+        """ Raises a ContainsCyclesException if the graph contains cycles. Otherwise it returns
+            the strongly connected components of the graph, which all contain exactly one node.
+            A node is always returned after the nodes it has edges to. """
 
         verbose(LOGGER).debug('Checking that graph %s has no cycles.', self.edges)
 
         cycles = []
-        components = tarjan_scc(self.edges)
+        components = find_strongly_connected_components(self.edges)
         for component in components:
             if len(component) > 1:
                 cycles.append(component)
@@ -61,46 +65,5 @@ class TokenCycleChecking(object):
                 error_message += "These variables form a cycle : " + str(cycle) + "\n"
             raise ContainsCyclesException(error_message)
 
+        return components
 
-def tarjan_scc(graph):
-    """ Tarjan's partitioning algorithm for finding strongly connected components in a graph. """
-
-    index_counter = [0]
-    stack = []
-    lowlinks = {}
-    index = {}
-    result = []
-
-    def strongconnect(node):
-        index[node] = index_counter[0]
-        lowlinks[node] = index_counter[0]
-        index_counter[0] += 1
-        stack.append(node)
-
-        try:
-            successors = graph[node]
-        except:
-            successors = []
-        for successor in successors:
-            if successor not in lowlinks:
-                strongconnect(successor)
-                lowlinks[node] = min(lowlinks[node], lowlinks[successor])
-            elif successor in stack:
-                lowlinks[node] = min(lowlinks[node], index[successor])
-
-        if lowlinks[node] == index[node]:
-            connected_component = []
-
-            while True:
-                successor = stack.pop()
-                connected_component.append(successor)
-                if successor == node:
-                    break
-            component = tuple(connected_component)
-            result.append(component)
-
-    for node in graph:
-        if node not in lowlinks:
-            strongconnect(node)
-
-    return result
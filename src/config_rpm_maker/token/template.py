@@ -0,0 +1,115 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+    Templates of file contents. The files below all, typ and loc are identical
+    for a lot of hosts, hence every distinct content is parsed only once into
+    literal chunks and token slots, which are cached by the digest of the content.
+    The rendered output is cached as well, since a lot of hosts use the same
+    values for the tokens of a shared file.
+"""
+
+import re
+
+from hashlib import sha1
+from threading import Lock
+
+from config_rpm_maker.configuration.properties import get_rendered_output_cache_size, get_template_cache_size
+from config_rpm_maker.utilities.lrucache import LruCache
+
+TOKEN_PATTERN = re.compile(r"@@@([A-Za-z0-9_-]*)@@@")
+
+
+class Template(object):
+    """ A content split into literal chunks and token slots. """
+
+    def __init__(self, content, key=None):
+        self.key = key
+        # the chunks hold the whole content, so its size accounts for the size of the template
+        self.size = _get_size_in_bytes(content)
+        # splitting by a pattern with a group alternates literal chunks and token names
+        self.chunks = TOKEN_PATTERN.split(content)
+        self.token_names = []
+
+        for token_name in self.chunks[1::2]:
+            if token_name not in self.token_names:
+                self.token_names.append(token_name)
+
+    def render(self, replacements):
+        """ Joins the literal chunks with the replacements of the tokens. """
+
+        chunks = list(self.chunks)
+        chunks[1::2] = [replacements[token_name] for token_name in chunks[1::2]]
+        return ''.join(chunks)
+
+
+_template_cache = None
+_template_cache_lock = Lock()
+_rendered_output_cache = None
+_rendered_output_cache_lock = Lock()
+
+
+def get_template(content):
+    """ Returns the template of the given byte or unicode string. """
+
+    if isinstance(content, unicode):
+        key = (unicode, sha1(content.encode('utf-8')).digest())
+    else:
+        key = (str, sha1(content).digest())
+
+    return _get_template_cache().get(key, lambda: Template(content, key))
+
+
+def render_template(template, replacements):
+    """ Renders the template or returns the output of a former rendering
+        of the template which used the same replacements. """
+
+    if template.key is None:
+        return template.render(replacements)
+
+    # the output contains every replacement, so the size of the output accounts for the key as well
+    key = (template.key, tuple(replacements[token_name] for token_name in template.token_names))
+    return _get_rendered_output_cache().get(key, lambda: template.render(replacements))
+
+
+def _get_template_cache():
+    global _template_cache
+
+    with _template_cache_lock:
+        if _template_cache is None:
+            _template_cache = LruCache('templates', get_template_cache_size(), get_size=lambda template: template.size)
+
+        return _template_cache
+
+
+def _get_rendered_output_cache():
+    global _rendered_output_cache
+
+    with _rendered_output_cache_lock:
+        if _rendered_output_cache is None:
+            _rendered_output_cache = LruCache('rendered output', get_rendered_output_cache_size(), get_size=_get_size_in_bytes)
+
+        return _rendered_output_cache
+
+
+def _get_size_in_bytes(content):
+    """ Returns the size of unicode content encoded as utf-8, not its count of characters. """
+
+    if isinstance(content, unicode):
+        return len(content.encode('utf-8'))
+
+    return len(content)
@@ -15,22 +15,27 @@
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import cgi
-import re
 import os
 
+from copy import copy
 from logging import getLogger
 from os.path import getsize
-
-import config_rpm_maker.utilities.magic
+from shutil import copymode
 
 from config_rpm_maker.configuration.properties import get_max_file_size
+from config_rpm_maker.utilities.encoding import detect_encoding
+from config_rpm_maker.utilities.filesystem import break_hard_link
 from config_rpm_maker.utilities.logutils import verbose
-from config_rpm_maker.token.cycle import TokenCycleChecking
+from config_rpm_maker.token.cycle import ContainsCyclesException, TokenCycleChecking
+from config_rpm_maker.token.template import TOKEN_PATTERN, get_template, render_template
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
 
 
 LOGGER = getLogger(__name__)
 
+# Encodings (as detected by libmagic) besides iso-8859-x in which tokens can be replaced without decoding the content.
+ASCII_COMPATIBLE_ENCODINGS = ('us-ascii', 'utf-8')
+
 
 class MissingOrRedundantTokenException(BaseConfigRpmMakerException):
     error_info = """Could not replace some token(s)"
@@ -78,13 +83,19 @@ class FileLimitExceededException(BaseConfigRpmMakerException):
         return 'The file "%s" (%d bytes) is bigger than the allowed file size %d bytes.' % (self.path, getsize(self.path), self.size_limit)
 
 
+def is_ascii_compatible(encoding):
+    """ Returns True if the ascii characters are encoded as single bytes by the encoding. """
+
+    return encoding in ASCII_COMPATIBLE_ENCODINGS or encoding.startswith('iso-8859-')
+
+
 class TokenReplacer(object):
     """ Class that replaces tokens in strings.
 
         The general syntax is
             @@@TOKEN@@@ """
 
-    TOKEN_PATTERN = re.compile(r"@@@([A-Za-z0-9_-]*)@@@")
+    TOKEN_PATTERN = TOKEN_PATTERN
 
     @classmethod
     def filter_directory(cls,
@@ -110,25 +121,35 @@ class TokenReplacer(object):
         return token_replacer
 
     @classmethod
-    def from_directory(cls, directory, replacer_function=None, html_escape_function=None):
+    def from_directory(cls, directory, replacer_function=None, html_escape_function=None, token_values=None, resolved_token_values=None, lazy=False):
+        """ Reads the token values from the files within the directory. Files named like one of the
+            given token_values or resolved_token_values are not read, the given values are used instead. """
+
         LOGGER.debug("Initializing token replacer of class %s from directory %s", cls.__name__, directory)
 
-        token_values = {}
+        token_values = dict(token_values or {})
+        resolved_token_values = resolved_token_values or {}
         absolute_path = os.path.abspath(directory)
 
         for name in os.listdir(absolute_path):
+            if name in token_values or name in resolved_token_values:
+                continue
+
             candidate = os.path.join(absolute_path, name)
             if os.path.isfile(candidate):
                 with open(candidate) as property_file:
                     token_values[name] = property_file.read().strip()
 
-        return cls(token_values=token_values, replacer_function=replacer_function, html_escape_function=html_escape_function)
+        return cls(token_values=token_values, replacer_function=replacer_function, html_escape_function=html_escape_function,
+                   resolved_token_values=resolved_token_values, lazy=lazy)
+
+    def __init__(self, token_values={}, replacer_function=None, html_escape_function=None, resolved_token_values=None, lazy=False):
+        """ resolved_token_values are values which do not contain any tokens, e.g. values
+            resolved once for a lot of hosts. They are used as they are. If lazy is set, the
+            token values are not resolved before they are requested using resolve. """
 
-    def __init__(self, token_values={}, replacer_function=None, html_escape_function=None):
-        self.token_values = {}
+        self.token_values = decode_token_values(token_values)
         self.token_used = set()
-        for token in token_values:
-            self.token_values[token] = token_values[token].decode('UTF-8').strip()
 
         if not replacer_function:
             def replacer_function(token, replacement):
@@ -147,22 +168,54 @@ class TokenReplacer(object):
         self.replacer_function = replacer_function
         self.html_escape_function = html_escape_function
 
-        self.token_values = self._replace_tokens_in_token_values(self.token_values)
-        self.magic_mime_encoding = None
+        if lazy:
+            self.unresolved_token_values = self.token_values
+            self.token_values = dict(resolved_token_values or {})
+        else:
+            self.unresolved_token_values = {}
+            self.token_values = resolve_token_values(self.token_values, resolved_token_values)
+
+    def resolve(self, token_name):
+        """ Returns the value of the token with all tokens in it replaced. Only the values
+            the token depends on are resolved, each of them only once. """
+
+        if token_name not in self.token_values and token_name in self.unresolved_token_values:
+            dependencies = set()
+            token_names_to_visit = [token_name]
 
-    def filter(self, content):
-        while True:
-            match = TokenReplacer.TOKEN_PATTERN.search(content)
-            if not match:
-                return content
-            token_name = match.group(1)
-            if not token_name in self.token_values:
-                raise MissingTokenException(token_name)
-            replacement = self.replacer_function(token_name,
-                                                 self.token_values[token_name])
+            while token_names_to_visit:
+                dependency = token_names_to_visit.pop()
+                if dependency in dependencies or dependency in self.token_values:
+                    continue
 
-            content = content.replace("@@@%s@@@" % token_name, replacement)
-            self.token_used.add(token_name)
+                dependencies.add(dependency)
+                token_names_to_visit += TOKEN_PATTERN.findall(self.unresolved_token_values.get(dependency, ''))
+
+            unresolved_token_values = dict((name, self.unresolved_token_values[name]) for name in dependencies if name in self.unresolved_token_values)
+            self.token_values = resolve_token_values(unresolved_token_values, self.token_values)
+
+        if token_name not in self.token_values:
+            raise MissingTokenException(token_name)
+
+        return self.token_values[token_name]
+
+    def filter(self, content, encoding=None):
+        """ Replaces all tokens within the content by rendering its template. If an encoding is
+            given the content is a byte string and the replacements are encoded using the encoding. """
+
+        return self._render_template(get_template(content), encoding)
+
+    def _render_template(self, template, encoding=None):
+        replacements = {}
+        for token_name in template.token_names:
+            replacement = self.replacer_function(token_name, self.resolve(token_name))
+            if encoding:
+                replacement = replacement.encode(encoding)
+            replacements[token_name] = replacement
+
+        self.token_used.update(template.token_names)
+
+        return render_template(template, replacements)
 
     def _read_content_from_file(self, filename):
 
@@ -173,6 +226,10 @@ class TokenReplacer(object):
 
     def _perform_filtering_on_file(self, filename, file_content, file_encoding, html_escape):
 
+        if not html_escape and is_ascii_compatible(file_encoding):
+            self._perform_filtering_on_bytes(filename, file_content, file_encoding)
+            return
+
         verbose(LOGGER).debug('Filtering file "%s" using encoding "%s"', filename, file_encoding)
         file_content = file_content.decode(file_encoding)
 
@@ -181,10 +238,33 @@ class TokenReplacer(object):
 
         file_content_filtered = self.filter(file_content)
 
+        # the file might be hard linked to the files of other hosts
+        break_hard_link(filename)
         with open(filename, "w") as output_file:
             output_file.write(file_content_filtered.encode(file_encoding))
 
-    def filter_file(self, filename, html_escape=False):
+    def _perform_filtering_on_bytes(self, filename, file_content, file_encoding):
+        """ Tokens are byte-identical in ascii compatible encodings, hence the content
+            does not have to be decoded. Files without tokens are not written at all. """
+
+        template = get_template(file_content)
+        if not template.token_names:
+            return
+
+        verbose(LOGGER).debug('Filtering bytes of file "%s" using encoding "%s"', filename, file_encoding)
+        file_content_filtered = self._render_template(template, encoding=file_encoding)
+
+        # the file might be hard linked to the files of other hosts
+        break_hard_link(filename)
+        with open(filename, "w") as output_file:
+            output_file.write(file_content_filtered)
+
+    def filter_file(self, filename, html_escape=False, config_viewer_filename=None, config_viewer_token_replacer=None):
+        """ Filters the file in place. If a config_viewer_filename is given, the html rendering
+            of the file is written there by the config_viewer_token_replacer using the content
+            and encoding which have been read and detected once for both outputs. The rendering
+            gets the mode of the file, e.g. scripts stay executable in the config viewer. """
+
         try:
             self.file_size_limit = get_max_file_size()
 
@@ -194,11 +274,19 @@ class TokenReplacer(object):
             file_content = self._read_content_from_file(filename)
 
             file_encoding = self._get_file_encoding(file_content)
-            if file_encoding:
-                if file_encoding != 'binary' and file_encoding != 'unknown-8bit':
-                    self._perform_filtering_on_file(filename, file_content, file_encoding, html_escape)
-                else:
+            if file_encoding and file_encoding != 'binary' and file_encoding != 'unknown-8bit':
+                self._perform_filtering_on_file(filename, file_content, file_encoding, html_escape)
+                if config_viewer_filename:
+                    config_viewer_token_replacer._perform_filtering_on_file(config_viewer_filename, file_content, file_encoding, True)
+            else:
+                if file_encoding:
                     verbose(LOGGER).warn('Not filtering file "%s" since it has encoding "%s".', filename, file_encoding)
+                if config_viewer_filename:
+                    with open(config_viewer_filename, "w") as output_file:
+                        output_file.write(file_content)
+
+            if config_viewer_filename:
+                copymode(filename, config_viewer_filename)
 
         except MissingTokenException as exception:
             raise MissingTokenException(exception.token, filename)
@@ -206,47 +294,64 @@ class TokenReplacer(object):
         except Exception as e:
             raise CannotFilterFileException('Cannot filter file %s.\n%s' % (os.path.basename(filename), str(e)))
 
-    def _replace_tokens_in_token_values(self, token_values):
-        tokens_without_sub_tokens = dict((key, value) for (key, value) in token_values.iteritems() if not TokenReplacer.TOKEN_PATTERN.search(value))
-        tokens_with_sub_tokens = dict((key, value) for (key, value) in token_values.iteritems() if TokenReplacer.TOKEN_PATTERN.search(value))
-
-        while tokens_with_sub_tokens:
-            tokens_with_sub_tokens_after_replace = {}
-            replace_count = 0
-            for (key, value) in tokens_with_sub_tokens.iteritems():
-                token_names = TokenReplacer.TOKEN_PATTERN.findall(value)
-                for token_name in token_names:
-                    if token_name in tokens_without_sub_tokens:
-                        value = value.replace("@@@%s@@@" % token_name, tokens_without_sub_tokens[token_name])
-                        replace_count += 1
-
-                if TokenReplacer.TOKEN_PATTERN.search(value):
-                    tokens_with_sub_tokens_after_replace[key] = value
-                else:
-                    tokens_without_sub_tokens[key] = value
-
-            # there are still invalid tokens and we could not replace any of them in the last loop cycle, so let's throw an error
-            if tokens_with_sub_tokens_after_replace and not replace_count:
-                # maybe there is a cycle?
-                dependency_digraph = {}
-                for (variable, variable_contents) in tokens_with_sub_tokens_after_replace.iteritems():
-                    edge_source = variable
-                    edge_target = TokenReplacer.TOKEN_PATTERN.findall(variable_contents)
-                    dependency_digraph[edge_source] = edge_target
-                token_graph = TokenCycleChecking(dependency_digraph)
-                token_graph.assert_no_cycles_present()
-                # no cycle => variable undefined
-                unreplaced_variables = []
-                for(variable, variable_contents) in tokens_with_sub_tokens_after_replace.iteritems():
-                    unreplaced = TokenReplacer.TOKEN_PATTERN.findall(variable_contents)
-                    unreplaced_variables.append(unreplaced)
-                raise MissingOrRedundantTokenException("Unresolved variables :\n" + str(unreplaced_variables))
-
-            tokens_with_sub_tokens = tokens_with_sub_tokens_after_replace
-
-        return tokens_without_sub_tokens
+    def with_replacer_function(self, replacer_function):
+        """ Returns a token replacer using the already replaced token values of this
+            token replacer and the given replacer function. """
+
+        token_replacer = copy(self)
+        token_replacer.replacer_function = replacer_function
+        token_replacer.token_used = set()
+        return token_replacer
 
     def _get_file_encoding(self, content):
-        if not self.magic_mime_encoding:
-            self.magic_mime_encoding = config_rpm_maker.utilities.magic.Magic(mime_encoding=True)
-        return self.magic_mime_encoding.from_buffer(content)
+        return detect_encoding(content)
+
+
+def decode_token_values(token_values):
+    """ Decodes the raw token values as read from the variable files. """
+
+    return dict((token, value.decode('UTF-8').strip()) for (token, value) in token_values.iteritems())
+
+
+def resolve_token_values(token_values, resolved_token_values=None, ignore_unresolved=False):
+    """ Replaces the tokens within the token values. The values are processed in the order
+        of their dependencies, so every value is filtered exactly once using values which
+        do not contain any tokens anymore. The returned values contain the given
+        resolved_token_values as well. If ignore_unresolved is set, values which can not be
+        resolved are left out instead of raising an exception. """
+
+    dependency_digraph = dict((variable, TOKEN_PATTERN.findall(value)) for (variable, value) in token_values.iteritems())
+    token_graph = TokenCycleChecking(dependency_digraph)
+    try:
+        components = token_graph.assert_no_cycles_present()
+    except ContainsCyclesException:
+        if not ignore_unresolved:
+            raise
+        return dict(resolved_token_values or {})
+
+    replaced_token_values = dict(resolved_token_values or {})
+    unreplaced_variables = []
+
+    def replace_token(match):
+        token_name = match.group(1)
+        return replaced_token_values.get(token_name, match.group(0))
+
+    for (variable,) in components:
+        if variable not in token_values:
+            continue
+
+        value = token_values[variable]
+        if dependency_digraph[variable]:
+            value = TOKEN_PATTERN.sub(replace_token, value)
+
+            unreplaced = TOKEN_PATTERN.findall(value)
+            if unreplaced:
+                unreplaced_variables.append(unreplaced)
+                continue
+
+        replaced_token_values[variable] = value
+
+    if unreplaced_variables and not ignore_unresolved:
+        raise MissingOrRedundantTokenException("Unresolved variables :\n" + str(unreplaced_variables))
+
+    return replaced_token_values
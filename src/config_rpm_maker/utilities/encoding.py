@@ -0,0 +1,77 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Detection of file encodings using libmagic. Loading the magic database
+    is expensive, hence the loaded libmagic handles are shared by all threads
+    and the detected encodings are cached by the digest of the content.
+"""
+
+import atexit
+
+from hashlib import sha1
+from threading import Lock
+
+from config_rpm_maker.utilities.lrucache import LruCache
+from config_rpm_maker.utilities.magic import Magic
+
+MAXIMUM_COUNT_OF_CACHED_ENCODINGS = 100000
+
+
+class MagicPool(object):
+    """ Hands out libmagic handles detecting encodings. A handle must not be used
+        by two threads at the same time, therefore every thread gets its own
+        handle and returns it to the pool afterwards. """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.available_magics = []
+
+    def get(self):
+        with self.lock:
+            if self.available_magics:
+                return self.available_magics.pop()
+
+        return Magic(mime_encoding=True)
+
+    def put(self, magic):
+        with self.lock:
+            self.available_magics.append(magic)
+
+    def close(self):
+        """ Closes the available handles while libmagic can still be called. """
+
+        with self.lock:
+            del self.available_magics[:]
+
+
+_magic_pool = MagicPool()
+atexit.register(_magic_pool.close)
+_encoding_cache = LruCache('encoding detection', MAXIMUM_COUNT_OF_CACHED_ENCODINGS)
+
+
+def detect_encoding(content):
+    """ Returns the encoding of the given content as detected by libmagic, e.g. "utf-8" or "binary". """
+
+    return _encoding_cache.get(sha1(content).digest(), lambda: _detect_encoding_using_libmagic(content))
+
+
+def _detect_encoding_using_libmagic(content):
+    magic = _magic_pool.get()
+    try:
+        return magic.from_buffer(content)
+    finally:
+        _magic_pool.put(magic)
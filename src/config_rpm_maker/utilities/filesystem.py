@@ -0,0 +1,123 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Helpers to copy and archive directory trees which have been exported from subversion.
+"""
+
+import tarfile
+
+from gzip import GzipFile
+from os import close, link, makedirs, readlink, remove, rename, stat, symlink, walk
+from os.path import basename, dirname, isdir, isfile, islink, join, lexists, normpath, relpath
+from shutil import copy2
+from tempfile import mkstemp
+
+
+def copy_tree(source_directory, target_directory, link_files=False):
+    """ Copies the content of source_directory into target_directory, which
+        might already exist. Files which already exist in target_directory
+        are replaced and symbolic links are copied as symbolic links. If
+        link_files is set, files are hard linked instead of copied. """
+
+    for root, directory_names, file_names in walk(source_directory):
+        target_root = normpath(join(target_directory, relpath(root, source_directory)))
+
+        if not isdir(target_root):
+            makedirs(target_root)
+
+        for directory_name in directory_names:
+            source_path = join(root, directory_name)
+            if islink(source_path):
+                copy_file(source_path, join(target_root, directory_name))
+
+        for file_name in file_names:
+            copy_file(join(root, file_name), join(target_root, file_name), link_files)
+
+
+def break_hard_link(path):
+    """ Replaces a file which is hard linked to other files by a copy of its own,
+        so writing to path afterwards does not change the other files. """
+
+    if islink(path) or not isfile(path) or stat(path).st_nlink < 2:
+        return
+
+    file_descriptor, temporary_path = mkstemp(prefix='.%s.' % basename(path), dir=dirname(path))
+    close(file_descriptor)
+    try:
+        copy2(path, temporary_path)
+        rename(temporary_path, path)
+    except:
+        remove(temporary_path)
+        raise
+
+
+def ensure_directory_exists(directory):
+    """ Creates the directory and its parents unless they exist, even if
+        another thread is creating the same directory at the same time. """
+
+    try:
+        makedirs(directory)
+    except OSError:
+        if not isdir(directory):
+            raise
+
+
+def copy_file(source_path, target_path, link_file=False):
+    """ Replaces target_path with a copy of source_path. The target is
+        removed first, so a hard linked target is never written through. """
+
+    if lexists(target_path):
+        remove(target_path)
+
+    if islink(source_path):
+        symlink(readlink(source_path), target_path)
+        return
+
+    if link_file:
+        try:
+            link(source_path, target_path)
+            return
+        except OSError:
+            pass
+
+    copy2(source_path, target_path)
+
+
+def create_tar_file(tar_file_path, directory, archive_name, compression_level, relative_paths=None):
+    """ Writes the directory including its content as archive_name into the tar
+        file as a stream. The tar file is compressed using gzip with the given
+        compression level, unless the compression level is 0. If the paths of the
+        directories and files below the directory are given relative to it, parents
+        first, the directory is not walked again. """
+
+    with open(tar_file_path, 'wb') as tar_file:
+        if compression_level:
+            with GzipFile(filename='', mode='wb', fileobj=tar_file, compresslevel=compression_level) as compressed_tar_file:
+                _write_tar_stream(compressed_tar_file, directory, archive_name, relative_paths)
+        else:
+            _write_tar_stream(tar_file, directory, archive_name, relative_paths)
+
+
+def _write_tar_stream(output_file, directory, archive_name, relative_paths):
+    with tarfile.open(fileobj=output_file, mode='w|') as archive:
+        if relative_paths is None:
+            archive.add(directory, arcname=archive_name)
+            return
+
+        archive.add(directory, arcname=archive_name, recursive=False)
+        for relative_path in relative_paths:
+            archive.add(join(directory, relative_path), arcname=join(archive_name, relative_path), recursive=False)
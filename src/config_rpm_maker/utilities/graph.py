@@ -0,0 +1,88 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Algorithms on directed graphs. A graph is represented using a dictionary
+    which maps each node to the list of its successors. Successors which are
+    not a key of the dictionary are nodes without successors.
+"""
+
+
+def find_strongly_connected_components(graph):
+    """ Tarjan's algorithm for finding the strongly connected components of a graph.
+        Works without recursion, so long chains of nodes do not hit the recursion limit.
+        A component is always returned after the components reachable from it. """
+
+    index = {}
+    lowlinks = {}
+    stack = []
+    nodes_on_stack = set()
+    components = []
+
+    def visit(node):
+        index[node] = len(index)
+        lowlinks[node] = index[node]
+        stack.append(node)
+        nodes_on_stack.add(node)
+        return node, iter(graph.get(node) or [])
+
+    for root in graph:
+        if root in index:
+            continue
+
+        path = [visit(root)]
+
+        while path:
+            node, successors = path[-1]
+
+            for successor in successors:
+                if successor not in index:
+                    path.append(visit(successor))
+                    break
+                elif successor in nodes_on_stack:
+                    lowlinks[node] = min(lowlinks[node], index[successor])
+            else:
+                path.pop()
+                if path:
+                    parent = path[-1][0]
+                    lowlinks[parent] = min(lowlinks[parent], lowlinks[node])
+
+                if lowlinks[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        nodes_on_stack.remove(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(tuple(component))
+
+    return components
+
+
+def find_reachable_nodes(graph, start_nodes):
+    """ Returns the set of nodes reachable from the start nodes, including the start nodes. """
+
+    reachable_nodes = set(start_nodes)
+    nodes_to_visit = list(reachable_nodes)
+
+    while nodes_to_visit:
+        for successor in graph.get(nodes_to_visit.pop()) or []:
+            if successor not in reachable_nodes:
+                reachable_nodes.add(successor)
+                nodes_to_visit.append(successor)
+
+    return reachable_nodes
@@ -0,0 +1,73 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import OrderedDict
+from threading import Lock
+
+from config_rpm_maker.utilities.profiler import register_cache
+
+
+class LruCache(object):
+    """ A thread safe cache which keeps the maximum_size least recently used
+        entries. If a get_size function is given, maximum_size limits the sum
+        of the sizes of the cached values instead of their number. It counts
+        the hits and misses, which are logged with the execution times summary. """
+
+    def __init__(self, name, maximum_size, get_size=None):
+        self.name = name
+        self.maximum_size = maximum_size
+        self.get_size = get_size or (lambda value: 1)
+        self.size = 0
+        self.lock = Lock()
+        self.entries = OrderedDict()
+        self.count_of_hits = 0
+        self.count_of_misses = 0
+        register_cache(self)
+
+    def get(self, key, compute_value):
+        """ Returns the cached value for key. If there is none compute_value is called
+            to compute it. compute_value is called without holding the lock, so two
+            threads might compute the same value at the same time. """
+
+        with self.lock:
+            if key in self.entries:
+                self.count_of_hits += 1
+                value = self.entries.pop(key)
+                self.entries[key] = value
+                return value
+
+            self.count_of_misses += 1
+
+        value = compute_value()
+        size = self.get_size(value)
+
+        if size > self.maximum_size:
+            return value
+
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.get_size(self.entries.pop(key))
+
+            self.entries[key] = value
+            self.size += size
+            while self.size > self.maximum_size:
+                _, removed_value = self.entries.popitem(last=False)
+                self.size -= self.get_size(removed_value)
+
+        return value
+
+    def __len__(self):
+        return len(self.entries)
@@ -34,6 +34,7 @@ LOGGER = getLogger(__name__)
 LOG_EACH_MEASUREMENT = False
 
 _execution_time_summary = {}
+_caches = []
 
 
 def round_to_two_decimals_after_dot(elapsed_time_in_seconds):
@@ -95,6 +96,22 @@ def log_execution_time_summaries(logging_function):
                          summary_of_function[1], average_time, rounded_elapsed_time, function_name)
 
 
+def register_cache(cache):
+    """ Registers a cache providing name, count_of_hits and count_of_misses to be logged by log_cache_summaries. """
+
+    _caches.append(cache)
+
+
+def log_cache_summaries(logging_function):
+    caches_in_use = [cache for cache in _caches if cache.count_of_hits or cache.count_of_misses]
+    if not caches_in_use:
+        return
+
+    logging_function('Cache summary:')
+    for cache in sorted(caches_in_use, key=lambda cache: cache.name):
+        logging_function('    %7d hits %7d misses : %s', cache.count_of_hits, cache.count_of_misses, cache.name)
+
+
 def log_directories_summary(logging_function, start_path):
 
     directories_summary = {}
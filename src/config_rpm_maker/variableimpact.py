@@ -0,0 +1,148 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from logging import getLogger
+from os.path import islink, join
+
+from config_rpm_maker.overlayplanner import DEPENDENCY_FILES, OverlayPlan
+from config_rpm_maker.segment import OVERLAY_ORDER
+from config_rpm_maker.token.template import get_template
+from config_rpm_maker.utilities.graph import find_reachable_nodes
+
+LOGGER = getLogger(__name__)
+
+VARIABLES_DIRECTORY = 'VARIABLES/'
+
+# Changing these variables changes the rpm even if no token references them.
+VARIABLES_USED_BY_BUILD = ('RPM_NAME', 'RPM_PROVIDES', 'RPM_REQUIRES')
+
+# The value of this variable lists the values of all other variables.
+PATCH_INFO_VARIABLE = 'VARIABLES'
+
+# The build writes the log of the svn paths of a host into this variable, hence it changes with every commit.
+SVN_LOG_VARIABLE = 'SVNLOG'
+
+# The build writes the svn path providing each file into this variable.
+OVERLAYING_VARIABLE = 'OVERLAYING'
+
+
+class VariableImpactAnalyzer(object):
+    """ Decides which hosts can not be affected by a commit which changes only
+        variables. The token names referenced by the files, the spec file and the
+        variables of a host form a graph, a changed variable matters only if it
+        is reachable from the files or the spec file. The files are read from the
+        staging directories of the export cache, hence they are exported only
+        once for analyzing and building. """
+
+    def __init__(self, revision, config_tree, svn_service_queue, export_cache, spec_file_path):
+        self.revision = revision
+        self.config_tree = config_tree
+        self.svn_service_queue = svn_service_queue
+        self.export_cache = export_cache
+        self.spec_file_path = spec_file_path
+        self.token_names = {}
+
+    def get_reason_to_skip(self, host, changed_paths, added_or_deleted_paths=()):
+        """ Returns why the changed paths can not change the rpm of the host or None if they might.
+            The variables written by the build itself count as changed, too: SVNLOG lists the
+            new commit and OVERLAYING changes if a visible variable file is added or deleted. """
+
+        svn_paths = [svn_path for segment in OVERLAY_ORDER for svn_path in segment.get_svn_paths(host)]
+        plan = OverlayPlan(self.config_tree, svn_paths)
+
+        changed_variable_names = set()
+        changed_build_variable_names = set([SVN_LOG_VARIABLE])
+        for changed_path in changed_paths:
+            svn_path = _find_svn_path(svn_paths, changed_path)
+            if svn_path is None:
+                continue
+
+            relative_path = changed_path[len(svn_path) + 1:]
+            if not relative_path.startswith(VARIABLES_DIRECTORY) or relative_path in DEPENDENCY_FILES:
+                return None
+
+            variable_name = relative_path[len(VARIABLES_DIRECTORY):]
+            if '/' in variable_name or variable_name in VARIABLES_USED_BY_BUILD:
+                return None
+
+            if _is_visible(plan, svn_path, relative_path):
+                changed_variable_names.add(variable_name)
+                if changed_path in added_or_deleted_paths:
+                    changed_build_variable_names.add(OVERLAYING_VARIABLE)
+
+        referenced_token_names = self._get_referenced_token_names(plan)
+
+        if PATCH_INFO_VARIABLE in referenced_token_names:
+            return None
+
+        if (changed_variable_names | changed_build_variable_names) & referenced_token_names:
+            return None
+
+        if not changed_variable_names:
+            return 'changed variables are overridden'
+
+        return 'no file references %s' % ', '.join(sorted(changed_variable_names | changed_build_variable_names))
+
+    def _get_referenced_token_names(self, plan):
+        """ Returns the token names reachable from the files and the spec file of the plan. """
+
+        start_token_names = set(self._get_token_names(self.spec_file_path))
+        variables = {}
+
+        for svn_path in plan.svn_paths:
+            for path in plan.get_files(svn_path):
+                if path in DEPENDENCY_FILES:
+                    # the dependencies of every svn path are collected, not only the winning ones
+                    start_token_names.update(self._get_token_names_of_svn_path(svn_path, path))
+                elif plan.winners[path] != (svn_path, False):
+                    continue
+                elif path.startswith(VARIABLES_DIRECTORY):
+                    variables[path[len(VARIABLES_DIRECTORY):]] = self._get_token_names_of_svn_path(svn_path, path)
+                else:
+                    start_token_names.update(self._get_token_names_of_svn_path(svn_path, path))
+
+        return find_reachable_nodes(variables, start_token_names)
+
+    def _get_token_names_of_svn_path(self, svn_path, path):
+        directory = self.export_cache.get_directory(self.svn_service_queue, svn_path, self.revision)
+        return self._get_token_names(join(directory, path))
+
+    def _get_token_names(self, file_path):
+        if islink(file_path):
+            return []
+
+        if file_path not in self.token_names:
+            with open(file_path) as file_to_analyze:
+                self.token_names[file_path] = get_template(file_to_analyze.read()).token_names
+
+        return self.token_names[file_path]
+
+
+def _is_visible(plan, svn_path, relative_path):
+    """ Returns True if no later svn path of the plan provides the path. This holds for
+        a deleted path, too, if it has not been overridden before it was deleted. """
+
+    winner = plan.winners.get(relative_path)
+    return winner is None or plan.svn_paths.index(winner[0]) <= plan.svn_paths.index(svn_path)
+
+
+def _find_svn_path(svn_paths, changed_path):
+    for svn_path in svn_paths:
+        if changed_path == svn_path or changed_path.startswith(svn_path + '/'):
+            return svn_path
+
+    return None
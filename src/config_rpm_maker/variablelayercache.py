@@ -0,0 +1,101 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from os import listdir
+from os.path import isdir, isfile, join
+from threading import Lock
+
+from config_rpm_maker.token.tokenreplacer import decode_token_values, resolve_token_values
+
+
+class VariableLayer(object):
+    """ The variables overlaid by the segments all, typ, loc and loctyp, which are
+        the same for all hosts of a location and type. The raw values are kept
+        as they have been read. The values which do not depend on variables of
+        the host are resolved once for all hosts of the location and type. """
+
+    def __init__(self, token_values):
+        self.token_values = token_values
+        self.lock = Lock()
+        self.resolved_token_values = {}
+
+    def get_token_values(self, overridden_token_names):
+        """ Returns the raw values which have to be resolved for the host, and the values
+            which have been resolved for all hosts not overriding the same variables. """
+
+        overridden_token_names = frozenset(overridden_token_names).intersection(self.token_values)
+
+        with self.lock:
+            if overridden_token_names not in self.resolved_token_values:
+                token_values = dict((token, value) for (token, value) in self.token_values.iteritems() if token not in overridden_token_names)
+                self.resolved_token_values[overridden_token_names] = resolve_token_values(decode_token_values(token_values), ignore_unresolved=True)
+
+            resolved_token_values = self.resolved_token_values[overridden_token_names]
+
+        token_values = dict((token, value) for (token, value) in self.token_values.iteritems()
+                            if token not in overridden_token_names and token not in resolved_token_values)
+
+        return token_values, resolved_token_values
+
+
+class VariableLayerCache(object):
+    """ Reads the variables of the segments all, typ, loc and loctyp only once
+        per location and type while building the hosts of one revision. """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.layers = {}
+        self.count_of_reads = 0
+        self.count_of_lookups = 0
+
+    def get(self, svn_paths, variables_directory):
+        """ Returns the layer of the given svn paths. Reads the layer from the variables
+            directory if no other host overlaid the same svn paths before. """
+
+        key = tuple(svn_paths)
+
+        with self.lock:
+            self.count_of_lookups += 1
+            if key in self.layers:
+                return self.layers[key]
+
+        layer = VariableLayer(_read_token_values(variables_directory))
+
+        with self.lock:
+            if key not in self.layers:
+                self.count_of_reads += 1
+                self.layers[key] = layer
+
+            return self.layers[key]
+
+    def log_statistics(self, logging_function):
+        logging_function('Variable layer cache summary: %d layer(s) read served %d lookups.',
+                         self.count_of_reads, self.count_of_lookups)
+
+
+def _read_token_values(directory):
+    token_values = {}
+
+    if not isdir(directory):
+        return token_values
+
+    for name in listdir(directory):
+        candidate = join(directory, name)
+        if isfile(candidate):
+            with open(candidate) as property_file:
+                token_values[name] = property_file.read().strip()
+
+    return token_values
@@ -21,7 +21,9 @@ from os.path import join, exists
 
 from integration_test_support import IntegrationTest
 
+from config_rpm_maker import configuration
 from config_rpm_maker.configuration import build_config_viewer_host_directory
+from config_rpm_maker.configuration.properties import get_source_tar_compression_level
 from config_rpm_maker.hostrpmbuilder import (CouldNotTarConfigurationDirectoryException,
                                              CouldNotBuildRpmException,
                                              ConfigDirAlreadyExistsException,
@@ -47,6 +49,23 @@ class HostRpmBuilderIntegrationTest(IntegrationTest):
         self.assert_path_exists(revision_file_path)
         self.assert_file_content(revision_file_path, '1')
 
+    def test_should_build_rpm_from_uncompressed_tar_file(self):
+
+        compression_level_before_test = get_source_tar_compression_level()
+        configuration.set_property(get_source_tar_compression_level, 0)
+        try:
+            host_rpm_builder = HostRpmBuilder(thread_name="Thread-0",
+                                              revision='1',
+                                              hostname="berweb01",
+                                              work_dir=self.temporary_directory,
+                                              svn_service_queue=self.create_svn_service_queue())
+
+            rpms = host_rpm_builder.build()
+        finally:
+            configuration.set_property(get_source_tar_compression_level, compression_level_before_test)
+
+        self.assertTrue(rpms)
+
     def test_should_raise_ConfigDirAlreadyExistsException(self):
 
         fake_host_directory = join(self.temporary_directory, 'yadt-config-fakehost')
@@ -64,9 +83,10 @@ class HostRpmBuilderIntegrationTest(IntegrationTest):
     def test_should_raise_CouldNotTarConfigurationDirectoryException(self):
 
         svn_service_queue = self.create_svn_service_queue()
+        makedirs(join(self.temporary_directory, 'yadt-config-berweb01.tar.gz'))
 
         host_rpm_builder = HostRpmBuilder(thread_name="Thread-0",
-                                          hostname="--help berweb",
+                                          hostname="berweb01",
                                           revision='1',
                                           work_dir=self.temporary_directory,
                                           svn_service_queue=svn_service_queue)
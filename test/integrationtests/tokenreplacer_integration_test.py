@@ -96,6 +96,16 @@ class TokenReplacerFromDirectoryIntegrationTest(IntegrationTestBase):
         self.assertEquals({'SPAM': 'spam', 'EGGS': 'eggs'}, token_replacer.token_values)
 
 
+    def test_should_use_given_values_instead_of_reading_token_files(self):
+        self.create_tmp_file("SPAM", "spam")
+        self.create_tmp_file("EGGS", "eggs from file")
+        self.create_tmp_file("HAM", "ham from file")
+
+        token_replacer = TokenReplacer.from_directory(self.tmp_directory, token_values={'EGGS': '@@@SPAM@@@ eggs'}, resolved_token_values={'HAM': u'ham'})
+
+        self.assertEquals({'SPAM': 'spam', 'EGGS': 'spam eggs', 'HAM': 'ham'}, token_replacer.token_values)
+
+
 class TokenReplacerFilterFileIntegrationTest(IntegrationTestBase):
 
     def test_should_ensure_that_file_without_tokens_is_not_modified_when_filter_is_called(self):
@@ -152,6 +162,62 @@ class TokenReplacerFilterFileIntegrationTest(IntegrationTestBase):
         shutil.copyfile('testdata/svn_repo/config/typ/web/data/file-with-special-character', path)
         TokenReplacer(token_values={'RPM_REQUIRES': 'äöß234'}).filter_file(path, html_escape=True)
 
+    def test_should_replace_tokens_in_file_with_iso_8859_1_encoding(self):
+        self.create_tmp_file("spam", u"Gr\xfc\xdfe @@@spam@@@ hallo welt".encode('iso-8859-1'))
+
+        TokenReplacer({"spam": "äpfel"}).filter_file(self.tmp_file_name("spam"))
+
+        self.ensure_file_contents("spam", u"Gr\xfc\xdfe \xe4pfel hallo welt".encode('iso-8859-1'))
+
+    def test_should_replace_tokens_in_file_with_utf_16_encoding(self):
+        self.create_tmp_file("spam", u"eggs @@@spam@@@".encode('utf-16'), True)
+
+        TokenReplacer({"spam": "äpfel"}).filter_file(self.tmp_file_name("spam"))
+
+        self.ensure_file_contents("spam", u"eggs \xe4pfel".encode('utf-16'), True)
+
+    def test_should_filter_file_and_write_html_rendering_for_config_viewer(self):
+        def html_token_replacer(token, replacement):
+            return '<strong title="%s">%s</strong>' % (token, replacement)
+
+        self.create_tmp_file("spam", '<a>@@@spam@@@</a>')
+        token_replacer = TokenReplacer(token_values={'spam': 'eggs'})
+        config_viewer_token_replacer = token_replacer.with_replacer_function(html_token_replacer)
+
+        token_replacer.filter_file(self.tmp_file_name("spam"),
+                                   config_viewer_filename=self.tmp_file_name("spam.html"),
+                                   config_viewer_token_replacer=config_viewer_token_replacer)
+
+        self.ensure_file_contents("spam", '<a>eggs</a>')
+        self.ensure_file_contents("spam.html", '<!DOCTYPE html><html><head><title>spam.html</title></head><body><pre>&lt;a&gt;<strong title="spam">eggs</strong>&lt;/a&gt;</pre></body></html>')
+        self.assertEqual(set(['spam']), config_viewer_token_replacer.token_used)
+
+    def test_should_keep_mode_of_file_for_config_viewer(self):
+        self.create_tmp_file("spam.sh", '#!/bin/sh\necho @@@spam@@@')
+        os.chmod(self.tmp_file_name("spam.sh"), 0755)
+        token_replacer = TokenReplacer(token_values={'spam': 'eggs'})
+
+        token_replacer.filter_file(self.tmp_file_name("spam.sh"),
+                                   config_viewer_filename=self.tmp_file_name("spam.sh.html"),
+                                   config_viewer_token_replacer=token_replacer.with_replacer_function(lambda token, replacement: replacement))
+
+        self.assertEqual(0755, os.stat(self.tmp_file_name("spam.sh.html")).st_mode & 0777)
+
+    def test_should_copy_binary_file_for_config_viewer(self):
+        binary_data = ""
+        for num in range(50):
+            binary_data += struct.pack("i", num)
+
+        self.create_tmp_file("bin", binary_data, True)
+        token_replacer = TokenReplacer()
+
+        token_replacer.filter_file(self.tmp_file_name("bin"),
+                                   config_viewer_filename=self.tmp_file_name("bin.html"),
+                                   config_viewer_token_replacer=token_replacer.with_replacer_function(None))
+
+        self.ensure_file_contents("bin", binary_data, True)
+        self.ensure_file_contents("bin.html", binary_data, True)
+
     def test_should_raise_CannotFilterFileException(self):
         self.assertRaises(CannotFilterFileException, TokenReplacer().filter_file, "this-file-does-not-exist.txt")
 
@@ -0,0 +1,130 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from mock import Mock, patch
+from shutil import rmtree
+
+from unittest_support import UnitTests
+from config_rpm_maker.buildprocess import BuildProcessContext, build_host_in_process, initialize_build_process
+from config_rpm_maker.exceptions import BaseConfigRpmMakerException
+
+
+class InitializeBuildProcessTests(UnitTests):
+
+    @patch('config_rpm_maker.buildprocess.BuildProcessContext')
+    @patch('config_rpm_maker.buildprocess.set_configuration_snapshot')
+    def test_should_restore_configuration_snapshot(self, mock_set_configuration_snapshot, mock_build_process_context_class):
+
+        initialize_build_process({'thread_count': 1}, '123', '/work', Mock())
+
+        mock_set_configuration_snapshot.assert_called_with({'thread_count': 1})
+
+    @patch('config_rpm_maker.buildprocess.BuildProcessContext')
+    @patch('config_rpm_maker.buildprocess.set_configuration_snapshot')
+    def test_should_create_context_of_build_process(self, mock_set_configuration_snapshot, mock_build_process_context_class):
+
+        mock_svn_service = Mock()
+        mock_error_logging_handler = Mock()
+
+        initialize_build_process({}, '123', '/work', mock_svn_service, mock_error_logging_handler, 'config tree')
+
+        mock_build_process_context_class.assert_called_with('123', '/work', mock_svn_service, mock_error_logging_handler, 'config tree')
+
+
+class BuildHostInProcessTests(UnitTests):
+
+    @patch('config_rpm_maker.buildprocess._build_process_context')
+    def test_should_return_paths_of_built_rpms(self, mock_build_process_context):
+
+        mock_build_process_context.build.return_value = ['devweb01.rpm', 'devweb01.src.rpm']
+
+        self.assertEqual(('devweb01', ['devweb01.rpm', 'devweb01.src.rpm'], None), build_host_in_process('devweb01'))
+        mock_build_process_context.build.assert_called_with('devweb01')
+
+    @patch('config_rpm_maker.buildprocess._build_process_context')
+    def test_should_return_error_message_when_build_failed(self, mock_build_process_context):
+
+        mock_build_process_context.build.side_effect = BaseConfigRpmMakerException('Could not build.')
+
+        self.assertEqual(('devweb01', [], 'Could not build.'), build_host_in_process('devweb01'))
+
+    @patch('config_rpm_maker.buildprocess._build_process_context')
+    def test_should_return_stack_trace_when_build_raised_unexpected_exception(self, mock_build_process_context):
+
+        mock_build_process_context.build.side_effect = ValueError('Unexpected.')
+
+        host, rpms, error = build_host_in_process('devweb01')
+
+        self.assertEqual([], rpms)
+        self.assertTrue(error.startswith('Traceback'))
+        self.assertTrue('ValueError: Unexpected.' in error)
+
+
+class BuildProcessContextTests(UnitTests):
+
+    @patch('config_rpm_maker.buildprocess.GroupRpmRegistry')
+    @patch('config_rpm_maker.buildprocess.getpid')
+    def test_should_stage_caches_in_directory_of_process(self, mock_getpid, mock_group_rpm_registry_class):
+
+        mock_getpid.return_value = 4711
+
+        context = BuildProcessContext('123', '/work', Mock())
+
+        self.assertEqual('Process-4711', context.name)
+        self.assertEqual('/work/build-processes/4711/svn-exports', context.export_cache.staging_directory)
+        self.assertEqual(context.export_cache, context.overlay_planner.export_cache)
+
+    @patch('config_rpm_maker.buildprocess.GroupRpmRegistry')
+    def test_should_share_group_rpm_registry_with_other_processes(self, mock_group_rpm_registry_class):
+
+        context = BuildProcessContext('123', '/work', Mock())
+
+        mock_group_rpm_registry_class.assert_called_with('/work/group-rpms')
+        self.assertEqual(mock_group_rpm_registry_class.return_value, context.group_rpm_registry)
+
+    @patch('config_rpm_maker.buildprocess.GroupRpmRegistry')
+    def test_should_use_own_svn_client(self, mock_group_rpm_registry_class):
+
+        mock_svn_service = Mock()
+
+        context = BuildProcessContext('123', '/work', mock_svn_service)
+
+        self.assertEqual([mock_svn_service.clone.return_value], context.svn_service_queue.svn_services)
+
+    @patch('config_rpm_maker.buildprocess.is_no_clean_up_enabled')
+    @patch('config_rpm_maker.buildprocess.Finalize')
+    @patch('config_rpm_maker.buildprocess.GroupRpmRegistry')
+    @patch('config_rpm_maker.buildprocess.getpid')
+    def test_should_remove_directory_of_process_when_process_exits(self, mock_getpid, mock_group_rpm_registry_class, mock_finalize, mock_is_no_clean_up_enabled):
+
+        mock_getpid.return_value = 4711
+        mock_is_no_clean_up_enabled.return_value = False
+
+        context = BuildProcessContext('123', '/work', Mock())
+
+        mock_finalize.assert_called_with(context, rmtree, args=('/work/build-processes/4711',), kwargs={'ignore_errors': True}, exitpriority=0)
+
+    @patch('config_rpm_maker.buildprocess.is_no_clean_up_enabled')
+    @patch('config_rpm_maker.buildprocess.Finalize')
+    @patch('config_rpm_maker.buildprocess.GroupRpmRegistry')
+    def test_should_keep_directory_of_process_when_clean_up_is_disabled(self, mock_group_rpm_registry_class, mock_finalize, mock_is_no_clean_up_enabled):
+
+        mock_is_no_clean_up_enabled.return_value = True
+
+        BuildProcessContext('123', '/work', Mock())
+
+        self.assert_mock_never_called(mock_finalize)
@@ -25,7 +25,8 @@ from config_rpm_maker import (extract_repository_url_and_revision_from_arguments
                               initialize_logging_to_console,
                               initialize_logging_to_syslog,
                               main,
-                              building_configuration_rpms_and_clean_host_directories)
+                              building_configuration_rpms_and_clean_host_directories,
+                              create_segment_tree_cache)
 from config_rpm_maker.exceptions import BaseConfigRpmMakerException
 from config_rpm_maker.configuration import ConfigurationException
 
@@ -111,12 +112,13 @@ class MainTests(TestCase):
 
 class BuildingConfigurationRpmsAndCleanHostDirectoriesTests(TestCase):
 
+    @patch('config_rpm_maker.create_segment_tree_cache')
     @patch('config_rpm_maker.clean_up_deleted_hosts_data')
     @patch('config_rpm_maker.get_svn_path_to_config')
     @patch('config_rpm_maker.exit_program')
     @patch('config_rpm_maker.SvnService')
     @patch('config_rpm_maker.ConfigRpmMaker')
-    def test_should_pass_when_everything_works_as_expected(self, mock_config_rpm_maker_class, mock_svn_service_class, mock_exit_program, mock_config, mock_clean_up_deleted_hosts_data):
+    def test_should_pass_when_everything_works_as_expected(self, mock_config_rpm_maker_class, mock_svn_service_class, mock_exit_program, mock_config, mock_clean_up_deleted_hosts_data, mock_create_segment_tree_cache):
 
         mock_config.return_value = '/path-to-configuration'
         mock_svn_service_class.return_value = Mock()
@@ -124,12 +126,13 @@ class BuildingConfigurationRpmsAndCleanHostDirectoriesTests(TestCase):
 
         building_configuration_rpms_and_clean_host_directories('file:///path_to/testdata/repository', 1)
 
+    @patch('config_rpm_maker.create_segment_tree_cache')
     @patch('config_rpm_maker.clean_up_deleted_hosts_data')
     @patch('config_rpm_maker.get_svn_path_to_config')
     @patch('config_rpm_maker.exit_program')
     @patch('config_rpm_maker.SvnService')
     @patch('config_rpm_maker.ConfigRpmMaker')
-    def test_should_initialize_svn_service_with_given_repository_url(self, mock_config_rpm_maker_class, mock_svn_service_constructor, mock_exit_program, mock_config, mock_clean_up_deleted_hosts_data):
+    def test_should_initialize_svn_service_with_given_repository_url(self, mock_config_rpm_maker_class, mock_svn_service_constructor, mock_exit_program, mock_config, mock_clean_up_deleted_hosts_data, mock_create_segment_tree_cache):
 
         mock_config.return_value = '/path-to-configuration'
         mock_svn_service_constructor.return_value = Mock()
@@ -138,14 +141,16 @@ class BuildingConfigurationRpmsAndCleanHostDirectoriesTests(TestCase):
         building_configuration_rpms_and_clean_host_directories('file:///path_to/testdata/repository', 1)
 
         mock_svn_service_constructor.assert_called_with(path_to_config='/path-to-configuration',
-                                                        base_url='file:///path_to/testdata/repository')
+                                                        base_url='file:///path_to/testdata/repository',
+                                                        segment_tree_cache=mock_create_segment_tree_cache.return_value)
 
+    @patch('config_rpm_maker.create_segment_tree_cache')
     @patch('config_rpm_maker.clean_up_deleted_hosts_data')
     @patch('config_rpm_maker.get_svn_path_to_config')
     @patch('config_rpm_maker.exit_program')
     @patch('config_rpm_maker.SvnService')
     @patch('config_rpm_maker.ConfigRpmMaker')
-    def test_should_initialize_svn_service_with_path_to_config_from_configuration(self, mock_config_rpm_maker_class, mock_svn_service_constructor, mock_exit_program, mock_config, mock_clean_up_deleted_hosts_data):
+    def test_should_initialize_svn_service_with_path_to_config_from_configuration(self, mock_config_rpm_maker_class, mock_svn_service_constructor, mock_exit_program, mock_config, mock_clean_up_deleted_hosts_data, mock_create_segment_tree_cache):
 
         mock_config.return_value = '/path-to-configuration'
         mock_svn_service_constructor.return_value = Mock()
@@ -154,14 +159,16 @@ class BuildingConfigurationRpmsAndCleanHostDirectoriesTests(TestCase):
         building_configuration_rpms_and_clean_host_directories('file:///path_to/testdata/repository', 1)
 
         mock_svn_service_constructor.assert_called_with(path_to_config='/path-to-configuration',
-                                                        base_url='file:///path_to/testdata/repository')
+                                                        base_url='file:///path_to/testdata/repository',
+                                                        segment_tree_cache=mock_create_segment_tree_cache.return_value)
 
+    @patch('config_rpm_maker.create_segment_tree_cache')
     @patch('config_rpm_maker.clean_up_deleted_hosts_data')
     @patch('config_rpm_maker.get_svn_path_to_config')
     @patch('config_rpm_maker.exit_program')
     @patch('config_rpm_maker.SvnService')
     @patch('config_rpm_maker.ConfigRpmMaker')
-    def test_should_initialize_config_rpm_maker_with_given_revision_and_svn_service(self, mock_config_rpm_maker_class, mock_svn_service_constructor, mock_exit_program, mock_config, mock_clean_up_deleted_hosts_data):
+    def test_should_initialize_config_rpm_maker_with_given_revision_and_svn_service(self, mock_config_rpm_maker_class, mock_svn_service_constructor, mock_exit_program, mock_config, mock_clean_up_deleted_hosts_data, mock_create_segment_tree_cache):
 
         mock_config.return_value = '/path-to-configuration'
         mock_svn_service = Mock()
@@ -172,12 +179,13 @@ class BuildingConfigurationRpmsAndCleanHostDirectoriesTests(TestCase):
 
         mock_config_rpm_maker_class.assert_called_with(svn_service=mock_svn_service, revision='1980')
 
+    @patch('config_rpm_maker.create_segment_tree_cache')
     @patch('config_rpm_maker.clean_up_deleted_hosts_data')
     @patch('config_rpm_maker.get_svn_path_to_config')
     @patch('config_rpm_maker.exit_program')
     @patch('config_rpm_maker.SvnService')
     @patch('config_rpm_maker.ConfigRpmMaker')
-    def test_should_clean_up_directories_of_hosts_which_have_been_deleted(self, mock_config_rpm_maker_class, mock_svn_service_constructor, mock_exit_program, mock_config, mock_clean_up_deleted_hosts_data):
+    def test_should_clean_up_directories_of_hosts_which_have_been_deleted(self, mock_config_rpm_maker_class, mock_svn_service_constructor, mock_exit_program, mock_config, mock_clean_up_deleted_hosts_data, mock_create_segment_tree_cache):
 
         mock_config.return_value = '/path-to-configuration'
         mock_svn_service = Mock()
@@ -189,6 +197,31 @@ class BuildingConfigurationRpmsAndCleanHostDirectoriesTests(TestCase):
         mock_clean_up_deleted_hosts_data.assert_called_with(mock_svn_service, '1980')
 
 
+class CreateSegmentTreeCacheTests(TestCase):
+
+    @patch('config_rpm_maker.SegmentTreeCache')
+    @patch('config_rpm_maker.get_segment_tree_cache_directory')
+    def test_should_return_none_when_no_directory_is_configured(self, mock_get_segment_tree_cache_directory, mock_segment_tree_cache_class):
+
+        mock_get_segment_tree_cache_directory.return_value = ''
+
+        self.assertEqual(None, create_segment_tree_cache())
+        self.assertFalse(mock_segment_tree_cache_class.called)
+
+    @patch('config_rpm_maker.SegmentTreeCache')
+    @patch('config_rpm_maker.get_segment_tree_cache_max_size')
+    @patch('config_rpm_maker.get_segment_tree_cache_directory')
+    def test_should_create_segment_tree_cache_in_configured_directory(self, mock_get_segment_tree_cache_directory, mock_get_segment_tree_cache_max_size, mock_segment_tree_cache_class):
+
+        mock_get_segment_tree_cache_directory.return_value = '/var/cache/config-rpm-maker'
+        mock_get_segment_tree_cache_max_size.return_value = 1024
+
+        actual_segment_tree_cache = create_segment_tree_cache()
+
+        self.assertEqual(mock_segment_tree_cache_class.return_value, actual_segment_tree_cache)
+        mock_segment_tree_cache_class.assert_called_with('/var/cache/config-rpm-maker', 1024)
+
+
 class InitializeLoggingToConsoleTests(TestCase):
 
     @patch('config_rpm_maker.LOGGER')
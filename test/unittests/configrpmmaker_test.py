@@ -19,7 +19,11 @@ from mock import Mock, call, patch
 from Queue import Queue
 
 from unittest_support import UnitTests
-from config_rpm_maker.configrpmmaker import ConfigRpmMaker
+from config_rpm_maker.configrpmmaker import (ConfigRpmMaker,
+                                             ConfigurationException,
+                                             CouldNotBuildSomeRpmsException,
+                                             CouldNotUploadRpmsException)
+from config_rpm_maker.overlayplanner import ConfigTree
 
 
 class ConstructorTests(UnitTests):
@@ -441,6 +445,409 @@ class CleanUpWorkingDirectoryTests(UnitTests):
         mock_remove.assert_called_with('/path/to/error.log')
 
 
+class GetSvnClientPoolSizeTests(UnitTests):
+
+    @patch('config_rpm_maker.configrpmmaker.get_svn_client_pool_size')
+    def test_should_use_one_svn_client_for_each_thread_when_pool_size_is_zero(self, mock_get_svn_client_pool_size):
+
+        mock_get_svn_client_pool_size.return_value = 0
+
+        self.assertEqual(8, ConfigRpmMaker._get_svn_client_pool_size(Mock(ConfigRpmMaker), 8))
+
+    @patch('config_rpm_maker.configrpmmaker.get_svn_client_pool_size')
+    def test_should_not_use_more_svn_clients_than_threads(self, mock_get_svn_client_pool_size):
+
+        mock_get_svn_client_pool_size.return_value = 16
+
+        self.assertEqual(4, ConfigRpmMaker._get_svn_client_pool_size(Mock(ConfigRpmMaker), 4))
+
+    @patch('config_rpm_maker.configrpmmaker.get_svn_client_pool_size')
+    def test_should_use_configured_pool_size(self, mock_get_svn_client_pool_size):
+
+        mock_get_svn_client_pool_size.return_value = 2
+
+        self.assertEqual(2, ConfigRpmMaker._get_svn_client_pool_size(Mock(ConfigRpmMaker), 4))
+
+    @patch('config_rpm_maker.configrpmmaker.get_svn_client_pool_size')
+    def test_should_raise_exception_when_pool_size_is_negative(self, mock_get_svn_client_pool_size):
+
+        mock_get_svn_client_pool_size.return_value = -1
+
+        self.assertRaises(ConfigurationException, ConfigRpmMaker._get_svn_client_pool_size, Mock(ConfigRpmMaker), 4)
+
+
+class GetBuildProcessCountTests(UnitTests):
+
+    @patch('config_rpm_maker.configrpmmaker.get_build_process_count')
+    def test_should_return_configured_build_process_count(self, mock_get_build_process_count):
+
+        mock_get_build_process_count.return_value = 4
+
+        self.assertEqual(4, ConfigRpmMaker._get_build_process_count(Mock(ConfigRpmMaker)))
+
+    @patch('config_rpm_maker.configrpmmaker.get_build_process_count')
+    def test_should_raise_exception_when_build_process_count_is_negative(self, mock_get_build_process_count):
+
+        mock_get_build_process_count.return_value = -1
+
+        self.assertRaises(ConfigurationException, ConfigRpmMaker._get_build_process_count, Mock(ConfigRpmMaker))
+
+    @patch('config_rpm_maker.configrpmmaker.get_hosts_per_build_process')
+    def test_should_raise_exception_when_hosts_per_build_process_is_negative(self, mock_get_hosts_per_build_process):
+
+        mock_get_hosts_per_build_process.return_value = -1
+
+        self.assertRaises(ConfigurationException, ConfigRpmMaker._get_hosts_per_build_process, Mock(ConfigRpmMaker))
+
+
+class BuildHostsTests(UnitTests):
+
+    def _given_config_rpm_maker(self, build_process_count=0):
+        mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        mock_config_rpm_maker._get_build_process_count.return_value = build_process_count
+        mock_config_rpm_maker.failed_host_queue = Queue()
+        mock_config_rpm_maker._consume_queue.side_effect = ConfigRpmMaker._consume_queue.__func__.__get__(mock_config_rpm_maker)
+        return mock_config_rpm_maker
+
+    def test_should_build_hosts_in_threads_when_build_process_count_is_zero(self):
+
+        mock_config_rpm_maker = self._given_config_rpm_maker()
+        mock_config_rpm_maker._build_hosts_in_threads.side_effect = lambda hosts, rpm_queue: rpm_queue.put('devweb01.rpm')
+
+        actual_rpms = ConfigRpmMaker._build_hosts(mock_config_rpm_maker, ['devweb01'])
+
+        self.assertEqual(['devweb01.rpm'], actual_rpms)
+        self.assert_mock_never_called(mock_config_rpm_maker._build_hosts_in_processes)
+
+    def test_should_drop_duplicate_rpms(self):
+
+        mock_config_rpm_maker = self._given_config_rpm_maker()
+
+        def build_hosts_in_threads(hosts, rpm_queue):
+            for rpm in ['group.rpm', 'devweb01.rpm', 'group.rpm']:
+                rpm_queue.put(rpm)
+
+        mock_config_rpm_maker._build_hosts_in_threads.side_effect = build_hosts_in_threads
+
+        actual_rpms = ConfigRpmMaker._build_hosts(mock_config_rpm_maker, ['devweb01', 'devweb02'])
+
+        self.assertEqual(['group.rpm', 'devweb01.rpm'], actual_rpms)
+
+    def test_should_build_hosts_in_processes_when_build_process_count_is_greater_than_zero(self):
+
+        mock_config_rpm_maker = self._given_config_rpm_maker(build_process_count=2)
+        mock_config_rpm_maker._build_hosts_in_processes.side_effect = lambda hosts, rpm_queue: rpm_queue.put('devweb01.rpm')
+
+        actual_rpms = ConfigRpmMaker._build_hosts(mock_config_rpm_maker, ['devweb01'])
+
+        self.assertEqual(['devweb01.rpm'], actual_rpms)
+        self.assert_mock_never_called(mock_config_rpm_maker._build_hosts_in_threads)
+
+    def test_should_start_and_finish_rpm_uploader(self):
+
+        mock_config_rpm_maker = self._given_config_rpm_maker()
+        mock_rpm_uploader = Mock()
+        mock_rpm_uploader.error = None
+        mock_rpm_uploader.rpms = ['devweb01.rpm']
+
+        actual_rpms = ConfigRpmMaker._build_hosts(mock_config_rpm_maker, ['devweb01'], mock_rpm_uploader)
+
+        self.assertEqual(['devweb01.rpm'], actual_rpms)
+        rpm_queue = mock_rpm_uploader.start.call_args[0][0]
+        mock_config_rpm_maker._build_hosts_in_threads.assert_called_with(['devweb01'], rpm_queue)
+        mock_rpm_uploader.finish.assert_called_with()
+
+    def test_should_raise_exception_of_failed_upload_after_building(self):
+
+        mock_config_rpm_maker = self._given_config_rpm_maker()
+        mock_rpm_uploader = Mock()
+        mock_rpm_uploader.error = CouldNotUploadRpmsException('Upload failed.')
+
+        self.assertRaises(CouldNotUploadRpmsException, ConfigRpmMaker._build_hosts, mock_config_rpm_maker, ['devweb01'], mock_rpm_uploader)
+
+    def test_should_raise_exception_when_host_failed_although_rpms_have_been_uploaded(self):
+
+        mock_config_rpm_maker = self._given_config_rpm_maker()
+        mock_config_rpm_maker.failed_host_queue.put(('devweb02', 'Stacktrace'))
+        mock_rpm_uploader = Mock()
+        mock_rpm_uploader.error = None
+        mock_rpm_uploader.uploaded_rpms = ['devweb01.rpm']
+
+        self.assertRaises(CouldNotBuildSomeRpmsException, ConfigRpmMaker._build_hosts, mock_config_rpm_maker, ['devweb01', 'devweb02'], mock_rpm_uploader)
+        mock_rpm_uploader.finish.assert_called_with()
+
+
+class UploadRpmsTests(UnitTests):
+
+    @patch('config_rpm_maker.configrpmmaker.ParallelRpmUploader')
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_command')
+    def test_should_upload_rpms_using_parallel_rpm_uploader(self, mock_get_rpm_upload_command, mock_parallel_rpm_uploader_class):
+
+        mock_get_rpm_upload_command.return_value = 'upload'
+        mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        mock_config_rpm_maker._get_chunk_size.return_value = 10
+        mock_config_rpm_maker._get_rpm_upload_chunk_max_bytes.return_value = 1024
+        mock_config_rpm_maker._get_rpm_upload_parallel_uploads.return_value = 4
+        mock_rpm_uploader = mock_parallel_rpm_uploader_class.return_value
+        mock_rpm_uploader.error = None
+
+        ConfigRpmMaker._upload_rpms(mock_config_rpm_maker, ['a.rpm', 'b.rpm'])
+
+        mock_parallel_rpm_uploader_class.assert_called_with('upload', 10, 1024, 4)
+        mock_rpm_uploader.upload.assert_called_with(['a.rpm', 'b.rpm'])
+        mock_rpm_uploader.finish.assert_called_with()
+
+    @patch('config_rpm_maker.configrpmmaker.ParallelRpmUploader')
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_command')
+    def test_should_raise_exception_of_failed_upload(self, mock_get_rpm_upload_command, mock_parallel_rpm_uploader_class):
+
+        mock_get_rpm_upload_command.return_value = 'upload'
+        mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        mock_config_rpm_maker._get_chunk_size.return_value = 10
+        mock_config_rpm_maker._get_rpm_upload_chunk_max_bytes.return_value = 0
+        mock_config_rpm_maker._get_rpm_upload_parallel_uploads.return_value = 1
+        mock_parallel_rpm_uploader_class.return_value.error = CouldNotUploadRpmsException('Upload failed.')
+
+        self.assertRaises(CouldNotUploadRpmsException, ConfigRpmMaker._upload_rpms, mock_config_rpm_maker, ['a.rpm'])
+
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_chunk_max_bytes')
+    def test_should_raise_exception_when_chunk_max_bytes_is_negative(self, mock_get_rpm_upload_chunk_max_bytes):
+
+        mock_get_rpm_upload_chunk_max_bytes.return_value = -1
+
+        self.assertRaises(ConfigurationException, ConfigRpmMaker._get_rpm_upload_chunk_max_bytes, Mock(ConfigRpmMaker))
+
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_parallel_uploads')
+    def test_should_raise_exception_when_parallel_uploads_is_zero(self, mock_get_rpm_upload_parallel_uploads):
+
+        mock_get_rpm_upload_parallel_uploads.return_value = 0
+
+        self.assertRaises(ConfigurationException, ConfigRpmMaker._get_rpm_upload_parallel_uploads, Mock(ConfigRpmMaker))
+
+
+class CreateRpmUploaderTests(UnitTests):
+
+    @patch('config_rpm_maker.configrpmmaker.is_rpm_upload_while_building_enabled')
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_command')
+    def test_should_not_create_rpm_uploader_when_not_enabled(self, mock_get_rpm_upload_command, mock_is_rpm_upload_while_building_enabled):
+
+        mock_get_rpm_upload_command.return_value = 'upload'
+        mock_is_rpm_upload_while_building_enabled.return_value = False
+
+        self.assertEqual(None, ConfigRpmMaker._create_rpm_uploader(Mock(ConfigRpmMaker)))
+
+    @patch('config_rpm_maker.configrpmmaker.is_rpm_upload_while_building_enabled')
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_command')
+    def test_should_not_create_rpm_uploader_without_upload_command(self, mock_get_rpm_upload_command, mock_is_rpm_upload_while_building_enabled):
+
+        mock_get_rpm_upload_command.return_value = None
+        mock_is_rpm_upload_while_building_enabled.return_value = True
+
+        self.assertEqual(None, ConfigRpmMaker._create_rpm_uploader(Mock(ConfigRpmMaker)))
+
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_time_window')
+    @patch('config_rpm_maker.configrpmmaker.is_rpm_upload_while_building_enabled')
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_command')
+    def test_should_create_rpm_uploader(self, mock_get_rpm_upload_command, mock_is_rpm_upload_while_building_enabled, mock_get_rpm_upload_time_window):
+
+        mock_get_rpm_upload_command.return_value = 'upload'
+        mock_is_rpm_upload_while_building_enabled.return_value = True
+        mock_get_rpm_upload_time_window.return_value = 30
+        mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        mock_config_rpm_maker._get_chunk_size.return_value = 10
+        mock_config_rpm_maker._get_rpm_upload_chunk_max_bytes.return_value = 1024
+        mock_config_rpm_maker._get_rpm_upload_parallel_uploads.return_value = 4
+
+        rpm_uploader = ConfigRpmMaker._create_rpm_uploader(mock_config_rpm_maker)
+
+        self.assertEqual(('upload', 10, 30, 1024, 4), (rpm_uploader.rpm_upload_command, rpm_uploader.chunk_size, rpm_uploader.time_window,
+                                                       rpm_uploader.maximum_chunk_bytes, rpm_uploader.parallel_uploads))
+
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_time_window')
+    @patch('config_rpm_maker.configrpmmaker.is_rpm_upload_while_building_enabled')
+    @patch('config_rpm_maker.configrpmmaker.get_rpm_upload_command')
+    def test_should_raise_exception_when_time_window_is_negative(self, mock_get_rpm_upload_command, mock_is_rpm_upload_while_building_enabled, mock_get_rpm_upload_time_window):
+
+        mock_get_rpm_upload_command.return_value = 'upload'
+        mock_is_rpm_upload_while_building_enabled.return_value = True
+        mock_get_rpm_upload_time_window.return_value = -1
+
+        self.assertRaises(ConfigurationException, ConfigRpmMaker._create_rpm_uploader, Mock(ConfigRpmMaker))
+
+
+class CollectResultsOfBuildProcessesTests(UnitTests):
+
+    @patch('config_rpm_maker.configrpmmaker.get_max_failed_hosts')
+    def test_should_put_rpms_of_built_hosts_into_rpm_queue(self, mock_get_max_failed_hosts):
+
+        mock_get_max_failed_hosts.return_value = 3
+        mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        rpm_queue = Queue()
+        results = [('devweb01', ['devweb01.rpm', 'devweb01.src.rpm'], None), ('devweb02', ['devweb02.rpm'], None)]
+
+        ConfigRpmMaker._collect_results_of_build_processes(mock_config_rpm_maker, iter(results), rpm_queue)
+
+        self.assertEqual(['devweb01.rpm', 'devweb01.src.rpm', 'devweb02.rpm'], list(rpm_queue.queue))
+        self.assert_mock_never_called(mock_config_rpm_maker._notify_that_host_failed)
+
+    @patch('config_rpm_maker.configrpmmaker.get_max_failed_hosts')
+    def test_should_notify_that_host_failed(self, mock_get_max_failed_hosts):
+
+        mock_get_max_failed_hosts.return_value = 3
+        mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        mock_config_rpm_maker.failed_host_queue = Queue()
+
+        ConfigRpmMaker._collect_results_of_build_processes(mock_config_rpm_maker, iter([('devweb01', [], 'Stacktrace')]), Queue())
+
+        mock_config_rpm_maker._notify_that_host_failed.assert_called_with('devweb01', 'Stacktrace')
+
+    @patch('config_rpm_maker.configrpmmaker.get_max_failed_hosts')
+    def test_should_stop_collecting_when_maximum_of_failed_hosts_reached(self, mock_get_max_failed_hosts):
+
+        mock_get_max_failed_hosts.return_value = 1
+        mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        mock_config_rpm_maker.failed_host_queue = Queue()
+        mock_config_rpm_maker._notify_that_host_failed.side_effect = lambda host, error: mock_config_rpm_maker.failed_host_queue.put((host, error))
+        rpm_queue = Queue()
+        results = iter([('devweb01', [], 'Stacktrace'), ('devweb02', ['devweb02.rpm'], None)])
+
+        ConfigRpmMaker._collect_results_of_build_processes(mock_config_rpm_maker, results, rpm_queue)
+
+        self.assertTrue(rpm_queue.empty())
+        self.assertEqual([('devweb02', ['devweb02.rpm'], None)], list(results))
+
+
+class RemoveDirectoriesOfBuildProcessesTests(UnitTests):
+
+    @patch('config_rpm_maker.configrpmmaker.rmtree')
+    def test_should_remove_directories_of_build_processes(self, mock_rmtree):
+
+        mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        mock_config_rpm_maker.work_dir = '/work'
+        mock_config_rpm_maker._keep_work_dir.return_value = False
+
+        ConfigRpmMaker._remove_directories_of_build_processes(mock_config_rpm_maker)
+
+        mock_rmtree.assert_called_with('/work/build-processes', ignore_errors=True)
+
+    @patch('config_rpm_maker.configrpmmaker.rmtree')
+    def test_should_keep_directories_of_build_processes_when_work_dir_is_kept(self, mock_rmtree):
+
+        mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        mock_config_rpm_maker._keep_work_dir.return_value = True
+
+        ConfigRpmMaker._remove_directories_of_build_processes(mock_config_rpm_maker)
+
+        self.assert_mock_never_called(mock_rmtree)
+
+
+class IsAnySegmentAffectedTests(UnitTests):
+
+    def test_should_return_false_when_change_set_is_empty(self):
+
+        self.assertFalse(ConfigRpmMaker._is_any_segment_affected(Mock(ConfigRpmMaker), []))
+
+    def test_should_return_false_when_no_changed_path_is_below_a_segment(self):
+
+        self.assertFalse(ConfigRpmMaker._is_any_segment_affected(Mock(ConfigRpmMaker), ['', 'default.spec', 'typ', 'README']))
+
+    def test_should_return_true_when_a_changed_path_is_below_all(self):
+
+        self.assertTrue(ConfigRpmMaker._is_any_segment_affected(Mock(ConfigRpmMaker), ['default.spec', 'all/etc/motd']))
+
+    def test_should_return_true_when_a_changed_path_is_below_a_segment(self):
+
+        self.assertTrue(ConfigRpmMaker._is_any_segment_affected(Mock(ConfigRpmMaker), ['host/devweb01']))
+
+
+class PruneHostsWithShadowedChangesTests(UnitTests):
+
+    def setUp(self):
+        self.mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        self.mock_config_rpm_maker.revision = '123'
+        self.mock_config_rpm_maker.config_tree = None
+        self.mock_config_rpm_maker._get_config_tree.return_value = ConfigTree([('all', True),
+                                                                              ('all/etc', True),
+                                                                              ('all/etc/motd', False),
+                                                                              ('host', True),
+                                                                              ('host/berweb01', True),
+                                                                              ('host/berweb01/etc', True),
+                                                                              ('host/berweb01/etc/motd', False),
+                                                                              ('host/berweb02', True)])
+
+    def test_should_prune_host_overriding_changed_file(self):
+
+        actual_hosts = ConfigRpmMaker._prune_hosts_with_shadowed_changes(self.mock_config_rpm_maker, ['all/etc/motd'], ['berweb01', 'berweb02'])
+
+        self.assertEqual(['berweb02'], actual_hosts)
+
+    def test_should_not_prune_host_when_one_changed_file_is_not_overridden(self):
+
+        actual_hosts = ConfigRpmMaker._prune_hosts_with_shadowed_changes(self.mock_config_rpm_maker, ['all/etc/motd', 'all/etc/issue'], ['berweb01'])
+
+        self.assertEqual(['berweb01'], actual_hosts)
+
+
+class PruneHostsNotUsingChangedVariablesTests(UnitTests):
+
+    def setUp(self):
+        self.mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        self.mock_config_rpm_maker.revision = '123'
+        self.mock_config_rpm_maker.work_dir = '/path/to/work-dir'
+        self.mock_config_rpm_maker.svn_service = Mock()
+        self.mock_config_rpm_maker.svn_service.get_added_or_deleted_paths.return_value = []
+        self.mock_config_rpm_maker.export_cache = Mock()
+
+    @patch('config_rpm_maker.configrpmmaker.VariableImpactAnalyzer')
+    def test_should_return_hosts_without_reason_to_skip(self, mock_variable_impact_analyzer_class):
+
+        mock_variable_impact_analyzer_class.return_value.get_reason_to_skip.side_effect = \
+            lambda host, changed_paths, added_or_deleted_paths: None if host == 'berweb01' else 'no file references LOC'
+
+        actual_hosts = ConfigRpmMaker._prune_hosts_not_using_changed_variables(self.mock_config_rpm_maker, ['all/VARIABLES/LOC'],
+                                                                               ['berweb01', 'berweb02', 'berweb03'])
+
+        self.assertEqual(['berweb01'], actual_hosts)
+
+    @patch('config_rpm_maker.configrpmmaker.get_path_to_spec_file')
+    @patch('config_rpm_maker.configrpmmaker.VariableImpactAnalyzer')
+    def test_should_export_spec_file_for_analysis(self, mock_variable_impact_analyzer_class, mock_get_path_to_spec_file):
+
+        mock_get_path_to_spec_file.return_value = 'default.spec'
+
+        ConfigRpmMaker._prune_hosts_not_using_changed_variables(self.mock_config_rpm_maker, ['all/VARIABLES/LOC'], ['berweb01'])
+
+        self.mock_config_rpm_maker.svn_service.export.assert_called_with('default.spec', '/path/to/work-dir/impact-analysis.spec', '123')
+        self.assertEqual('/path/to/work-dir/impact-analysis.spec', mock_variable_impact_analyzer_class.call_args[0][4])
+
+    @patch('config_rpm_maker.configrpmmaker.VariableImpactAnalyzer')
+    def test_should_pass_added_or_deleted_paths_of_revision(self, mock_variable_impact_analyzer_class):
+
+        self.mock_config_rpm_maker.svn_service.get_added_or_deleted_paths.return_value = ['all/VARIABLES/LOC']
+
+        ConfigRpmMaker._prune_hosts_not_using_changed_variables(self.mock_config_rpm_maker, ['all/VARIABLES/LOC'], ['berweb01'])
+
+        self.mock_config_rpm_maker.svn_service.get_added_or_deleted_paths.assert_called_with('123')
+        mock_variable_impact_analyzer_class.return_value.get_reason_to_skip.assert_called_with('berweb01', ['all/VARIABLES/LOC'], set(['all/VARIABLES/LOC']))
+
+
+class GetConfigTreeTests(UnitTests):
+
+    def test_should_list_config_tree_of_revision_only_once(self):
+
+        mock_config_rpm_maker = Mock(ConfigRpmMaker)
+        mock_config_rpm_maker.revision = '123'
+        mock_config_rpm_maker.config_tree = None
+        mock_config_rpm_maker.svn_service = Mock()
+        mock_config_rpm_maker.svn_service.list_config_tree.return_value = [('all', True), ('all/motd', False)]
+
+        ConfigRpmMaker._get_config_tree(mock_config_rpm_maker)
+        actual_config_tree = ConfigRpmMaker._get_config_tree(mock_config_rpm_maker)
+
+        mock_config_rpm_maker.svn_service.list_config_tree.assert_called_once_with('123')
+        self.assertTrue(actual_config_tree.is_file('all/motd'))
+
+
 class NotifyThatHostBuildFailedTest(UnitTests):
 
     def test_should_add_fail_information_to_failed_host_queue(self):
@@ -27,34 +27,51 @@ from config_rpm_maker.configuration import (CONFIGURATION_FILE_PATH,
                                             ConfigurationException,
                                             ConfigurationProperty,
                                             unknown_hosts_are_allowed,
+                                            get_build_process_count,
                                             get_config_rpm_prefix,
                                             get_config_viewer_host_directory,
                                             get_custom_dns_search_list,
                                             get_error_log_directory,
                                             get_error_log_url,
+                                            get_hosts_per_build_process,
                                             get_log_level,
                                             get_max_failed_hosts,
                                             get_max_file_size,
                                             get_path_to_spec_file,
+                                            get_rendered_output_cache_size,
+                                            get_segment_tree_cache_directory,
+                                            get_source_tar_compression_level,
+                                            get_segment_tree_cache_max_size,
+                                            get_svn_client_pool_size,
                                             get_svn_path_to_config,
                                             get_repo_packages_regex,
+                                            get_rpm_upload_chunk_max_bytes,
                                             get_rpm_upload_chunk_size,
                                             get_rpm_upload_command,
+                                            get_rpm_upload_parallel_uploads,
+                                            get_rpm_upload_time_window,
+                                            get_template_cache_size,
                                             get_thread_count,
                                             get_temporary_directory,
                                             is_no_clean_up_enabled,
                                             is_config_viewer_only_enabled,
+                                            is_pruning_of_shadowed_changes_enabled,
+                                            is_pruning_of_unused_variable_changes_enabled,
+                                            is_rpm_upload_while_building_enabled,
                                             is_verbose_enabled,
                                             build_config_viewer_host_directory,
+                                            get_configuration_snapshot,
                                             get_file_path_of_loaded_configuration,
                                             get_properties,
                                             load_configuration_file,
                                             set_property,
+                                            set_configuration_snapshot,
                                             set_properties,
                                             _determine_configuration_file_path,
                                             _ensure_valid_log_level,
                                             _ensure_is_a_boolean_value,
                                             _ensure_is_an_integer,
+                                            _ensure_is_a_compression_level,
                                             _ensure_is_a_string,
                                             _ensure_is_a_string_or_none,
                                             _ensure_is_a_list_of_strings,
@@ -86,6 +103,26 @@ class SetPropertiesTests(TestCase):
         self.assertEqual(configuration._properties, fake_properties)
 
 
+class ConfigurationSnapshotTests(TestCase):
+
+    @patch('config_rpm_maker.configuration._properties', {get_thread_count: 4, get_temporary_directory: '/tmp/builds'})
+    def test_should_return_snapshot_using_keys_of_properties(self):
+
+        self.assertEqual({'thread_count': 4, 'temp_dir': '/tmp/builds'}, get_configuration_snapshot())
+
+    @patch('config_rpm_maker.configuration._properties', None)
+    def test_should_return_empty_snapshot_if_properties_have_not_been_loaded(self):
+
+        self.assertEqual({}, get_configuration_snapshot())
+
+    @patch('config_rpm_maker.configuration._properties', None)
+    def test_should_set_properties_from_snapshot(self):
+
+        set_configuration_snapshot({'thread_count': 4, 'temp_dir': '/tmp/builds'})
+
+        self.assertEqual({get_thread_count: 4, get_temporary_directory: '/tmp/builds'}, get_properties())
+
+
 class GetFilePathOfLoadedConfiguration(TestCase):
 
     @patch('config_rpm_maker.configuration._file_path_of_loaded_configuration')
@@ -225,7 +262,7 @@ class EnsurePropertiesAreValidTest(UnitTests):
         actual_properties = _ensure_properties_are_valid(properties)
 
         self.assertFalse(actual_properties[unknown_hosts_are_allowed])
-        mock_ensure_valid_allow_unknown_hosts.assert_called_with(unknown_hosts_are_allowed, False)
+        mock_ensure_valid_allow_unknown_hosts.assert_any_call(unknown_hosts_are_allowed, False)
 
     def test_should_return_default_property_for_allow_unkown_hosts(self):
 
@@ -395,6 +432,82 @@ class EnsurePropertiesAreValidTest(UnitTests):
 
         self.assertEqual(None, actual_properties[get_rpm_upload_command])
 
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_rpm_upload_chunk_max_bytes(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'rpm_upload_chunk_max_bytes': 1024}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_rpm_upload_chunk_max_bytes])
+        mock_ensure_is_an_integer.assert_any_call(get_rpm_upload_chunk_max_bytes, 1024)
+
+    def test_should_return_default_for_rpm_upload_chunk_max_bytes_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(0, actual_properties[get_rpm_upload_chunk_max_bytes])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_rpm_upload_parallel_uploads(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'rpm_upload_parallel_uploads': 4}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_rpm_upload_parallel_uploads])
+        mock_ensure_is_an_integer.assert_any_call(get_rpm_upload_parallel_uploads, 4)
+
+    def test_should_return_default_for_rpm_upload_parallel_uploads_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(1, actual_properties[get_rpm_upload_parallel_uploads])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_rpm_upload_time_window(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'rpm_upload_time_window': 30}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_rpm_upload_time_window])
+        mock_ensure_is_an_integer.assert_any_call(get_rpm_upload_time_window, 30)
+
+    def test_should_return_default_for_rpm_upload_time_window_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(10, actual_properties[get_rpm_upload_time_window])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_boolean_value')
+    def test_should_return_rpm_upload_while_building(self, mock_ensure_is_a_boolean_value):
+
+        mock_ensure_is_a_boolean_value.return_value = True
+        properties = {'rpm_upload_while_building': True}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertTrue(actual_properties[is_rpm_upload_while_building_enabled])
+        mock_ensure_is_a_boolean_value.assert_any_call(is_rpm_upload_while_building_enabled, True)
+
+    def test_should_return_default_for_rpm_upload_while_building_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertFalse(actual_properties[is_rpm_upload_while_building_enabled])
+
     @patch('config_rpm_maker.configuration._ensure_is_a_string')
     def test_should_return_svn_path_to_config(self, mock_ensure_is_a_string):
 
@@ -414,6 +527,158 @@ class EnsurePropertiesAreValidTest(UnitTests):
 
         self.assertEqual('/config', actual_properties[get_svn_path_to_config])
 
+    @patch('config_rpm_maker.configuration._ensure_is_a_string')
+    def test_should_return_segment_tree_cache_directory(self, mock_ensure_is_a_string):
+
+        mock_ensure_is_a_string.return_value = '/var/cache/config-rpm-maker'
+        properties = {'segment_tree_cache_dir': '/cache'}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('/var/cache/config-rpm-maker', actual_properties[get_segment_tree_cache_directory])
+        mock_ensure_is_a_string.assert_any_call(get_segment_tree_cache_directory, '/cache')
+
+    def test_should_return_default_for_segment_tree_cache_directory_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual('', actual_properties[get_segment_tree_cache_directory])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_compression_level')
+    def test_should_return_source_tar_compression_level(self, mock_ensure_is_a_compression_level):
+
+        mock_ensure_is_a_compression_level.return_value = 9
+        properties = {'source_tar_compression_level': 1}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(9, actual_properties[get_source_tar_compression_level])
+        mock_ensure_is_a_compression_level.assert_any_call(get_source_tar_compression_level, 1)
+
+    def test_should_return_default_for_source_tar_compression_level_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(6, actual_properties[get_source_tar_compression_level])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_segment_tree_cache_max_size(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'segment_tree_cache_max_size': 1024}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_segment_tree_cache_max_size])
+        mock_ensure_is_an_integer.assert_any_call(get_segment_tree_cache_max_size, 1024)
+
+    def test_should_return_default_for_segment_tree_cache_max_size_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(512 * 1024 * 1024, actual_properties[get_segment_tree_cache_max_size])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_rendered_output_cache_size(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'rendered_output_cache_size': 1024}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_rendered_output_cache_size])
+        mock_ensure_is_an_integer.assert_any_call(get_rendered_output_cache_size, 1024)
+
+    def test_should_return_default_for_rendered_output_cache_size_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(64 * 1024 * 1024, actual_properties[get_rendered_output_cache_size])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_template_cache_size(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'template_cache_size': 1024}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_template_cache_size])
+        mock_ensure_is_an_integer.assert_any_call(get_template_cache_size, 1024)
+
+    def test_should_return_default_for_template_cache_size_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(64 * 1024 * 1024, actual_properties[get_template_cache_size])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_svn_client_pool_size(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'svn_client_pool_size': 4}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_svn_client_pool_size])
+        mock_ensure_is_an_integer.assert_any_call(get_svn_client_pool_size, 4)
+
+    def test_should_return_default_for_svn_client_pool_size_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(0, actual_properties[get_svn_client_pool_size])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_build_process_count(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'build_process_count': 4}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_build_process_count])
+        mock_ensure_is_an_integer.assert_any_call(get_build_process_count, 4)
+
+    def test_should_return_default_for_build_process_count_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(0, actual_properties[get_build_process_count])
+
+    @patch('config_rpm_maker.configuration._ensure_is_an_integer')
+    def test_should_return_hosts_per_build_process(self, mock_ensure_is_an_integer):
+
+        mock_ensure_is_an_integer.return_value = 123
+        properties = {'hosts_per_build_process': 20}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(123, actual_properties[get_hosts_per_build_process])
+        mock_ensure_is_an_integer.assert_any_call(get_hosts_per_build_process, 20)
+
+    def test_should_return_default_for_hosts_per_build_process_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertEqual(50, actual_properties[get_hosts_per_build_process])
+
     @patch('config_rpm_maker.configuration._ensure_is_an_integer')
     def test_should_return_thread_count(self, mock_ensure_is_an_integer):
 
@@ -543,6 +808,44 @@ class EnsurePropertiesAreValidTest(UnitTests):
 
         self.assertFalse(actual_properties[is_verbose_enabled])
 
+    @patch('config_rpm_maker.configuration._ensure_is_a_boolean_value')
+    def test_should_return_prune_shadowed_changes(self, mock_ensure_is_a_boolean_value):
+
+        mock_ensure_is_a_boolean_value.return_value = True
+        properties = {'prune_shadowed_changes': True}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertTrue(actual_properties[is_pruning_of_shadowed_changes_enabled])
+        mock_ensure_is_a_boolean_value.assert_any_call(is_pruning_of_shadowed_changes_enabled, True)
+
+    def test_should_return_default_for_prune_shadowed_changes_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertFalse(actual_properties[is_pruning_of_shadowed_changes_enabled])
+
+    @patch('config_rpm_maker.configuration._ensure_is_a_boolean_value')
+    def test_should_return_prune_unused_variable_changes(self, mock_ensure_is_a_boolean_value):
+
+        mock_ensure_is_a_boolean_value.return_value = True
+        properties = {'prune_unused_variable_changes': True}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertTrue(actual_properties[is_pruning_of_unused_variable_changes_enabled])
+        mock_ensure_is_a_boolean_value.assert_any_call(is_pruning_of_unused_variable_changes_enabled, True)
+
+    def test_should_return_default_for_prune_unused_variable_changes_if_not_defined(self):
+
+        properties = {}
+
+        actual_properties = _ensure_properties_are_valid(properties)
+
+        self.assertFalse(actual_properties[is_pruning_of_unused_variable_changes_enabled])
+
     def test_should_return_default_no_clean_up(self):
 
         properties = {}
@@ -808,6 +1111,26 @@ class EnsureIsAInteger(TestCase):
         self.assertEqual(123, actual)
 
 
+class EnsureIsACompressionLevelTests(TestCase):
+
+    def test_should_raise_exception_if_type_is_not_integer(self):
+
+        self.assertRaises(ConfigurationException, _ensure_is_a_compression_level, 'key', '9')
+
+    def test_should_raise_exception_if_value_is_negative(self):
+
+        self.assertRaises(ConfigurationException, _ensure_is_a_compression_level, 'key', -1)
+
+    def test_should_raise_exception_if_value_is_greater_than_nine(self):
+
+        self.assertRaises(ConfigurationException, _ensure_is_a_compression_level, 'key', 10)
+
+    def test_should_return_given_compression_level(self):
+
+        self.assertEqual(0, _ensure_is_a_compression_level('key', 0))
+        self.assertEqual(9, _ensure_is_a_compression_level('key', 9))
+
+
 class EnsureRepoPackageRegexIsAValidRegularExpressionTests(TestCase):
 
     def test_should_raise_an_exception_if_given_value_is_not_of_type_string(self):
@@ -0,0 +1,142 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from mock import Mock, patch
+from unittest import TestCase
+
+from config_rpm_maker.exportcache import ExportCache
+
+
+class ExportCacheTests(TestCase):
+
+    def setUp(self):
+        self.mock_svn_service = Mock()
+        self.mock_svn_service.export.return_value = [('typ/web', 'data'), ('typ/web', 'data/index.html')]
+        self.mock_svn_service_queue = Mock()
+        self.mock_svn_service_queue.get.return_value = self.mock_svn_service
+        self.export_cache = ExportCache('/staging')
+
+    @patch('config_rpm_maker.exportcache.copy_tree')
+    def test_should_export_svn_path_into_staging_directory(self, mock_copy_tree):
+
+        self.export_cache.export(self.mock_svn_service_queue, 'typ/web', '/host-a', '123')
+
+        self.mock_svn_service.export.assert_called_with('typ/web', '/staging/0', '123')
+        self.mock_svn_service_queue.put.assert_called_with(self.mock_svn_service)
+
+    @patch('config_rpm_maker.exportcache.copy_tree')
+    def test_should_copy_staged_files_into_target_directory(self, mock_copy_tree):
+
+        self.export_cache.export(self.mock_svn_service_queue, 'typ/web', '/host-a', '123')
+
+        mock_copy_tree.assert_called_with('/staging/0', '/host-a')
+
+    @patch('config_rpm_maker.exportcache.copy_tree')
+    def test_should_return_exported_paths(self, mock_copy_tree):
+
+        actual_exported_paths = self.export_cache.export(self.mock_svn_service_queue, 'typ/web', '/host-a', '123')
+
+        self.assertEqual([('typ/web', 'data'), ('typ/web', 'data/index.html')], actual_exported_paths)
+
+    @patch('config_rpm_maker.exportcache.copy_tree')
+    def test_should_export_svn_path_only_once_per_revision(self, mock_copy_tree):
+
+        self.export_cache.export(self.mock_svn_service_queue, 'typ/web', '/host-a', '123')
+        actual_exported_paths = self.export_cache.export(self.mock_svn_service_queue, 'typ/web', '/host-b', '123')
+
+        self.assertEqual(1, self.mock_svn_service.export.call_count)
+        self.assertEqual(1, self.mock_svn_service_queue.get.call_count)
+        mock_copy_tree.assert_called_with('/staging/0', '/host-b')
+        self.assertEqual([('typ/web', 'data'), ('typ/web', 'data/index.html')], actual_exported_paths)
+
+    @patch('config_rpm_maker.exportcache.copy_tree')
+    def test_should_export_different_svn_paths_into_different_staging_directories(self, mock_copy_tree):
+
+        self.export_cache.export(self.mock_svn_service_queue, 'typ/web', '/host-a', '123')
+        self.export_cache.export(self.mock_svn_service_queue, 'all', '/host-a', '123')
+
+        self.mock_svn_service.export.assert_any_call('typ/web', '/staging/0', '123')
+        self.mock_svn_service.export.assert_any_call('all', '/staging/1', '123')
+
+    @patch('config_rpm_maker.exportcache.rmtree')
+    @patch('config_rpm_maker.exportcache.copy_tree')
+    def test_should_raise_error_of_failed_export(self, mock_copy_tree, mock_rmtree):
+
+        self.mock_svn_service.export.side_effect = ValueError('connection refused')
+
+        self.assertRaises(ValueError, self.export_cache.export, self.mock_svn_service_queue, 'loctyp/devweb', '/host-a', '123')
+
+        self.assertEqual(0, mock_copy_tree.call_count)
+        self.mock_svn_service_queue.put.assert_called_with(self.mock_svn_service)
+
+    @patch('config_rpm_maker.exportcache.rmtree')
+    @patch('config_rpm_maker.exportcache.copy_tree')
+    def test_should_export_svn_path_again_for_next_host_after_failed_export(self, mock_copy_tree, mock_rmtree):
+
+        self.mock_svn_service.export.side_effect = [ValueError('connection refused'), [('loctyp/devweb', 'data')]]
+
+        self.assertRaises(ValueError, self.export_cache.export, self.mock_svn_service_queue, 'loctyp/devweb', '/host-a', '123')
+        actual_exported_paths = self.export_cache.export(self.mock_svn_service_queue, 'loctyp/devweb', '/host-b', '123')
+
+        self.assertEqual(2, self.mock_svn_service.export.call_count)
+        self.assertEqual([('loctyp/devweb', 'data')], actual_exported_paths)
+        mock_copy_tree.assert_called_with('/staging/1', '/host-b')
+
+    @patch('config_rpm_maker.exportcache.rmtree')
+    @patch('config_rpm_maker.exportcache.copy_tree')
+    def test_should_remove_staging_directory_of_failed_export(self, mock_copy_tree, mock_rmtree):
+
+        self.mock_svn_service.export.side_effect = ValueError('connection refused')
+
+        self.assertRaises(ValueError, self.export_cache.export, self.mock_svn_service_queue, 'loctyp/devweb', '/host-a', '123')
+
+        mock_rmtree.assert_called_with('/staging/0', ignore_errors=True)
+
+    @patch('config_rpm_maker.exportcache.rmtree')
+    @patch('config_rpm_maker.exportcache.copy_tree')
+    def test_should_not_reuse_staging_directory_of_other_svn_path_after_failed_export(self, mock_copy_tree, mock_rmtree):
+
+        self.mock_svn_service.export.side_effect = [[], ValueError('connection refused'), []]
+
+        self.export_cache.export(self.mock_svn_service_queue, 'all', '/host-a', '123')
+        self.assertRaises(ValueError, self.export_cache.export, self.mock_svn_service_queue, 'loctyp/devweb', '/host-a', '123')
+        self.export_cache.export(self.mock_svn_service_queue, 'typ/web', '/host-a', '123')
+
+        self.mock_svn_service.export.assert_called_with('typ/web', '/staging/2', '123')
+
+
+class GetDirectoryTests(TestCase):
+
+    def setUp(self):
+        self.mock_svn_service = Mock()
+        self.mock_svn_service_queue = Mock()
+        self.mock_svn_service_queue.get.return_value = self.mock_svn_service
+        self.export_cache = ExportCache('/staging')
+
+    def test_should_export_svn_path_only_once_and_return_staging_directory(self):
+
+        self.export_cache.get_directory(self.mock_svn_service_queue, 'typ/web', '123')
+        actual_directory = self.export_cache.get_directory(self.mock_svn_service_queue, 'typ/web', '123')
+
+        self.assertEqual('/staging/0', actual_directory)
+        self.mock_svn_service.export.assert_called_once_with('typ/web', '/staging/0', '123')
+
+    @patch('config_rpm_maker.exportcache.rmtree')
+    def test_should_raise_error_of_failed_export(self, mock_rmtree):
+
+        self.mock_svn_service.export.side_effect = ValueError('failed')
+
+        self.assertRaises(ValueError, self.export_cache.get_directory, self.mock_svn_service_queue, 'typ/web', '123')
@@ -0,0 +1,86 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Thread
+
+from mock import Mock
+
+from unittest_support import UnitTests
+from config_rpm_maker.grouprpmregistry import GroupRpmRegistry
+
+
+class GroupRpmRegistryTests(UnitTests):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp()
+        self.group_rpm_registry = GroupRpmRegistry(join(self.temporary_directory, 'group-rpms'))
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def test_should_let_first_member_host_claim_group_rpm(self):
+
+        self.assertTrue(self.group_rpm_registry.claim('group-dev-web', 'devweb01'))
+
+    def test_should_not_let_other_member_hosts_claim_group_rpm(self):
+
+        self.group_rpm_registry.claim('group-dev-web', 'devweb01')
+
+        self.assertFalse(self.group_rpm_registry.claim('group-dev-web', 'devweb02'))
+        self.assertEqual('devweb01', self.group_rpm_registry.get_owner('group-dev-web'))
+
+    def test_should_let_hosts_claim_different_group_rpms(self):
+
+        self.assertTrue(self.group_rpm_registry.claim('group-dev-web', 'devweb01'))
+        self.assertTrue(self.group_rpm_registry.claim('group/pro-web', 'proweb01'))
+        self.assertEqual('proweb01', self.group_rpm_registry.get_owner('group/pro-web'))
+
+    def test_should_return_none_as_owner_of_unclaimed_group_rpm(self):
+
+        self.assertEqual(None, self.group_rpm_registry.get_owner('group-dev-web'))
+
+    def test_should_share_claims_with_other_registry_using_same_directory(self):
+
+        self.group_rpm_registry.claim('group-dev-web', 'devweb01')
+
+        other_group_rpm_registry = GroupRpmRegistry(join(self.temporary_directory, 'group-rpms'))
+
+        self.assertFalse(other_group_rpm_registry.claim('group-dev-web', 'devweb02'))
+
+    def test_should_let_exactly_one_of_many_threads_claim_group_rpm(self):
+
+        claims = []
+        threads = [Thread(target=lambda hostname: claims.append(self.group_rpm_registry.claim('group-dev-web', hostname)), args=('devweb%02d' % number,))
+                   for number in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, claims.count(True))
+
+    def test_should_log_statistics(self):
+
+        self.group_rpm_registry.claim('group-dev-web', 'devweb01')
+        self.group_rpm_registry.claim('group-dev-web', 'devweb02')
+        mock_logging_function = Mock()
+
+        self.group_rpm_registry.log_statistics(mock_logging_function)
+
+        mock_logging_function.assert_called_with('Group rpm registry summary: %d group rpm(s) claimed, %d build(s) of member hosts skipped.', 1, 1)
@@ -16,15 +16,21 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from os import makedirs
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
 from unittest import TestCase
-from mock import Mock, patch
+from mock import ANY, Mock, patch
 from subprocess import PIPE
 
 from unittest_support import UnitTests
 
 import config_rpm_maker
 
-from config_rpm_maker.hostrpmbuilder import CouldNotBuildRpmException, ConfigDirAlreadyExistsException, CouldNotCreateConfigDirException, HostRpmBuilder
+from config_rpm_maker.hostrpmbuilder import (CouldNotBuildRpmException, ConfigDirAlreadyExistsException, CouldNotCreateConfigDirException,
+                                             CouldNotTarConfigurationDirectoryException, HostRpmBuilder)
+from config_rpm_maker.segment import Loc, Typ
 
 
 class ConstructorTests(TestCase):
@@ -181,6 +187,8 @@ class BuildTests(TestCase):
         mock_host_rpm_builder.config_rpm_prefix = "any-config-prefix"
 
         mock_host_rpm_builder._overlay_segment = self._create_mock_overlay_segment_method()
+        mock_host_rpm_builder._overlay_segments.side_effect = lambda: [(segment, mock_host_rpm_builder._overlay_segment(segment))
+                                                                      for segment in config_rpm_maker.hostrpmbuilder.OVERLAY_ORDER]
 
         self.mock_host_rpm_builder = mock_host_rpm_builder
 
@@ -351,15 +359,14 @@ class BuildTests(TestCase):
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
-    @patch('config_rpm_maker.hostrpmbuilder.TokenReplacer')
-    @patch('config_rpm_maker.hostrpmbuilder.open', create=True)
-    def test_should_save_segment_variables_without_host_when_building_group_rpm(self, _, token_replacer, mock_exists, mock_mkdir):
+    def test_should_save_segment_variables_without_host_when_building_group_rpm(self, mock_exists, mock_mkdir):
         def only_rpm_name_variable_file_exists(path):
             if path.endswith("RPM_NAME"):
                 return True
             return False
 
         mock_exists.side_effect = only_rpm_name_variable_file_exists
+        self.mock_host_rpm_builder._resolve_group_rpm_name.return_value = "any-group-rpm-name"
 
         HostRpmBuilder.build(self.mock_host_rpm_builder)
 
@@ -380,15 +387,13 @@ class BuildTests(TestCase):
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
-    @patch('config_rpm_maker.hostrpmbuilder.TokenReplacer')
-    @patch('config_rpm_maker.hostrpmbuilder.open', create=True)
-    def test_should_write_empty_protection_variable_for_group_rpm(self, mock_open, token_replacer, mock_exists, mock_mkdir):
+    def test_should_write_empty_protection_variable_for_group_rpm(self, mock_exists, mock_mkdir):
         def only_rpm_name_variable_file_exists(path):
             if path.endswith("RPM_NAME"):
                 return True
             return False
         mock_exists.side_effect = only_rpm_name_variable_file_exists
-        mock_open.return_value.__enter__.return_value.read.return_value.rstrip.return_value = "any-group-rpm-name"
+        self.mock_host_rpm_builder._resolve_group_rpm_name.return_value = "any-group-rpm-name"
 
         HostRpmBuilder.build(self.mock_host_rpm_builder)
 
@@ -412,13 +417,13 @@ class BuildTests(TestCase):
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
-    def test_should_copy_files_for_config_viewer(self, mock_exists, mock_mkdir):
+    def test_should_create_config_viewer_host_directory(self, mock_exists, mock_mkdir):
 
         mock_exists.return_value = False
 
         HostRpmBuilder.build(self.mock_host_rpm_builder)
 
-        self.mock_host_rpm_builder._copy_files_for_config_viewer.assert_called_with()
+        self.mock_host_rpm_builder._create_config_viewer_host_directory.assert_called_with()
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
@@ -434,13 +439,13 @@ class BuildTests(TestCase):
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
-    def test_should_filter_tokens_in_rpm_sources(self, mock_exists, mock_mkdir):
+    def test_should_filter_tokens_in_rpm_sources_and_config_viewer(self, mock_exists, mock_mkdir):
 
         mock_exists.return_value = False
 
         HostRpmBuilder.build(self.mock_host_rpm_builder)
 
-        self.mock_host_rpm_builder._filter_tokens_in_rpm_sources.assert_called_with()
+        self.mock_host_rpm_builder._filter_tokens_in_rpm_sources_and_config_viewer.assert_called_with()
 
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
@@ -465,16 +470,6 @@ class BuildTests(TestCase):
         mock_get.assert_any_call()
         self.assertEqual(0, len(self.mock_host_rpm_builder._build_rpm_using_rpmbuild.call_args_list))
 
-    @patch('config_rpm_maker.hostrpmbuilder.mkdir')
-    @patch('config_rpm_maker.hostrpmbuilder.exists')
-    def test_should_filter_tokens_in_config_viewer(self, mock_exists, mock_mkdir):
-
-        mock_exists.return_value = False
-
-        HostRpmBuilder.build(self.mock_host_rpm_builder)
-
-        self.mock_host_rpm_builder._filter_tokens_in_config_viewer.assert_called_with()
-
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
     def test_should_write_revision_file_for_config_viewer(self, mock_exists, mock_mkdir):
@@ -521,6 +516,20 @@ class BuildTests(TestCase):
 
         self.assertEqual(found_rpms, actual_built_rpms)
 
+    @patch('config_rpm_maker.hostrpmbuilder.mkdir')
+    @patch('config_rpm_maker.hostrpmbuilder.exists')
+    def test_should_not_build_group_rpm_built_by_other_member_host(self, mock_exists, mock_mkdir):
+
+        self.mock_host_rpm_builder._claim_rpm.return_value = False
+        mock_exists.return_value = False
+
+        actual_built_rpms = HostRpmBuilder.build(self.mock_host_rpm_builder)
+
+        self.assertEqual([], actual_built_rpms)
+        self.assertEqual(0, len(self.mock_host_rpm_builder._build_rpm_using_rpmbuild.call_args_list))
+        self.mock_host_rpm_builder._filter_tokens_in_rpm_sources_and_config_viewer.assert_called_with()
+        self.mock_host_rpm_builder._write_revision_file_for_config_viewer.assert_called_with()
+
     @patch('config_rpm_maker.hostrpmbuilder.mkdir')
     @patch('config_rpm_maker.hostrpmbuilder.exists')
     def test_should_clean_up_after_successful_build(self, mock_exists, mock_mkdir):
@@ -723,3 +732,422 @@ class BuildRpmUsingRpmbuildTests(UnitTests):
         mock_popen.return_value = self.mock_process
 
         self.assertRaises(CouldNotBuildRpmException, HostRpmBuilder._build_rpm_using_rpmbuild, self.mock_host_rpm_builder)
+
+
+class ExportSvnPathTests(TestCase):
+
+    def setUp(self):
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.host_config_dir = '/path/to/host-config-dir'
+        self.mock_host_rpm_builder.revision = '123'
+        self.mock_host_rpm_builder.svn_service_queue = Mock()
+
+    def test_should_export_svn_path_using_export_cache(self):
+
+        self.mock_host_rpm_builder.export_cache = Mock()
+        self.mock_host_rpm_builder.export_cache.export.return_value = [('all', 'spam')]
+
+        actual_exported_paths = HostRpmBuilder._export_svn_path(self.mock_host_rpm_builder, 'all')
+
+        self.assertEqual([('all', 'spam')], actual_exported_paths)
+        self.mock_host_rpm_builder.export_cache.export.assert_called_with(self.mock_host_rpm_builder.svn_service_queue, 'all', '/path/to/host-config-dir', '123')
+
+    def test_should_export_svn_path_using_svn_service_when_no_export_cache_given(self):
+
+        self.mock_host_rpm_builder.export_cache = None
+        mock_svn_service = Mock()
+        mock_svn_service.export.return_value = [('all', 'spam')]
+        self.mock_host_rpm_builder._get_next_svn_service_from_queue.return_value = mock_svn_service
+
+        actual_exported_paths = HostRpmBuilder._export_svn_path(self.mock_host_rpm_builder, 'all')
+
+        self.assertEqual([('all', 'spam')], actual_exported_paths)
+        mock_svn_service.export.assert_called_with('all', '/path/to/host-config-dir', '123')
+        self.mock_host_rpm_builder.svn_service_queue.put.assert_called_with(mock_svn_service)
+
+
+class GetLogEntriesTests(TestCase):
+
+    def setUp(self):
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.revision = '123'
+        self.mock_host_rpm_builder.svn_service_queue = Mock()
+
+    def test_should_get_log_entries_using_svn_log_cache(self):
+
+        self.mock_host_rpm_builder.svn_log_cache = Mock()
+        self.mock_host_rpm_builder.svn_log_cache.log.return_value = ['log entry']
+
+        actual_log_entries = HostRpmBuilder._get_log_entries(self.mock_host_rpm_builder, 'all')
+
+        self.assertEqual(['log entry'], actual_log_entries)
+        self.mock_host_rpm_builder.svn_log_cache.log.assert_called_with(self.mock_host_rpm_builder.svn_service_queue, 'all', '123', 5)
+
+    def test_should_get_log_entries_using_svn_service_when_no_svn_log_cache_given(self):
+
+        self.mock_host_rpm_builder.svn_log_cache = None
+        mock_svn_service = Mock()
+        mock_svn_service.log.return_value = ['log entry']
+        self.mock_host_rpm_builder._get_next_svn_service_from_queue.return_value = mock_svn_service
+
+        actual_log_entries = HostRpmBuilder._get_log_entries(self.mock_host_rpm_builder, 'all')
+
+        self.assertEqual(['log entry'], actual_log_entries)
+        mock_svn_service.log.assert_called_with('all', '123', 5)
+        self.mock_host_rpm_builder.svn_service_queue.put.assert_called_with(mock_svn_service)
+
+
+class CreateTokenReplacerTests(TestCase):
+
+    def setUp(self):
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.variables_dir = '/path/to/variables-directory'
+        self.mock_host_rpm_builder.is_a_group_rpm = False
+        self.mock_host_rpm_builder.variable_layer = Mock()
+        self.mock_host_rpm_builder.variable_layer.get_token_values.return_value = ({'SPAM': 'spam'}, {'EGGS': u'eggs'})
+        self.mock_host_rpm_builder.written_variable_names = set(['REVISION'])
+        self.mock_host_rpm_builder.exported_host_variable_names = set(['HAM'])
+
+    @patch('config_rpm_maker.hostrpmbuilder.TokenReplacer')
+    def test_should_read_all_variables_when_there_is_no_variable_layer(self, mock_token_replacer_class):
+
+        self.mock_host_rpm_builder.variable_layer = None
+
+        HostRpmBuilder._create_token_replacer(self.mock_host_rpm_builder)
+
+        mock_token_replacer_class.from_directory.assert_called_with('/path/to/variables-directory')
+
+    @patch('config_rpm_maker.hostrpmbuilder.TokenReplacer')
+    def test_should_use_values_of_variable_layer_for_group_rpm(self, mock_token_replacer_class):
+
+        self.mock_host_rpm_builder.is_a_group_rpm = True
+
+        HostRpmBuilder._create_token_replacer(self.mock_host_rpm_builder)
+
+        mock_token_replacer_class.from_directory.assert_called_with('/path/to/variables-directory',
+                                                                    token_values={'SPAM': 'spam'},
+                                                                    resolved_token_values={'EGGS': u'eggs'})
+
+    @patch('config_rpm_maker.hostrpmbuilder.TokenReplacer')
+    def test_should_use_values_of_variable_layer_which_are_not_overridden(self, mock_token_replacer_class):
+
+        HostRpmBuilder._create_token_replacer(self.mock_host_rpm_builder)
+
+        self.mock_host_rpm_builder.variable_layer.get_token_values.assert_called_with(set(['REVISION', 'HAM']))
+        mock_token_replacer_class.from_directory.assert_called_with('/path/to/variables-directory',
+                                                                    token_values={'SPAM': 'spam'},
+                                                                    resolved_token_values={'EGGS': u'eggs'})
+
+
+class GetNamesOfExportedVariablesTests(TestCase):
+
+    def test_should_return_names_of_exported_variable_files(self):
+
+        mock_host_rpm_builder = Mock(HostRpmBuilder)
+        exported_paths = [('host/devweb01', 'VARIABLES'),
+                          ('host/devweb01', 'VARIABLES/SPAM'),
+                          ('host/devweb01', 'VARIABLES/sub/EGGS'),
+                          ('host/devweb01', 'etc/VARIABLES')]
+
+        actual_names = HostRpmBuilder._get_names_of_exported_variables(mock_host_rpm_builder, exported_paths)
+
+        self.assertEqual(set(['SPAM']), actual_names)
+
+
+class WriteFileTests(TestCase):
+
+    def setUp(self):
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.variables_dir = '/path/to/variables-directory'
+        self.mock_host_rpm_builder.written_variable_names = set()
+
+    @patch('config_rpm_maker.hostrpmbuilder.open', create=True)
+    def test_should_remember_names_of_written_variables(self, mock_open):
+
+        HostRpmBuilder._write_file(self.mock_host_rpm_builder, '/path/to/variables-directory/REVISION', '123')
+
+        self.assertEqual(set(['REVISION']), self.mock_host_rpm_builder.written_variable_names)
+        mock_open.return_value.write.assert_called_with('123')
+
+    @patch('config_rpm_maker.hostrpmbuilder.open', create=True)
+    def test_should_not_remember_names_of_other_files(self, mock_open):
+
+        HostRpmBuilder._write_file(self.mock_host_rpm_builder, '/path/to/config-viewer/devweb01.rev', '123')
+
+        self.assertEqual(set(), self.mock_host_rpm_builder.written_variable_names)
+
+
+class OverlaySegmentsTests(TestCase):
+
+    def setUp(self):
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.hostname = 'berweb01'
+        self.mock_host_rpm_builder.host_config_dir = '/path/to/host-config-dir'
+        self.mock_host_rpm_builder.overlay_planner = None
+        self.mock_host_rpm_builder._overlay_segment.side_effect = lambda segment: segment.get_svn_paths('berweb01')
+
+    def test_should_overlay_each_segment_in_overlay_order(self):
+
+        self.mock_host_rpm_builder.overlay_stage_cache = None
+
+        actual_results = HostRpmBuilder._overlay_segments(self.mock_host_rpm_builder)
+
+        self.assertEqual([['all'], ['typ/web'], ['loc/pro', 'loc/ber'], ['loctyp/proweb', 'loctyp/berweb'], ['host/berweb01']],
+                         [result for _, result in actual_results])
+        self.mock_host_rpm_builder._get_variable_layer.assert_called_with(['all', 'typ/web', 'loc/pro', 'loc/ber', 'loctyp/proweb', 'loctyp/berweb'])
+
+    def test_should_overlay_shared_segments_using_overlay_stage_cache(self):
+
+        self.mock_host_rpm_builder.overlay_stage_cache = Mock()
+        self.mock_host_rpm_builder.overlay_stage_cache.overlay.return_value = [('shared segment', 'shared result')]
+
+        actual_results = HostRpmBuilder._overlay_segments(self.mock_host_rpm_builder)
+
+        self.assertEqual(['shared result', ['host/berweb01']], [result for _, result in actual_results])
+        self.mock_host_rpm_builder.overlay_stage_cache.overlay.assert_called_with(['all', 'typ/web', 'loc/pro', 'loc/ber', 'loctyp/proweb', 'loctyp/berweb'],
+                                                                                  '/path/to/host-config-dir',
+                                                                                  ANY)
+        self.assertEqual(1, self.mock_host_rpm_builder._overlay_segment.call_count)
+
+    def test_should_overlay_segments_using_overlay_planner(self):
+
+        self.mock_host_rpm_builder.overlay_stage_cache = None
+        self.mock_host_rpm_builder.overlay_planner = Mock()
+        self.mock_host_rpm_builder._overlay_planned_segments.side_effect = lambda segments: [(segment, 'planned') for segment in segments]
+
+        actual_results = HostRpmBuilder._overlay_segments(self.mock_host_rpm_builder)
+
+        self.assertEqual(['planned'] * 5, [result for _, result in actual_results])
+        self.assertEqual(2, self.mock_host_rpm_builder._overlay_planned_segments.call_count)
+        self.assertFalse(self.mock_host_rpm_builder._overlay_segment.called)
+
+
+class OverlayPlannedSegmentsTests(TestCase):
+
+    def setUp(self):
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.hostname = 'berweb01'
+        self.mock_host_rpm_builder.host_config_dir = '/path/to/host-config-dir'
+        self.mock_host_rpm_builder.rpm_requires_path = '/path/to/host-config-dir/VARIABLES/RPM_REQUIRES'
+        self.mock_host_rpm_builder.rpm_provides_path = '/path/to/host-config-dir/VARIABLES/RPM_PROVIDES'
+        self.mock_host_rpm_builder.svn_service_queue = Mock()
+        self.mock_host_rpm_builder.overlay_planner = Mock()
+        self.mock_plan = self.mock_host_rpm_builder.overlay_planner.plan.return_value
+        self.mock_plan.get_exported_paths.side_effect = lambda svn_path: [(svn_path, 'VARIABLES')]
+        self.mock_host_rpm_builder._parse_dependency_file.return_value = ['staged']
+        self.mock_host_rpm_builder._parse_planned_dependency_file.side_effect = \
+            lambda plan, svn_path, path, dependencies_before_overlay: dependencies_before_overlay + [svn_path]
+
+    def test_should_plan_and_overlay_svn_paths_of_all_given_segments(self):
+
+        HostRpmBuilder._overlay_planned_segments(self.mock_host_rpm_builder, [Typ(), Loc()])
+
+        self.mock_host_rpm_builder.overlay_planner.plan.assert_called_with(self.mock_host_rpm_builder.svn_service_queue, ['typ/web', 'loc/pro', 'loc/ber'])
+        self.mock_host_rpm_builder.overlay_planner.overlay.assert_called_with(self.mock_host_rpm_builder.svn_service_queue,
+                                                                             self.mock_plan,
+                                                                             '/path/to/host-config-dir',
+                                                                             self.mock_host_rpm_builder._export_svn_path)
+
+    def test_should_return_result_of_each_segment(self):
+
+        actual_results = HostRpmBuilder._overlay_planned_segments(self.mock_host_rpm_builder, [Typ(), Loc()])
+
+        self.assertEqual(2, len(actual_results))
+        _, (svn_paths, exported_paths, requires, provides) = actual_results[1]
+        self.assertEqual(['loc/pro', 'loc/ber'], svn_paths)
+        self.assertEqual([('loc/pro', 'VARIABLES'), ('loc/ber', 'VARIABLES')], exported_paths)
+        self.assertEqual(['staged', 'loc/pro', 'staged', 'loc/ber'], requires)
+        self.assertEqual(['staged', 'loc/pro', 'staged', 'loc/ber'], provides)
+
+
+class ParsePlannedDependencyFileTests(TestCase):
+
+    def setUp(self):
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.host_config_dir = '/path/to/host-config-dir'
+        self.mock_host_rpm_builder.svn_service_queue = Mock()
+        self.mock_host_rpm_builder.overlay_planner = Mock()
+        self.mock_host_rpm_builder.overlay_planner.read.return_value = 'spam,eggs'
+        self.mock_host_rpm_builder._parse_dependencies.side_effect = lambda content: content.split(',')
+        self.mock_plan = Mock()
+
+    def test_should_return_dependencies_before_overlay_when_no_svn_path_provides_file(self):
+
+        self.mock_plan.get_visible_svn_path.return_value = None
+
+        actual_dependencies = HostRpmBuilder._parse_planned_dependency_file(self.mock_host_rpm_builder, self.mock_plan, 'typ/web',
+                                                                            '/path/to/host-config-dir/VARIABLES/RPM_REQUIRES', ['staged'])
+
+        self.assertEqual(['staged'], actual_dependencies)
+        self.mock_plan.get_visible_svn_path.assert_called_with('VARIABLES/RPM_REQUIRES', 'typ/web')
+
+    def test_should_parse_file_of_svn_path_providing_it(self):
+
+        self.mock_plan.get_visible_svn_path.return_value = 'all'
+
+        actual_dependencies = HostRpmBuilder._parse_planned_dependency_file(self.mock_host_rpm_builder, self.mock_plan, 'typ/web',
+                                                                            '/path/to/host-config-dir/VARIABLES/RPM_REQUIRES', ['staged'])
+
+        self.assertEqual(['spam', 'eggs'], actual_dependencies)
+        self.mock_host_rpm_builder.overlay_planner.read.assert_called_with(self.mock_host_rpm_builder.svn_service_queue, 'all', 'VARIABLES/RPM_REQUIRES')
+
+
+class ClaimRpmTests(TestCase):
+
+    def setUp(self):
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.thread_name = 'Mock-Thread'
+        self.mock_host_rpm_builder.hostname = 'devweb01'
+        self.mock_host_rpm_builder.rpm_name = 'group-dev-web'
+        self.mock_host_rpm_builder.is_a_group_rpm = True
+        self.mock_host_rpm_builder.group_rpm_registry = Mock()
+
+    def test_should_build_rpm_of_host(self):
+
+        self.mock_host_rpm_builder.is_a_group_rpm = False
+
+        self.assertTrue(HostRpmBuilder._claim_rpm(self.mock_host_rpm_builder))
+        self.assertEqual(0, len(self.mock_host_rpm_builder.group_rpm_registry.claim.call_args_list))
+
+    def test_should_build_group_rpm_when_there_is_no_group_rpm_registry(self):
+
+        self.mock_host_rpm_builder.group_rpm_registry = None
+
+        self.assertTrue(HostRpmBuilder._claim_rpm(self.mock_host_rpm_builder))
+
+    def test_should_build_group_rpm_when_claimed_first(self):
+
+        self.mock_host_rpm_builder.group_rpm_registry.claim.return_value = True
+
+        self.assertTrue(HostRpmBuilder._claim_rpm(self.mock_host_rpm_builder))
+        self.mock_host_rpm_builder.group_rpm_registry.claim.assert_called_with('group-dev-web', 'devweb01')
+
+    def test_should_not_build_group_rpm_claimed_by_other_member_host(self):
+
+        self.mock_host_rpm_builder.group_rpm_registry.claim.return_value = False
+
+        self.assertFalse(HostRpmBuilder._claim_rpm(self.mock_host_rpm_builder))
+
+
+class ResolveGroupRpmNameTests(TestCase):
+
+    def setUp(self):
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.hostname = 'berweb01'
+        self.mock_host_rpm_builder.variables_dir = '/path/to/variables-directory'
+
+    @patch('config_rpm_maker.hostrpmbuilder.TokenReplacer')
+    def test_should_resolve_only_rpm_name_using_lazy_token_replacer(self, mock_token_replacer_class):
+
+        mock_token_replacer_class.from_directory.return_value.resolve.return_value = u'group-web'
+
+        actual_rpm_name = HostRpmBuilder._resolve_group_rpm_name(self.mock_host_rpm_builder, '/path/to/variables-directory/RPM_NAME')
+
+        self.assertEqual('group-web', actual_rpm_name)
+        mock_token_replacer_class.from_directory.assert_called_with('/path/to/variables-directory', lazy=True)
+        mock_token_replacer_class.from_directory.return_value.resolve.assert_called_with('RPM_NAME')
+        self.assertFalse(mock_token_replacer_class.filter_directory.called)
+
+    @patch('config_rpm_maker.hostrpmbuilder.LOGGER')
+    @patch('config_rpm_maker.hostrpmbuilder.open', create=True)
+    @patch('config_rpm_maker.hostrpmbuilder.TokenReplacer')
+    def test_should_read_unresolved_rpm_name_when_resolving_fails(self, mock_token_replacer_class, mock_open, mock_logger):
+
+        mock_token_replacer_class.from_directory.return_value.resolve.side_effect = Exception('Missing token')
+        mock_open.return_value.__enter__.return_value.read.return_value = 'group-@@@TYP@@@\n'
+
+        actual_rpm_name = HostRpmBuilder._resolve_group_rpm_name(self.mock_host_rpm_builder, '/path/to/variables-directory/RPM_NAME')
+
+        self.assertEqual('group-@@@TYP@@@', actual_rpm_name)
+        mock_open.assert_called_with('/path/to/variables-directory/RPM_NAME')
+
+
+class TarSourcesTests(TestCase):
+
+    def setUp(self):
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.logger = Mock()
+        self.mock_host_rpm_builder.hostname = 'devweb01'
+        self.mock_host_rpm_builder.config_rpm_prefix = 'yadt-config-'
+        self.mock_host_rpm_builder.work_dir = '/tmp/work'
+        self.mock_host_rpm_builder.host_config_dir = '/tmp/work/yadt-config-devweb01'
+        self.mock_host_rpm_builder.rpm_source_paths = ['files', 'files/file', 'yadt-config-devweb01.spec']
+        self.mock_host_rpm_builder.is_a_group_rpm = False
+
+    @patch('config_rpm_maker.hostrpmbuilder.create_tar_file')
+    @patch('config_rpm_maker.hostrpmbuilder.get_source_tar_compression_level')
+    def test_should_create_tar_file_of_host_config_dir_using_paths_of_rpm_sources(self, mock_get_source_tar_compression_level, mock_create_tar_file):
+
+        mock_get_source_tar_compression_level.return_value = 6
+
+        actual_output_file = HostRpmBuilder._tar_sources(self.mock_host_rpm_builder)
+
+        self.assertEqual('/tmp/work/yadt-config-devweb01.tar.gz', actual_output_file)
+        mock_create_tar_file.assert_called_with('/tmp/work/yadt-config-devweb01.tar.gz', '/tmp/work/yadt-config-devweb01', 'yadt-config-devweb01', 6,
+                                                ['files', 'files/file', 'yadt-config-devweb01.spec'])
+
+    @patch('config_rpm_maker.hostrpmbuilder.create_tar_file')
+    @patch('config_rpm_maker.hostrpmbuilder.get_source_tar_compression_level')
+    def test_should_name_uncompressed_tar_file_like_source_of_spec_file(self, mock_get_source_tar_compression_level, mock_create_tar_file):
+
+        mock_get_source_tar_compression_level.return_value = 0
+
+        actual_output_file = HostRpmBuilder._tar_sources(self.mock_host_rpm_builder)
+
+        self.assertEqual('/tmp/work/yadt-config-devweb01.tar.gz', actual_output_file)
+        mock_create_tar_file.assert_called_with('/tmp/work/yadt-config-devweb01.tar.gz', '/tmp/work/yadt-config-devweb01', 'yadt-config-devweb01', 0,
+                                                ['files', 'files/file', 'yadt-config-devweb01.spec'])
+
+    @patch('config_rpm_maker.hostrpmbuilder.shutil')
+    @patch('config_rpm_maker.hostrpmbuilder.create_tar_file')
+    @patch('config_rpm_maker.hostrpmbuilder.get_source_tar_compression_level')
+    def test_should_move_config_dir_of_group_rpm_before_creating_tar_file(self, mock_get_source_tar_compression_level, mock_create_tar_file, mock_shutil):
+
+        mock_get_source_tar_compression_level.return_value = 6
+        self.mock_host_rpm_builder.is_a_group_rpm = True
+        self.mock_host_rpm_builder.rpm_name = 'group-dev-web'
+
+        actual_output_file = HostRpmBuilder._tar_sources(self.mock_host_rpm_builder)
+
+        self.assertEqual('/tmp/work/yadt-config-group-dev-web.tar.gz', actual_output_file)
+        mock_shutil.move.assert_called_with('/tmp/work/yadt-config-devweb01', '/tmp/work/yadt-config-group-dev-web')
+        mock_create_tar_file.assert_called_with('/tmp/work/yadt-config-group-dev-web.tar.gz', '/tmp/work/yadt-config-group-dev-web', 'yadt-config-group-dev-web', 6,
+                                                ['files', 'files/file', 'yadt-config-devweb01.spec'])
+
+    @patch('config_rpm_maker.hostrpmbuilder.create_tar_file')
+    @patch('config_rpm_maker.hostrpmbuilder.get_source_tar_compression_level')
+    def test_should_raise_exception_when_tar_file_could_not_be_written(self, mock_get_source_tar_compression_level, mock_create_tar_file):
+
+        mock_get_source_tar_compression_level.return_value = 6
+        mock_create_tar_file.side_effect = IOError('No space left on device')
+
+        self.assertRaises(CouldNotTarConfigurationDirectoryException, HostRpmBuilder._tar_sources, self.mock_host_rpm_builder)
+
+
+class SaveFileListTests(TestCase):
+
+    def setUp(self):
+        self.work_dir = mkdtemp(prefix='save-file-list-test.')
+        self.mock_host_rpm_builder = Mock(HostRpmBuilder)
+        self.mock_host_rpm_builder.hostname = 'devweb01'
+        self.mock_host_rpm_builder.work_dir = self.work_dir
+        self.mock_host_rpm_builder.host_config_dir = join(self.work_dir, 'yadt-config-devweb01')
+        makedirs(join(self.mock_host_rpm_builder.host_config_dir, 'files'))
+        with open(join(self.mock_host_rpm_builder.host_config_dir, 'files', 'spam'), 'w') as spam_file:
+            spam_file.write('spam')
+
+    def tearDown(self):
+        rmtree(self.work_dir)
+
+    def test_should_write_paths_of_files(self):
+
+        HostRpmBuilder._save_file_list(self.mock_host_rpm_builder)
+
+        with open(join(self.work_dir, 'filelist.devweb01')) as file_list:
+            self.assertEqual(join(self.work_dir, 'yadt-config-devweb01', 'files', 'spam') + '\n', file_list.read())
+
+    def test_should_remember_paths_of_directories_and_files_relative_to_host_config_dir(self):
+
+        HostRpmBuilder._save_file_list(self.mock_host_rpm_builder)
+
+        self.assertEqual(['files', 'files/spam'], self.mock_host_rpm_builder.rpm_source_paths)
@@ -0,0 +1,263 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from os import link, makedirs, stat
+from os.path import exists, isdir, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from mock import ANY, Mock
+
+from config_rpm_maker.exportcache import ExportCache
+from config_rpm_maker.overlayplanner import ConfigTree, OverlayPlan, OverlayPlanner, is_affected_by_change
+
+CONFIG_TREE_LISTING = [('all', True),
+                       ('all/VARIABLES', True),
+                       ('all/VARIABLES/RPM_REQUIRES', False),
+                       ('all/VARIABLES/LOC', False),
+                       ('all/etc', True),
+                       ('all/etc/motd', False),
+                       ('typ', True),
+                       ('typ/web', True),
+                       ('typ/web/VARIABLES', True),
+                       ('typ/web/VARIABLES/RPM_REQUIRES', False),
+                       ('typ/web/etc', True),
+                       ('typ/web/etc/httpd', True),
+                       ('host', True),
+                       ('host/berweb01', True)]
+
+
+class ConfigTreeTests(TestCase):
+
+    def setUp(self):
+        self.config_tree = ConfigTree(CONFIG_TREE_LISTING)
+
+    def test_should_list_files_and_directories_below_svn_path(self):
+
+        self.assertEqual([('VARIABLES', True),
+                          ('VARIABLES/RPM_REQUIRES', False),
+                          ('etc', True),
+                          ('etc/httpd', True)], self.config_tree.list('typ/web'))
+
+    def test_should_list_empty_directory(self):
+
+        self.assertEqual([], self.config_tree.list('host/berweb01'))
+
+    def test_should_return_none_when_svn_path_does_not_exist(self):
+
+        self.assertEqual(None, self.config_tree.list('typ/app'))
+
+    def test_should_return_none_when_svn_path_is_a_file(self):
+
+        self.assertEqual(None, self.config_tree.list('all/etc/motd'))
+
+    def test_should_know_which_paths_are_files(self):
+
+        self.assertTrue(self.config_tree.is_file('all/etc/motd'))
+        self.assertFalse(self.config_tree.is_file('all/etc'))
+        self.assertFalse(self.config_tree.is_file('all/etc/motd/spam'))
+        self.assertFalse(self.config_tree.is_file('typ/app/etc'))
+
+
+class IsAffectedByChangeTests(TestCase):
+
+    def setUp(self):
+        self.config_tree = ConfigTree(CONFIG_TREE_LISTING)
+        self.svn_paths = ['all', 'typ/web', 'host/berweb01']
+
+    def test_should_not_be_affected_by_change_outside_of_svn_paths(self):
+
+        self.assertFalse(is_affected_by_change(self.config_tree, self.svn_paths, 'typ/app/etc/motd'))
+
+    def test_should_be_affected_by_change_of_file_which_is_not_overridden(self):
+
+        self.assertTrue(is_affected_by_change(self.config_tree, self.svn_paths, 'all/etc/motd'))
+
+    def test_should_be_affected_by_change_of_svn_path_itself(self):
+
+        self.assertTrue(is_affected_by_change(self.config_tree, self.svn_paths, 'host/berweb01'))
+
+    def test_should_not_be_affected_by_change_of_file_overridden_by_later_svn_path(self):
+
+        config_tree = ConfigTree(CONFIG_TREE_LISTING + [('host/berweb01/etc', True), ('host/berweb01/etc/motd', False)])
+
+        self.assertFalse(is_affected_by_change(config_tree, self.svn_paths, 'all/etc/motd'))
+
+    def test_should_be_affected_by_change_of_dependency_file_even_if_it_is_overridden(self):
+
+        self.assertTrue(is_affected_by_change(self.config_tree, self.svn_paths, 'all/VARIABLES/RPM_REQUIRES'))
+
+    def test_should_be_affected_by_change_of_file_overriding_file_of_earlier_svn_path(self):
+
+        self.assertTrue(is_affected_by_change(self.config_tree, self.svn_paths, 'typ/web/VARIABLES/RPM_REQUIRES'))
+
+
+class OverlayPlanTests(TestCase):
+
+    def setUp(self):
+        self.overlay_plan = OverlayPlan(ConfigTree(CONFIG_TREE_LISTING), ['all', 'typ/web', 'loc/ber', 'host/berweb01'])
+
+    def test_should_return_exported_paths_of_svn_path(self):
+
+        self.assertEqual([('all', 'VARIABLES'),
+                          ('all', 'VARIABLES/LOC'),
+                          ('all', 'VARIABLES/RPM_REQUIRES'),
+                          ('all', 'etc'),
+                          ('all', 'etc/motd')], self.overlay_plan.get_exported_paths('all'))
+
+    def test_should_return_no_exported_paths_when_svn_path_does_not_exist(self):
+
+        self.assertFalse(self.overlay_plan.exists('loc/ber'))
+        self.assertEqual([], self.overlay_plan.get_exported_paths('loc/ber'))
+
+    def test_should_not_return_files_overridden_by_later_svn_path_as_winning_files(self):
+
+        self.assertEqual(['VARIABLES/LOC', 'etc/motd'], self.overlay_plan.get_winning_files('all'))
+        self.assertEqual(['VARIABLES/RPM_REQUIRES'], self.overlay_plan.get_winning_files('typ/web'))
+
+    def test_should_be_shadowed_only_when_a_file_is_overridden(self):
+
+        self.assertTrue(self.overlay_plan.is_shadowed('all'))
+        self.assertFalse(self.overlay_plan.is_shadowed('typ/web'))
+
+    def test_should_return_directories_of_all_svn_paths(self):
+
+        self.assertEqual(['VARIABLES', 'etc', 'etc/httpd'], self.overlay_plan.get_directories())
+
+    def test_should_return_svn_path_providing_file_after_overlaying_svn_path(self):
+
+        self.assertEqual('all', self.overlay_plan.get_visible_svn_path('VARIABLES/RPM_REQUIRES', 'all'))
+        self.assertEqual('typ/web', self.overlay_plan.get_visible_svn_path('VARIABLES/RPM_REQUIRES', 'typ/web'))
+        self.assertEqual('typ/web', self.overlay_plan.get_visible_svn_path('VARIABLES/RPM_REQUIRES', 'host/berweb01'))
+
+    def test_should_return_none_when_file_is_not_provided_yet(self):
+
+        self.assertEqual(None, self.overlay_plan.get_visible_svn_path('VARIABLES/RPM_PROVIDES', 'host/berweb01'))
+
+
+class OverlayPlannerTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='overlay-planner-test.')
+        self.target_directory = join(self.temporary_directory, 'berweb01')
+        self.overlay_planner = OverlayPlanner('123', ExportCache(join(self.temporary_directory, 'staging')))
+        self.mock_svn_service = Mock()
+        self.mock_svn_service.list_config_tree.return_value = CONFIG_TREE_LISTING
+        self.mock_svn_service.export.side_effect = self.export_svn_path
+        self.mock_svn_service_queue = Mock()
+        self.mock_svn_service_queue.get.return_value = self.mock_svn_service
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def export_svn_path(self, svn_path, target_directory, revision):
+        exported_paths = []
+        for path, is_directory in CONFIG_TREE_LISTING:
+            if path.startswith(svn_path + '/'):
+                target_path = join(target_directory, path[len(svn_path) + 1:])
+                if is_directory:
+                    makedirs(target_path)
+                else:
+                    with open(target_path, 'w') as target_file:
+                        target_file.write('content of %s' % path)
+                exported_paths.append((svn_path, path[len(svn_path) + 1:]))
+        return exported_paths
+
+    def overlay(self, svn_paths, export_svn_path=None):
+        plan = self.overlay_planner.plan(self.mock_svn_service_queue, svn_paths)
+        self.overlay_planner.overlay(self.mock_svn_service_queue, plan, self.target_directory, export_svn_path or Mock())
+
+    def read(self, path):
+        with open(join(self.target_directory, path)) as target_file:
+            return target_file.read()
+
+    def test_should_list_config_tree_only_once_per_revision(self):
+
+        self.overlay_planner.plan(self.mock_svn_service_queue, ['all'])
+        self.overlay_planner.plan(self.mock_svn_service_queue, ['typ/web'])
+
+        self.mock_svn_service.list_config_tree.assert_called_once_with('123')
+
+    def test_should_link_only_winning_files_of_shadowed_svn_path(self):
+
+        self.overlay(['all', 'typ/web'])
+
+        self.assertEqual('content of all/VARIABLES/LOC', self.read('VARIABLES/LOC'))
+        self.assertEqual('content of all/etc/motd', self.read('etc/motd'))
+        self.assertFalse(exists(join(self.target_directory, 'VARIABLES', 'RPM_REQUIRES')))
+
+    def test_should_export_shadowed_svn_path_as_a_whole(self):
+
+        self.overlay(['all', 'typ/web'])
+
+        self.mock_svn_service.export.assert_called_once_with('all', ANY, '123')
+
+    def test_should_export_svn_path_which_is_not_shadowed(self):
+
+        mock_export_svn_path = Mock()
+
+        self.overlay(['all', 'typ/web'], mock_export_svn_path)
+
+        mock_export_svn_path.assert_called_once_with('typ/web')
+
+    def test_should_create_directories_of_all_svn_paths(self):
+
+        self.overlay(['all', 'typ/web'])
+
+        self.assertTrue(isdir(join(self.target_directory, 'etc', 'httpd')))
+
+    def test_should_export_shadowed_svn_path_only_once_and_link_its_files_into_target_directories(self):
+
+        self.overlay(['all', 'typ/web'])
+        first_target_directory = self.target_directory
+        self.target_directory = join(self.temporary_directory, 'berweb02')
+
+        self.overlay(['all', 'typ/web'])
+
+        self.assertEqual(1, self.mock_svn_service.export.call_count)
+        self.assertEqual(stat(join(first_target_directory, 'etc', 'motd')).st_ino,
+                         stat(join(self.target_directory, 'etc', 'motd')).st_ino)
+
+    def test_should_replace_existing_file_instead_of_writing_through_hard_link(self):
+
+        staged_file_path = join(self.temporary_directory, 'staged')
+        with open(staged_file_path, 'w') as staged_file:
+            staged_file.write('staged')
+        makedirs(join(self.target_directory, 'etc'))
+        link(staged_file_path, join(self.target_directory, 'etc', 'motd'))
+
+        self.overlay(['all', 'typ/web'])
+
+        self.assertEqual('content of all/etc/motd', self.read('etc/motd'))
+        with open(staged_file_path) as staged_file:
+            self.assertEqual('staged', staged_file.read())
+
+    def test_should_read_content_of_file_from_exported_svn_path(self):
+
+        actual_content = self.overlay_planner.read(self.mock_svn_service_queue, 'all', 'VARIABLES/RPM_REQUIRES')
+
+        self.assertEqual('content of all/VARIABLES/RPM_REQUIRES', actual_content)
+
+    def test_should_export_svn_path_again_after_failed_export(self):
+
+        self.mock_svn_service.export.side_effect = ValueError('failed')
+        self.assertRaises(ValueError, self.overlay_planner.read, self.mock_svn_service_queue, 'all', 'etc/motd')
+
+        self.assertRaises(ValueError, self.overlay_planner.read, self.mock_svn_service_queue, 'all', 'etc/motd')
+
+        self.assertEqual(2, self.mock_svn_service.export.call_count)
@@ -0,0 +1,97 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from os import makedirs, stat
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from mock import Mock
+
+from config_rpm_maker.overlaystagecache import OverlayStageCache
+
+
+class OverlayStageCacheTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='overlay-stage-cache-test.')
+        self.overlay_stage_cache = OverlayStageCache(join(self.temporary_directory, 'stages'))
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def create_host_directory(self, hostname):
+        host_directory = join(self.temporary_directory, hostname)
+        makedirs(host_directory)
+        return host_directory
+
+    def create_overlay_function(self, host_directory):
+        def overlay_segments():
+            makedirs(join(host_directory, 'VARIABLES'))
+            with open(join(host_directory, 'VARIABLES', 'LOC'), 'w') as variable_file:
+                variable_file.write('ber')
+            return [('all', 'results of all')]
+
+        return Mock(side_effect=overlay_segments)
+
+    def test_should_overlay_segments_into_target_directory(self):
+
+        host_directory = self.create_host_directory('berweb01')
+        overlay_function = self.create_overlay_function(host_directory)
+
+        actual_results = self.overlay_stage_cache.overlay(['all', 'typ/web'], host_directory, overlay_function)
+
+        self.assertEqual([('all', 'results of all')], actual_results)
+        self.assertEqual(1, overlay_function.call_count)
+
+    def test_should_link_staged_files_into_target_directory_of_other_hosts(self):
+
+        first_host_directory = self.create_host_directory('berweb01')
+        second_host_directory = self.create_host_directory('berweb02')
+        self.overlay_stage_cache.overlay(['all', 'typ/web'], first_host_directory, self.create_overlay_function(first_host_directory))
+        overlay_function = Mock()
+
+        actual_results = self.overlay_stage_cache.overlay(['all', 'typ/web'], second_host_directory, overlay_function)
+
+        self.assertEqual([('all', 'results of all')], actual_results)
+        self.assertFalse(overlay_function.called)
+        self.assertEqual(stat(join(first_host_directory, 'VARIABLES', 'LOC')).st_ino,
+                         stat(join(second_host_directory, 'VARIABLES', 'LOC')).st_ino)
+        self.assertEqual(1, self.overlay_stage_cache.count_of_overlays)
+        self.assertEqual(1, self.overlay_stage_cache.count_of_clones)
+
+    def test_should_overlay_segments_of_different_svn_paths_separately(self):
+
+        first_host_directory = self.create_host_directory('berweb01')
+        second_host_directory = self.create_host_directory('hamweb01')
+        self.overlay_stage_cache.overlay(['all', 'loc/ber'], first_host_directory, self.create_overlay_function(first_host_directory))
+        overlay_function = self.create_overlay_function(second_host_directory)
+
+        self.overlay_stage_cache.overlay(['all', 'loc/ham'], second_host_directory, overlay_function)
+
+        self.assertEqual(1, overlay_function.call_count)
+
+    def test_should_overlay_segments_again_when_overlaying_failed(self):
+
+        host_directory = self.create_host_directory('berweb01')
+        self.assertRaises(ValueError, self.overlay_stage_cache.overlay, ['all'], host_directory, Mock(side_effect=ValueError('failed')))
+        overlay_function = self.create_overlay_function(host_directory)
+
+        self.overlay_stage_cache.overlay(['all'], host_directory, overlay_function)
+
+        self.assertEqual(1, overlay_function.call_count)
@@ -0,0 +1,263 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from mock import Mock, call, patch
+from Queue import Queue
+from threading import Event
+
+from unittest_support import UnitTests
+from config_rpm_maker.rpmuploader import (MAXIMUM_ARGUMENT_LENGTH,
+                                          CouldNotUploadRpmsException,
+                                          ParallelRpmUploader,
+                                          RpmUploader,
+                                          get_maximum_command_length,
+                                          split_into_chunks,
+                                          upload_rpm_chunk)
+
+
+class UploadRpmChunkTests(UnitTests):
+
+    @patch('config_rpm_maker.rpmuploader.subprocess')
+    def test_should_execute_upload_command_with_rpms_as_arguments(self, mock_subprocess):
+
+        mock_subprocess.Popen.return_value.communicate.return_value = ('', '')
+        mock_subprocess.Popen.return_value.returncode = 0
+
+        upload_rpm_chunk('upload-rpms', ['a.rpm', 'b.rpm'])
+
+        self.assertEqual('upload-rpms a.rpm b.rpm', mock_subprocess.Popen.call_args[0][0])
+
+    @patch('config_rpm_maker.rpmuploader.subprocess')
+    def test_should_raise_exception_when_upload_command_fails(self, mock_subprocess):
+
+        mock_subprocess.Popen.return_value.communicate.return_value = ('', 'permission denied')
+        mock_subprocess.Popen.return_value.returncode = 1
+
+        self.assertRaises(CouldNotUploadRpmsException, upload_rpm_chunk, 'upload-rpms', ['a.rpm'])
+
+
+class GetMaximumCommandLengthTests(UnitTests):
+
+    @patch('config_rpm_maker.rpmuploader.environ', {'HOME': '/root'})
+    @patch('config_rpm_maker.rpmuploader.sysconf')
+    def test_should_subtract_size_of_environment_and_safety_margin_from_arg_max(self, mock_sysconf):
+
+        mock_sysconf.return_value = 32 * 1024
+
+        self.assertEqual(32 * 1024 - len('HOME=/root\0') - 4 * 1024, get_maximum_command_length())
+        mock_sysconf.assert_called_with('SC_ARG_MAX')
+
+    @patch('config_rpm_maker.rpmuploader.environ', {})
+    @patch('config_rpm_maker.rpmuploader.sysconf')
+    def test_should_not_exceed_maximum_length_of_a_single_argument(self, mock_sysconf):
+
+        mock_sysconf.return_value = 2 * 1024 * 1024
+
+        self.assertEqual(MAXIMUM_ARGUMENT_LENGTH - 1, get_maximum_command_length())
+
+    @patch('config_rpm_maker.rpmuploader.environ', {})
+    @patch('config_rpm_maker.rpmuploader.sysconf')
+    def test_should_use_default_when_arg_max_is_unknown(self, mock_sysconf):
+
+        mock_sysconf.side_effect = ValueError('unknown')
+
+        self.assertEqual(124 * 1024, get_maximum_command_length())
+
+
+class SplitIntoChunksTests(UnitTests):
+
+    def test_should_split_by_count(self):
+
+        chunks = split_into_chunks(['a', 'b', 'c'], 2, 0, 1000, get_size=lambda rpm: 1)
+
+        self.assertEqual([['a', 'b'], ['c']], chunks)
+
+    def test_should_not_split_when_there_are_no_limits(self):
+
+        chunks = split_into_chunks(['a', 'b', 'c'], 0, 0, 1000, get_size=lambda rpm: 1)
+
+        self.assertEqual([['a', 'b', 'c']], chunks)
+
+    def test_should_split_by_bytes(self):
+
+        sizes = {'a': 60, 'b': 50, 'c': 40, 'd': 10}
+
+        chunks = split_into_chunks(['a', 'b', 'c', 'd'], 0, 100, 1000, get_size=sizes.get)
+
+        self.assertEqual([['a'], ['b', 'c', 'd']], chunks)
+
+    def test_should_put_rpm_exceeding_maximum_bytes_into_chunk_of_its_own(self):
+
+        sizes = {'a': 10, 'b': 500, 'c': 10}
+
+        chunks = split_into_chunks(['a', 'b', 'c'], 0, 100, 1000, get_size=sizes.get)
+
+        self.assertEqual([['a'], ['b'], ['c']], chunks)
+
+    def test_should_split_by_length_of_arguments(self):
+
+        chunks = split_into_chunks(['aaaa', 'bbbb', 'cccc'], 0, 0, 9, get_size=lambda rpm: 1)
+
+        self.assertEqual([['aaaa', 'bbbb'], ['cccc']], chunks)
+
+    def test_should_return_no_chunks_when_there_are_no_rpms(self):
+
+        self.assertEqual([], split_into_chunks([], 10, 0, 1000))
+
+
+class ParallelRpmUploaderTests(UnitTests):
+
+    @patch('config_rpm_maker.rpmuploader.upload_rpm_chunk')
+    def test_should_upload_chunks_one_after_another(self, mock_upload_rpm_chunk):
+
+        rpm_uploader = ParallelRpmUploader('upload-rpms', 2)
+
+        rpm_uploader.upload(['a.rpm', 'b.rpm', 'c.rpm'])
+        rpm_uploader.finish()
+
+        self.assertEqual([call('upload-rpms', ['a.rpm', 'b.rpm']),
+                          call('upload-rpms', ['c.rpm'])], mock_upload_rpm_chunk.call_args_list)
+        self.assertEqual(['a.rpm', 'b.rpm', 'c.rpm'], rpm_uploader.uploaded_rpms)
+        self.assertEqual([2, 1], [count_of_rpms for count_of_rpms, _, _ in rpm_uploader.chunk_statistics])
+
+    @patch('config_rpm_maker.rpmuploader.upload_rpm_chunk')
+    def test_should_run_uploads_at_the_same_time(self, mock_upload_rpm_chunk):
+
+        both_uploads_started = Event()
+        started_uploads = []
+
+        def upload_rpm_chunk(rpm_upload_command, rpm_chunk):
+            started_uploads.append(rpm_chunk)
+            if len(started_uploads) == 2:
+                both_uploads_started.set()
+            both_uploads_started.wait(5)
+
+        mock_upload_rpm_chunk.side_effect = upload_rpm_chunk
+        rpm_uploader = ParallelRpmUploader('upload-rpms', 1, parallel_uploads=2)
+
+        rpm_uploader.upload(['a.rpm', 'b.rpm'])
+        rpm_uploader.finish()
+
+        self.assertTrue(both_uploads_started.is_set())
+        self.assertEqual(['a.rpm', 'b.rpm'], sorted(rpm_uploader.uploaded_rpms))
+
+    @patch('config_rpm_maker.rpmuploader.upload_rpm_chunk')
+    def test_should_not_upload_more_chunks_after_failed_upload(self, mock_upload_rpm_chunk):
+
+        error = CouldNotUploadRpmsException('Upload failed.')
+        mock_upload_rpm_chunk.side_effect = error
+        rpm_uploader = ParallelRpmUploader('upload-rpms', 1)
+
+        rpm_uploader.upload(['a.rpm', 'b.rpm'])
+        rpm_uploader.finish()
+
+        mock_upload_rpm_chunk.assert_called_once_with('upload-rpms', ['a.rpm'])
+        self.assertEqual(error, rpm_uploader.error)
+
+    def test_should_log_statistics(self):
+
+        rpm_uploader = ParallelRpmUploader('upload-rpms', 1, parallel_uploads=2)
+        rpm_uploader.uploaded_rpms = ['a.rpm', 'b.rpm', 'c.rpm']
+        rpm_uploader.chunk_statistics = [(2, 2 * 1024 * 1024, 1.0), (1, 1024 * 1024, 3.0)]
+        mock_logging_function = Mock()
+
+        rpm_uploader.log_statistics(mock_logging_function)
+
+        mock_logging_function.assert_called_with('Rpm upload summary: %d rpm(s) with %d bytes uploaded in %d chunk(s) using %d upload(s) at the same time, '
+                                                 'slowest chunk %.2fs, average %.2fs, %.2f MiB/s per chunk.',
+                                                 3, 3 * 1024 * 1024, 2, 2, 3.0, 2.0, 0.75)
+
+
+class RpmUploaderTests(UnitTests):
+
+    def _upload(self, rpm_uploader, rpms):
+        rpm_queue = Queue()
+        for rpm in rpms:
+            rpm_queue.put(rpm)
+
+        rpm_uploader.start(rpm_queue)
+        rpm_uploader.finish()
+
+    @patch('config_rpm_maker.rpmuploader.upload_rpm_chunk')
+    def test_should_upload_rpms_in_chunks(self, mock_upload_rpm_chunk):
+
+        rpm_uploader = RpmUploader('upload-rpms', 2, 60)
+
+        self._upload(rpm_uploader, ['a.rpm', 'b.rpm', 'c.rpm', 'd.rpm', 'e.rpm'])
+
+        self.assertEqual([call('upload-rpms', ['a.rpm', 'b.rpm']),
+                          call('upload-rpms', ['c.rpm', 'd.rpm']),
+                          call('upload-rpms', ['e.rpm'])], mock_upload_rpm_chunk.call_args_list)
+        self.assertEqual(['a.rpm', 'b.rpm', 'c.rpm', 'd.rpm', 'e.rpm'], rpm_uploader.uploaded_rpms)
+
+    @patch('config_rpm_maker.rpmuploader.upload_rpm_chunk')
+    def test_should_upload_rpm_only_once_when_it_has_been_built_for_several_hosts(self, mock_upload_rpm_chunk):
+
+        rpm_uploader = RpmUploader('upload-rpms', 0, 60)
+
+        self._upload(rpm_uploader, ['group.rpm', 'a.rpm', 'group.rpm'])
+
+        mock_upload_rpm_chunk.assert_called_once_with('upload-rpms', ['group.rpm', 'a.rpm'])
+        self.assertEqual(['group.rpm', 'a.rpm'], rpm_uploader.rpms)
+
+    @patch('config_rpm_maker.rpmuploader.upload_rpm_chunk')
+    def test_should_upload_all_rpms_at_the_end_when_chunk_size_is_zero(self, mock_upload_rpm_chunk):
+
+        rpm_uploader = RpmUploader('upload-rpms', 0, 60)
+
+        self._upload(rpm_uploader, ['a.rpm', 'b.rpm', 'c.rpm'])
+
+        mock_upload_rpm_chunk.assert_called_once_with('upload-rpms', ['a.rpm', 'b.rpm', 'c.rpm'])
+
+    @patch('config_rpm_maker.rpmuploader.upload_rpm_chunk')
+    def test_should_upload_incomplete_chunk_when_time_window_expired(self, mock_upload_rpm_chunk):
+
+        uploaded = Event()
+        mock_upload_rpm_chunk.side_effect = lambda rpm_upload_command, rpm_chunk: uploaded.set()
+        rpm_queue = Queue()
+        rpm_uploader = RpmUploader('upload-rpms', 10, 0)
+        rpm_uploader.start(rpm_queue)
+
+        rpm_queue.put('a.rpm')
+        self.assertTrue(uploaded.wait(5))
+        rpm_uploader.finish()
+
+        mock_upload_rpm_chunk.assert_called_once_with('upload-rpms', ['a.rpm'])
+
+    @patch('config_rpm_maker.rpmuploader.upload_rpm_chunk')
+    def test_should_stop_uploading_after_failed_upload(self, mock_upload_rpm_chunk):
+
+        error = CouldNotUploadRpmsException('Upload failed.')
+        mock_upload_rpm_chunk.side_effect = error
+        rpm_uploader = RpmUploader('upload-rpms', 1, 60)
+
+        self._upload(rpm_uploader, ['a.rpm', 'b.rpm'])
+
+        mock_upload_rpm_chunk.assert_called_once_with('upload-rpms', ['a.rpm'])
+        self.assertEqual(error, rpm_uploader.error)
+        self.assertEqual(['a.rpm', 'b.rpm'], rpm_uploader.rpms)
+        self.assertEqual([], rpm_uploader.uploaded_rpms)
+
+    @patch('config_rpm_maker.rpmuploader.upload_rpm_chunk')
+    def test_should_upload_chunks_of_built_rpms_at_the_same_time(self, mock_upload_rpm_chunk):
+
+        rpm_uploader = RpmUploader('upload-rpms', 1, 60, parallel_uploads=2)
+
+        self._upload(rpm_uploader, ['a.rpm', 'b.rpm', 'c.rpm'])
+
+        self.assertEqual(['a.rpm', 'b.rpm', 'c.rpm'], sorted(rpm_uploader.uploaded_rpms))
+        self.assertEqual(2, len(rpm_uploader.upload_threads))
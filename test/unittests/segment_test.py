@@ -16,7 +16,7 @@
 
 import unittest
 
-from config_rpm_maker.segment import LocTyp, All, Host, Short_HostNr
+from config_rpm_maker.segment import LocTyp, All, Host, Short_HostNr, Typ
 
 
 class SegmentTest(unittest.TestCase):
@@ -54,3 +54,9 @@ class SegmentTest(unittest.TestCase):
         self.assertEqual(['1', ], Short_HostNr().get('devweb01'))
         self.assertEqual(['21', ], Short_HostNr().get('devweb21'))
         self.assertEqual('SHORT_HOSTNR', Short_HostNr().get_variable_name())
+
+    def test_should_return_svn_root_path(self):
+        self.assertEqual('all', All().get_svn_root_path())
+        self.assertEqual('typ/', Typ().get_svn_root_path())
+        self.assertEqual('loctyp/', LocTyp().get_svn_root_path())
+        self.assertEqual('host/', Host().get_svn_root_path())
@@ -0,0 +1,104 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from os import listdir, makedirs, utime
+from os.path import exists, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from mock import Mock
+
+from config_rpm_maker.segmenttreecache import SegmentTreeCache
+
+
+class SegmentTreeCacheTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='segment-tree-cache-test.')
+        self.cache_directory = join(self.temporary_directory, 'cache')
+        self.mock_svn_service = Mock()
+        self.mock_svn_service.get_last_changed_revision_of_directory.return_value = 42
+        self.mock_svn_service.export_without_cache.side_effect = self.export_without_cache
+        self.segment_tree_cache = SegmentTreeCache(self.cache_directory, 1024)
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def export_without_cache(self, svn_path, target_directory, revision):
+        makedirs(join(target_directory, 'data'))
+        with open(join(target_directory, 'data', 'index.html'), 'w') as exported_file:
+            exported_file.write('<html/>')
+        return [(svn_path, 'data'), (svn_path, 'data/index.html')]
+
+    def read_file(self, path):
+        with open(path) as file_to_read:
+            return file_to_read.read()
+
+    def test_should_export_tree_and_copy_it_into_target_directory(self):
+
+        actual = self.segment_tree_cache.export(self.mock_svn_service, 'typ/web', join(self.temporary_directory, 'host-a'), '100')
+
+        self.assertEqual([('typ/web', 'data'), ('typ/web', 'data/index.html')], actual)
+        self.assertEqual('<html/>', self.read_file(join(self.temporary_directory, 'host-a', 'data', 'index.html')))
+        self.assertEqual(['typ%2Fweb@42'], listdir(self.cache_directory))
+
+    def test_should_copy_tree_from_cache_when_it_has_not_been_changed_since_last_export(self):
+
+        self.segment_tree_cache.export(self.mock_svn_service, 'typ/web', join(self.temporary_directory, 'host-a'), '100')
+        actual = self.segment_tree_cache.export(self.mock_svn_service, 'typ/web', join(self.temporary_directory, 'host-b'), '101')
+
+        self.assertEqual(1, self.mock_svn_service.export_without_cache.call_count)
+        self.assertEqual([('typ/web', 'data'), ('typ/web', 'data/index.html')], actual)
+        self.assertEqual('<html/>', self.read_file(join(self.temporary_directory, 'host-b', 'data', 'index.html')))
+        self.assertEqual(1, self.segment_tree_cache.count_of_hits)
+
+    def test_should_export_tree_again_when_it_has_been_changed(self):
+
+        self.segment_tree_cache.export(self.mock_svn_service, 'typ/web', join(self.temporary_directory, 'host-a'), '100')
+        self.mock_svn_service.get_last_changed_revision_of_directory.return_value = 101
+        self.segment_tree_cache.export(self.mock_svn_service, 'typ/web', join(self.temporary_directory, 'host-b'), '101')
+
+        self.assertEqual(2, self.mock_svn_service.export_without_cache.call_count)
+
+    def test_should_export_without_cache_when_svn_path_is_not_a_directory(self):
+
+        self.mock_svn_service.get_last_changed_revision_of_directory.return_value = None
+        self.mock_svn_service.export_without_cache.side_effect = None
+        self.mock_svn_service.export_without_cache.return_value = [('default.spec', '')]
+
+        actual = self.segment_tree_cache.export(self.mock_svn_service, 'default.spec', '/target/default.spec', '100')
+
+        self.assertEqual([('default.spec', '')], actual)
+        self.mock_svn_service.export_without_cache.assert_called_with('default.spec', '/target/default.spec', '100')
+        self.assertEqual([], listdir(self.cache_directory))
+
+    def test_should_remove_incomplete_tree_when_export_fails(self):
+
+        self.mock_svn_service.export_without_cache.side_effect = ValueError('path does not exist')
+
+        self.assertRaises(ValueError, self.segment_tree_cache.export, self.mock_svn_service, 'typ/web', join(self.temporary_directory, 'host-a'), '100')
+        self.assertEqual([], listdir(self.cache_directory))
+
+    def test_should_remove_least_recently_used_trees_when_cache_is_too_big(self):
+
+        self.segment_tree_cache.maximum_size = 10
+        self.segment_tree_cache.export(self.mock_svn_service, 'all', join(self.temporary_directory, 'host-a'), '100')
+        utime(join(self.cache_directory, 'all@42'), (0, 0))
+        self.segment_tree_cache.export(self.mock_svn_service, 'typ/web', join(self.temporary_directory, 'host-a'), '100')
+
+        self.assertFalse(exists(join(self.cache_directory, 'all@42')))
+        self.assertTrue(exists(join(self.cache_directory, 'typ%2Fweb@42')))
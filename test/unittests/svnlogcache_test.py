@@ -0,0 +1,86 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from mock import Mock
+from unittest import TestCase
+
+from config_rpm_maker.svnlogcache import SvnLogCache
+
+
+class SvnLogCacheTests(TestCase):
+
+    def setUp(self):
+        self.mock_svn_service = Mock()
+        self.mock_svn_service.log.return_value = ['log entry 1', 'log entry 2']
+        self.mock_svn_service_queue = Mock()
+        self.mock_svn_service_queue.get.return_value = self.mock_svn_service
+        self.svn_log_cache = SvnLogCache()
+
+    def test_should_return_log_entries_of_svn_path(self):
+
+        actual_log_entries = self.svn_log_cache.log(self.mock_svn_service_queue, 'typ/web', '123', 5)
+
+        self.assertEqual(['log entry 1', 'log entry 2'], actual_log_entries)
+        self.mock_svn_service.log.assert_called_with('typ/web', '123', 5)
+        self.mock_svn_service_queue.put.assert_called_with(self.mock_svn_service)
+
+    def test_should_request_log_only_once(self):
+
+        self.svn_log_cache.log(self.mock_svn_service_queue, 'typ/web', '123', 5)
+        actual_log_entries = self.svn_log_cache.log(self.mock_svn_service_queue, 'typ/web', '123', 5)
+
+        self.assertEqual(1, self.mock_svn_service.log.call_count)
+        self.assertEqual(1, self.mock_svn_service_queue.get.call_count)
+        self.assertEqual(['log entry 1', 'log entry 2'], actual_log_entries)
+
+    def test_should_request_log_again_when_limit_differs(self):
+
+        self.svn_log_cache.log(self.mock_svn_service_queue, 'typ/web', '123', 5)
+        self.svn_log_cache.log(self.mock_svn_service_queue, 'typ/web', '123', 1)
+
+        self.assertEqual(2, self.mock_svn_service.log.call_count)
+
+    def test_should_raise_error_of_failed_request_for_every_lookup(self):
+
+        self.mock_svn_service.log.side_effect = ValueError('path does not exist')
+
+        self.assertRaises(ValueError, self.svn_log_cache.log, self.mock_svn_service_queue, 'loctyp/devweb', '123', 5)
+        self.assertRaises(ValueError, self.svn_log_cache.log, self.mock_svn_service_queue, 'loctyp/devweb', '123', 5)
+        self.assertEqual(1, self.mock_svn_service.log.call_count)
+
+    def test_should_prefetch_logs_using_one_svn_service(self):
+
+        self.svn_log_cache.prefetch(self.mock_svn_service_queue, ['all', 'typ/web'], '123', 5)
+        self.svn_log_cache.log(self.mock_svn_service_queue, 'all', '123', 5)
+        self.svn_log_cache.log(self.mock_svn_service_queue, 'typ/web', '123', 5)
+
+        self.assertEqual(1, self.mock_svn_service_queue.get.call_count)
+        self.mock_svn_service.log.assert_any_call('all', '123', 5)
+        self.mock_svn_service.log.assert_any_call('typ/web', '123', 5)
+        self.assertEqual(2, self.mock_svn_service.log.call_count)
+
+    def test_should_render_log_entry_of_a_revision_only_once(self):
+
+        mock_revision = Mock()
+        mock_revision.number = 123
+        mock_render_function = Mock(return_value='rendered')
+
+        self.svn_log_cache.render({'revision': mock_revision}, mock_render_function)
+        actual_text = self.svn_log_cache.render({'revision': mock_revision}, mock_render_function)
+
+        self.assertEqual('rendered', actual_text)
+        self.assertEqual(1, mock_render_function.call_count)
@@ -0,0 +1,67 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from unittest import TestCase
+
+from config_rpm_maker.segment import All, Host, Typ
+from config_rpm_maker.svnpathindex import SvnPathIndex
+
+
+class SvnPathIndexTests(TestCase):
+
+    def setUp(self):
+        self.svn_path_index = SvnPathIndex(['berweb01', 'devweb01', 'tuvweb02', 'berdb01'])
+
+    def test_should_return_all_hosts_when_changed_path_is_below_all(self):
+
+        self.assertEqual(set(['berweb01', 'devweb01', 'tuvweb02', 'berdb01']), self.svn_path_index.get_affected_hosts('all/foo/bar'))
+
+    def test_should_return_no_hosts_when_changed_path_is_not_below_any_segment(self):
+
+        self.assertEqual(set(), self.svn_path_index.get_affected_hosts('foo/bar'))
+
+    def test_should_return_no_hosts_when_changed_path_is_a_parent_of_the_svn_paths(self):
+
+        self.assertEqual(set(), self.svn_path_index.get_affected_hosts('typ'))
+        self.assertEqual(set(), self.svn_path_index.get_affected_hosts(''))
+
+    def test_should_return_hosts_of_type(self):
+
+        self.assertEqual(set(['berweb01', 'devweb01', 'tuvweb02']), self.svn_path_index.get_affected_hosts('typ/web/data/index.html'))
+
+    def test_should_return_hosts_of_location_group(self):
+
+        self.assertEqual(set(['berweb01', 'berdb01']), self.svn_path_index.get_affected_hosts('loc/pro'))
+
+    def test_should_return_hosts_of_location_type(self):
+
+        self.assertEqual(set(['devweb01']), self.svn_path_index.get_affected_hosts('loctyp/devweb/foo'))
+
+    def test_should_return_host(self):
+
+        self.assertEqual(set(['tuvweb02']), self.svn_path_index.get_affected_hosts('host/tuvweb02/bar'))
+
+    def test_should_match_svn_paths_as_string_prefixes_of_changed_path(self):
+
+        self.assertEqual(set(['berweb01', 'devweb01', 'tuvweb02']), self.svn_path_index.get_affected_hosts('typ/webserver'))
+
+    def test_should_only_index_given_segments(self):
+
+        svn_path_index = SvnPathIndex(['berweb01', 'devweb01'], segments=[All(), Typ(), Host()])
+
+        self.assertEqual(set(), svn_path_index.get_affected_hosts('loc/pro'))
+        self.assertEqual(set(['berweb01']), svn_path_index.get_affected_hosts('host/berweb01'))
@@ -16,10 +16,12 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from threading import Lock
 from unittest import TestCase
-from mock import Mock
+from mock import Mock, patch
+from pysvn import ClientError
 
-from config_rpm_maker.svnservice import SvnServiceException, SvnService
+from config_rpm_maker.svnservice import MAXIMUM_CONSECUTIVE_FAILURES, SvnServiceException, SvnService, SvnServicePool
 
 
 class SvnServiceTests(TestCase):
@@ -56,7 +58,7 @@ class GetLogsForRevision(TestCase):
         mock_svn_service.client = Mock()
         mock_svn_service.client.log.side_effect = Exception("Aaarrrgggghh...")
 
-        self.assertRaises(SvnServiceException, SvnService.get_logs_for_revision, mock_svn_service, '1980')
+        self.assertRaises(SvnServiceException, SvnService._request_logs_for_revision, mock_svn_service, '1980')
 
     def test_should_return_logs_for_revision(self):
         mock_svn_service = Mock(SvnService)
@@ -66,10 +68,33 @@ class GetLogsForRevision(TestCase):
         mock_logs = Mock()
         mock_svn_service.client.log.return_value = mock_logs
 
-        actual = SvnService.get_logs_for_revision(mock_svn_service, '1980')
+        actual = SvnService._request_logs_for_revision(mock_svn_service, '1980')
 
         self.assertEqual(mock_logs, actual)
 
+    def test_should_request_logs_only_once_per_revision(self):
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.change_set_lock = Lock()
+        mock_svn_service.change_sets = {}
+        mock_logs = Mock()
+        mock_svn_service._request_logs_for_revision.return_value = mock_logs
+
+        SvnService.get_logs_for_revision(mock_svn_service, '1980')
+        actual = SvnService.get_logs_for_revision(mock_svn_service, 1980)
+
+        self.assertEqual(mock_logs, actual)
+        mock_svn_service._request_logs_for_revision.assert_called_once_with('1980')
+
+    def test_should_request_logs_for_each_revision(self):
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.change_set_lock = Lock()
+        mock_svn_service.change_sets = {}
+
+        SvnService.get_logs_for_revision(mock_svn_service, '1980')
+        SvnService.get_logs_for_revision(mock_svn_service, '1981')
+
+        self.assertEqual(2, mock_svn_service._request_logs_for_revision.call_count)
+
 
 class GetChangedPathsWithActionTests(TestCase):
 
@@ -202,3 +227,249 @@ class GetDeletedPathsTests(TestCase):
         actual = SvnService.get_deleted_paths(mock_svn_service, '1980')
 
         self.assertEqual(['example', 'spam.egg'], actual)
+
+
+class GetAddedOrDeletedPathsTests(TestCase):
+
+    def test_should_return_added_deleted_and_replaced_paths(self):
+
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.get_changed_paths_with_action.return_value = [('foo.bar', 'A'), ('spam.egg', 'D'), ('example', 'M'), ('test/123', 'R')]
+
+        actual = SvnService.get_added_or_deleted_paths(mock_svn_service, '1980')
+
+        self.assertEqual(['foo.bar', 'spam.egg', 'test/123'], actual)
+
+
+class ExportTests(TestCase):
+
+    def test_should_export_without_cache_when_there_is_no_segment_tree_cache(self):
+
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.segment_tree_cache = None
+        mock_svn_service.export_without_cache.return_value = [('all', 'data')]
+
+        actual = SvnService.export(mock_svn_service, 'all', '/target', '123')
+
+        self.assertEqual([('all', 'data')], actual)
+        mock_svn_service.export_without_cache.assert_called_with('all', '/target', '123')
+
+    def test_should_export_using_segment_tree_cache(self):
+
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.segment_tree_cache = Mock()
+        mock_svn_service.segment_tree_cache.export.return_value = [('all', 'data')]
+
+        actual = SvnService.export(mock_svn_service, 'all', '/target', '123')
+
+        self.assertEqual([('all', 'data')], actual)
+        mock_svn_service.segment_tree_cache.export.assert_called_with(mock_svn_service, 'all', '/target', '123')
+        self.assertFalse(mock_svn_service.export_without_cache.called)
+
+
+class RecordCallTests(TestCase):
+
+    def setUp(self):
+        self.mock_svn_service = Mock(SvnService)
+        self.mock_svn_service.count_of_calls = 0
+        self.mock_svn_service.count_of_failures = 0
+        self.mock_svn_service.consecutive_failures = 0
+        self.mock_svn_service.elapsed_time_in_seconds = 0
+
+    def test_should_count_successful_call(self):
+
+        SvnService._record_call(self.mock_svn_service, 1.5, failed=False)
+
+        self.assertEqual(1, self.mock_svn_service.count_of_calls)
+        self.assertEqual(0, self.mock_svn_service.count_of_failures)
+        self.assertEqual(1.5, self.mock_svn_service.elapsed_time_in_seconds)
+
+    def test_should_count_failed_call(self):
+
+        SvnService._record_call(self.mock_svn_service, 1.5, failed=True)
+
+        self.assertEqual(1, self.mock_svn_service.count_of_calls)
+        self.assertEqual(1, self.mock_svn_service.count_of_failures)
+        self.assertEqual(0, self.mock_svn_service.consecutive_failures)
+
+    def test_should_count_call_which_could_not_reach_repository_as_consecutive_failure(self):
+
+        SvnService._record_call(self.mock_svn_service, 1.5, failed=True, connection_failed=True)
+
+        self.assertEqual(1, self.mock_svn_service.count_of_failures)
+        self.assertEqual(1, self.mock_svn_service.consecutive_failures)
+
+    def test_should_not_reset_consecutive_failures_after_failed_call(self):
+
+        self.mock_svn_service.consecutive_failures = 3
+
+        SvnService._record_call(self.mock_svn_service, 1.5, failed=True)
+
+        self.assertEqual(3, self.mock_svn_service.consecutive_failures)
+
+    def test_should_reset_consecutive_failures_after_successful_call(self):
+
+        self.mock_svn_service.consecutive_failures = 3
+
+        SvnService._record_call(self.mock_svn_service, 1.5, failed=False)
+
+        self.assertEqual(0, self.mock_svn_service.consecutive_failures)
+
+
+class RecordStatisticsTests(TestCase):
+
+    def setUp(self):
+        self.svn_service = SvnService.__new__(SvnService)
+        self.svn_service.count_of_calls = 0
+        self.svn_service.count_of_failures = 0
+        self.svn_service.consecutive_failures = 0
+        self.svn_service.elapsed_time_in_seconds = 0
+        self.svn_service.base_url = 'svn://url/for'
+        self.svn_service.config_url = 'svn://url/for/configuration/repository'
+        self.svn_service.client = Mock()
+
+    def test_should_not_count_path_which_does_not_exist_as_consecutive_failure(self):
+
+        self.svn_service.client.info2.side_effect = ClientError('path not found', [('path not found', 160013)])
+
+        self.assertRaises(ClientError, self.svn_service.get_last_changed_revision_of_directory, 'host/devweb01', '1980')
+
+        self.assertEqual(1, self.svn_service.count_of_failures)
+        self.assertEqual(0, self.svn_service.consecutive_failures)
+
+    def test_should_not_count_url_which_does_not_exist_as_consecutive_failure(self):
+
+        self.svn_service.client.info2.side_effect = ClientError('illegal url', [('illegal url', 170000)])
+
+        self.assertRaises(ClientError, self.svn_service.get_last_changed_revision_of_directory, 'host/devweb01', '1980')
+
+        self.assertEqual(0, self.svn_service.consecutive_failures)
+
+    def test_should_count_connection_refused_as_consecutive_failure(self):
+
+        self.svn_service.client.info2.side_effect = ClientError('connection refused', [('connection refused', 111)])
+
+        self.assertRaises(ClientError, self.svn_service.get_last_changed_revision_of_directory, 'host/devweb01', '1980')
+
+        self.assertEqual(1, self.svn_service.consecutive_failures)
+
+    def test_should_count_repository_access_error_as_consecutive_failure(self):
+
+        self.svn_service.client.info2.side_effect = ClientError('unable to connect', [('unable to connect', 170013)])
+
+        self.assertRaises(ClientError, self.svn_service.get_last_changed_revision_of_directory, 'host/devweb01', '1980')
+
+        self.assertEqual(1, self.svn_service.consecutive_failures)
+
+    def test_should_raise_client_error_with_message_only(self):
+
+        self.svn_service.client.info2.side_effect = ClientError('path not found', [('path not found', 160013)])
+
+        try:
+            self.svn_service.get_last_changed_revision_of_directory('host/devweb01', '1980')
+            self.fail('ClientError has not been raised.')
+        except ClientError as e:
+            self.assertEqual(('path not found',), e.args)
+
+
+class IsHealthyTests(TestCase):
+
+    def setUp(self):
+        self.mock_svn_service = Mock(SvnService)
+        self.mock_svn_service.config_url = 'svn://url/for/configuration/repository'
+        self.mock_svn_service.client = Mock()
+
+    def test_should_be_healthy_without_asking_repository_when_recent_calls_succeeded(self):
+
+        self.mock_svn_service.consecutive_failures = MAXIMUM_CONSECUTIVE_FAILURES - 1
+
+        self.assertTrue(SvnService.is_healthy(self.mock_svn_service))
+        self.assertEqual(0, self.mock_svn_service.client.info2.call_count)
+
+    def test_should_be_healthy_when_repository_can_be_reached_after_failures(self):
+
+        self.mock_svn_service.consecutive_failures = MAXIMUM_CONSECUTIVE_FAILURES
+
+        self.assertTrue(SvnService.is_healthy(self.mock_svn_service))
+        self.assertEqual(0, self.mock_svn_service.consecutive_failures)
+
+    def test_should_not_be_healthy_when_repository_can_not_be_reached_after_failures(self):
+
+        self.mock_svn_service.consecutive_failures = MAXIMUM_CONSECUTIVE_FAILURES
+        self.mock_svn_service.client.info2.side_effect = Exception("Connection refused")
+
+        self.assertFalse(SvnService.is_healthy(self.mock_svn_service))
+
+
+class SvnServicePoolTests(TestCase):
+
+    def setUp(self):
+        self.mock_svn_service = Mock(SvnService)
+        self.mock_svn_service.clone.side_effect = lambda: Mock(SvnService)
+
+    def test_should_use_given_svn_service_when_size_is_one(self):
+
+        pool = SvnServicePool(self.mock_svn_service, 1)
+
+        self.assertEqual([self.mock_svn_service], pool.svn_services)
+        self.assertEqual(0, self.mock_svn_service.clone.call_count)
+
+    def test_should_clone_given_svn_service_to_fill_pool(self):
+
+        pool = SvnServicePool(self.mock_svn_service, 3)
+
+        self.assertEqual(3, len(pool.svn_services))
+        self.assertEqual(2, self.mock_svn_service.clone.call_count)
+
+    def test_should_return_healthy_svn_service(self):
+
+        self.mock_svn_service.is_healthy.return_value = True
+        pool = SvnServicePool(self.mock_svn_service, 1)
+
+        self.assertEqual(self.mock_svn_service, pool.get())
+
+    @patch('config_rpm_maker.svnservice.LOGGER')
+    def test_should_replace_unhealthy_svn_service(self, mock_logger):
+
+        self.mock_svn_service.is_healthy.return_value = False
+        pool = SvnServicePool(self.mock_svn_service, 1)
+
+        actual_svn_service = pool.get()
+
+        self.assertNotEqual(self.mock_svn_service, actual_svn_service)
+        self.assertEqual([actual_svn_service], pool.svn_services)
+        self.assertEqual([self.mock_svn_service], pool.retired_svn_services)
+
+    def test_should_hand_out_svn_service_again_after_it_has_been_put_back(self):
+
+        self.mock_svn_service.is_healthy.return_value = True
+        pool = SvnServicePool(self.mock_svn_service, 1)
+
+        pool.put(pool.get())
+        pool.task_done()
+
+        self.assertEqual(self.mock_svn_service, pool.get())
+
+
+class ListConfigTreeTests(TestCase):
+
+    def test_should_return_paths_relative_to_config_directory_and_whether_they_are_directories(self):
+
+        mock_svn_service = Mock(SvnService)
+        mock_svn_service.path_to_config = '/config'
+        mock_svn_service.config_url = 'file:///path/to/repository/config'
+        mock_svn_service.client = Mock()
+        mock_svn_service._rev.return_value = 'revision 123'
+        mock_svn_service._record_call = Mock()
+        items = []
+        for repos_path, kind in [('/config', 'dir'), (u'/config/all', 'dir'), ('/config/all/motd', 'file')]:
+            item = Mock()
+            item.repos_path = repos_path
+            item.kind = kind
+            items.append((item, None))
+        mock_svn_service.client.list.return_value = items
+
+        actual_listing = SvnService.list_config_tree(mock_svn_service, '123')
+
+        self.assertEqual([('all', True), ('all/motd', False)], actual_listing)
+        self.assertTrue(isinstance(actual_listing[0][0], str))
@@ -60,3 +60,14 @@ class CycleTest(unittest.TestCase):
         actual_graph = TokenCycleChecking(graph_with_cycle)
 
         self.assertRaises(ContainsCyclesException, actual_graph.assert_no_cycles_present)
+
+    def test_should_return_nodes_after_the_nodes_they_have_edges_to(self):
+        graph_with_no_cycles = {'foo': ['bar'],
+                                'bar': ['baz'],
+                                'hello': ['foo', 'baz']}
+
+        components = TokenCycleChecking(graph_with_no_cycles).assert_no_cycles_present()
+
+        order = [node for (node,) in components]
+        self.assertEqual(set(['foo', 'bar', 'baz', 'hello']), set(order))
+        self.assertTrue(order.index('baz') < order.index('bar') < order.index('foo') < order.index('hello'))
@@ -0,0 +1,122 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from mock import ANY, Mock, patch
+from unittest import TestCase
+
+from config_rpm_maker.token.template import Template, get_template, render_template
+
+
+class TemplateTests(TestCase):
+
+    def test_should_split_content_into_literal_chunks_and_token_slots(self):
+
+        template = Template('spam @@@EGGS@@@ ham @@@SPAM@@@')
+
+        self.assertEqual(['spam ', 'EGGS', ' ham ', 'SPAM', ''], template.chunks)
+
+    def test_should_list_every_token_name_once_in_order_of_appearance(self):
+
+        template = Template('@@@SPAM@@@ @@@EGGS@@@ @@@SPAM@@@')
+
+        self.assertEqual(['SPAM', 'EGGS'], template.token_names)
+
+    def test_should_not_have_token_names_when_content_does_not_contain_tokens(self):
+
+        self.assertEqual([], Template('spam @@ eggs').token_names)
+
+    def test_should_render_content_with_replacements(self):
+
+        template = Template('spam @@@EGGS@@@ ham @@@EGGS@@@')
+
+        self.assertEqual('spam eggs ham eggs', template.render({'EGGS': 'eggs'}))
+
+    def test_should_render_unicode_content(self):
+
+        template = Template(u'spam \xe4 @@@EGGS@@@')
+
+        self.assertEqual(u'spam \xe4 eggs', template.render({'EGGS': u'eggs'}))
+
+    def test_should_have_size_of_content(self):
+
+        self.assertEqual(15, Template('spam @@@EGGS@@@').size)
+
+    def test_should_have_size_of_utf_8_encoded_unicode_content(self):
+
+        self.assertEqual(16, Template(u'sp\xe4m @@@EGGS@@@').size)
+
+
+class GetTemplateTests(TestCase):
+
+    def test_should_return_same_template_for_same_content(self):
+
+        self.assertTrue(get_template('spam @@@EGGS@@@') is get_template('spam @@@EGGS@@@'))
+
+    def test_should_return_different_templates_for_byte_and_unicode_content(self):
+
+        self.assertFalse(get_template('spam @@@EGGS@@@') is get_template(u'spam @@@EGGS@@@'))
+
+    @patch('config_rpm_maker.token.template._template_cache', None)
+    @patch('config_rpm_maker.token.template.get_template_cache_size')
+    def test_should_limit_size_of_cached_templates(self, mock_get_template_cache_size):
+
+        mock_get_template_cache_size.return_value = 20
+        first_template = get_template('spam @@@EGGS@@@')
+
+        get_template('eggs @@@SPAM@@@')
+
+        self.assertFalse(first_template is get_template('spam @@@EGGS@@@'))
+
+
+class RenderTemplateTests(TestCase):
+
+    def test_should_render_template_without_key(self):
+
+        self.assertEqual('spam eggs', render_template(Template('spam @@@EGGS@@@'), {'EGGS': 'eggs'}))
+
+    @patch('config_rpm_maker.token.template._get_rendered_output_cache')
+    def test_should_cache_output_by_template_key_and_replacements(self, mock_get_rendered_output_cache):
+
+        mock_template = Mock(Template)
+        mock_template.key = 'key'
+        mock_template.token_names = ['SPAM', 'EGGS']
+
+        render_template(mock_template, {'EGGS': 'eggs', 'SPAM': 'spam'})
+
+        mock_get_rendered_output_cache.return_value.get.assert_called_with(('key', ('spam', 'eggs')), ANY)
+
+    @patch('config_rpm_maker.token.template.get_rendered_output_cache_size')
+    def test_should_reuse_output_of_template_rendered_with_same_replacements(self, mock_get_rendered_output_cache_size):
+
+        mock_get_rendered_output_cache_size.return_value = 1024
+        template = get_template('spam @@@EGGS@@@ reused')
+
+        first_output = render_template(template, {'EGGS': 'eggs'})
+
+        self.assertTrue(first_output is render_template(template, {'EGGS': 'eggs'}))
+        self.assertEqual('spam ham reused', render_template(template, {'EGGS': 'ham'}))
+
+    @patch('config_rpm_maker.token.template._rendered_output_cache', None)
+    @patch('config_rpm_maker.token.template.get_rendered_output_cache_size')
+    def test_should_limit_size_of_cached_output_in_bytes(self, mock_get_rendered_output_cache_size):
+
+        mock_get_rendered_output_cache_size.return_value = 10
+        template = get_template(u'@@@EGGS@@@')
+
+        first_output = render_template(template, {'EGGS': u'\u20ac\u20ac\u20ac\u20ac'})
+
+        self.assertFalse(first_output is render_template(template, {'EGGS': u'\u20ac\u20ac\u20ac\u20ac'}))
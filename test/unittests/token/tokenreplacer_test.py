@@ -21,7 +21,12 @@ import unittest
 from mock import Mock, patch
 
 from config_rpm_maker.token.cycle import ContainsCyclesException
-from config_rpm_maker.token.tokenreplacer import CannotFilterFileException, MissingTokenException, TokenReplacer
+from config_rpm_maker.token.tokenreplacer import (CannotFilterFileException,
+                                                  MissingOrRedundantTokenException,
+                                                  MissingTokenException,
+                                                  TokenReplacer,
+                                                  is_ascii_compatible,
+                                                  resolve_token_values)
 
 
 class TokenReplacerTest(unittest.TestCase):
@@ -32,7 +37,7 @@ class TokenReplacerTest(unittest.TestCase):
     def test_should_raise_exception_when_token_to_filter_is_missing(self):
         self.assertRaises(MissingTokenException, TokenReplacer().filter, "@@@NOT_FOUND@@@")
 
-    def _test_should_return_value_of_replaced_token_when_content_is_token_reference_and_token_contains_special_characters(self):
+    def test_should_return_value_of_replaced_token_when_content_is_token_reference_and_token_contains_special_characters(self):
         self.assertEquals("#\\/@$%&", TokenReplacer({"SPAM": "#\\/@$%&"}).filter("@@@SPAM@@@"))
 
     def test_should_return_value_of_token_when_content_is_single_token(self):
@@ -60,16 +65,93 @@ class TokenReplacerTest(unittest.TestCase):
                           TokenReplacer({"spam": "eggs"},
                                         custom_replacer_function).filter("@@@spam@@@"))
 
+    def test_should_replace_every_occurrence_of_a_token(self):
+        self.assertEquals("spam and spam and spam", TokenReplacer({"SPAM": "spam"}).filter("@@@SPAM@@@ and @@@SPAM@@@ and @@@SPAM@@@"))
+
+    def test_should_call_replacer_function_once_for_each_token(self):
+        calls = []
+
+        def custom_replacer_function(token, value):
+            calls.append((token, value))
+            return value
+
+        TokenReplacer({"SPAM": "spam"}, custom_replacer_function).filter("@@@SPAM@@@ and @@@SPAM@@@")
+
+        self.assertEqual([("SPAM", "spam")], calls)
+
+    def test_should_remember_used_tokens(self):
+        token_replacer = TokenReplacer({"SPAM": "spam", "EGGS": "eggs", "HAM": "ham"})
+
+        token_replacer.filter("@@@SPAM@@@ and @@@EGGS@@@")
+
+        self.assertEqual(set(["SPAM", "EGGS"]), token_replacer.token_used)
+
+    def test_should_not_replace_tokens_returned_by_replacer_function(self):
+        def custom_replacer_function(token, value):
+            return "@@@EGGS@@@"
+        self.assertEquals("@@@EGGS@@@", TokenReplacer({"SPAM": "spam", "EGGS": "eggs"}, custom_replacer_function).filter("@@@SPAM@@@"))
+
+    def test_should_encode_replacements_when_filtering_bytes(self):
+        self.assertEquals("\xe4pfel", TokenReplacer({"SPAM": "äpfel"}).filter("@@@SPAM@@@", encoding='iso-8859-1'))
+
     def test_should_replace_token_in_token(self):
         self.assertEquals("foo", TokenReplacer({"FOO": "foo", "BAR": "@@@FOO@@@"}).filter("@@@BAR@@@"))
 
     def test_should_replace_multiple_token_in_token(self):
         self.assertEquals("fooIGNOREfoo", TokenReplacer({"FOO": "foo", "BAR": "@@@FOO@@@", "BAT": "@@@FOO@@@IGNORE@@@BAR@@@"}).filter("@@@BAT@@@"))
 
+    def test_should_replace_chained_tokens_in_tokens(self):
+        token_values = dict(("VARIABLE_%d" % number, "@@@VARIABLE_%d@@@" % (number + 1)) for number in range(5000))
+        token_values["VARIABLE_5000"] = "spam"
+
+        self.assertEquals("spam", TokenReplacer(token_values).filter("@@@VARIABLE_0@@@"))
+
+    def test_should_raise_exception_when_token_in_token_is_missing(self):
+        self.assertRaises(MissingOrRedundantTokenException, TokenReplacer, {"FOO": "foo", "BAR": "@@@FOO@@@ @@@NOT_FOUND@@@"})
+
+    def test_should_raise_exception_when_token_in_token_depends_on_missing_token(self):
+        self.assertRaises(MissingOrRedundantTokenException, TokenReplacer, {"FOO": "@@@NOT_FOUND@@@", "BAR": "@@@FOO@@@"})
+
+    def test_should_raise_exception_when_token_requires_itself(self):
+        self.assertRaises(MissingOrRedundantTokenException, TokenReplacer, {"FOO": "@@@FOO@@@"})
+
     def test_should_determine_token_recursion(self):
         self.assertRaises(ContainsCyclesException, TokenReplacer, {"FOO": "@@@BAR@@@", "BAR": "@@@FOO@@@"})
         self.assertRaises(ContainsCyclesException, TokenReplacer, {"FOO": "@@@BAR@@@", "BAR": "@@@BLO@@@", "BLO": "@@@FOO@@@"})
 
+    def test_should_resolve_token_lazily(self):
+        token_replacer = TokenReplacer({"FOO": "foo", "BAR": "@@@FOO@@@ bar", "BROKEN": "@@@NOT_FOUND@@@"}, lazy=True)
+
+        self.assertEquals("foo bar", token_replacer.resolve("BAR"))
+        self.assertEquals({"FOO": "foo", "BAR": "foo bar"}, token_replacer.token_values)
+
+    def test_should_resolve_token_using_resolved_token_values(self):
+        token_replacer = TokenReplacer({"FOO": "@@@BAR@@@ foo"}, resolved_token_values={"BAR": u"bar"}, lazy=True)
+
+        self.assertEquals("bar foo", token_replacer.resolve("FOO"))
+
+    def test_should_raise_exception_when_lazily_resolved_token_depends_on_missing_token(self):
+        token_replacer = TokenReplacer({"FOO": "@@@NOT_FOUND@@@", "BAR": "@@@FOO@@@"}, lazy=True)
+
+        self.assertRaises(MissingOrRedundantTokenException, token_replacer.resolve, "BAR")
+
+    def test_should_raise_exception_when_token_to_resolve_is_missing(self):
+        self.assertRaises(MissingTokenException, TokenReplacer({"FOO": "foo"}, lazy=True).resolve, "BAR")
+        self.assertRaises(MissingTokenException, TokenReplacer({"FOO": "foo"}).resolve, "BAR")
+
+    def test_should_determine_token_recursion_when_resolving_lazily(self):
+        token_replacer = TokenReplacer({"FOO": "@@@BAR@@@", "BAR": "@@@FOO@@@"}, lazy=True)
+
+        self.assertRaises(ContainsCyclesException, token_replacer.resolve, "FOO")
+
+    def test_should_filter_using_lazily_resolved_tokens(self):
+        self.assertEquals("foo bar", TokenReplacer({"FOO": "foo", "BAR": "@@@FOO@@@ bar"}, lazy=True).filter("@@@BAR@@@"))
+
+    def test_should_use_resolved_token_values(self):
+        token_replacer = TokenReplacer({"FOO": "@@@BAR@@@ foo"}, resolved_token_values={"BAR": u"bar"})
+
+        self.assertEquals({"FOO": "bar foo", "BAR": "bar"}, token_replacer.token_values)
+
     @patch('config_rpm_maker.token.tokenreplacer.get_max_file_size')
     @patch('config_rpm_maker.token.tokenreplacer.getsize')
     def test_should_not_filter_file_with_encoding_unknown_8bit(self, mock_get_size, mock_config):
@@ -95,3 +177,58 @@ class TokenReplacerTest(unittest.TestCase):
         mock_token_replacer = Mock(TokenReplacer)
 
         self.assertRaises(CannotFilterFileException, TokenReplacer.filter_file, mock_token_replacer, "binary.file")
+
+    def test_should_filter_bytes_of_file_with_ascii_compatible_encoding(self):
+
+        mock_token_replacer = Mock(TokenReplacer)
+
+        TokenReplacer._perform_filtering_on_file(mock_token_replacer, "file", "@@@SPAM@@@", "utf-8", False)
+
+        mock_token_replacer._perform_filtering_on_bytes.assert_called_with("file", "@@@SPAM@@@", "utf-8")
+
+    @patch('config_rpm_maker.token.tokenreplacer.open', create=True)
+    def test_should_decode_file_when_escaping_html(self, mock_open):
+
+        mock_token_replacer = Mock(TokenReplacer)
+        mock_token_replacer.html_escape_function = Mock(return_value=u"html")
+        mock_token_replacer.filter.return_value = u"html"
+
+        TokenReplacer._perform_filtering_on_file(mock_token_replacer, "file", "@@@SPAM@@@", "utf-8", True)
+
+        self.assertEqual(0, mock_token_replacer._perform_filtering_on_bytes.call_count)
+        mock_token_replacer.html_escape_function.assert_called_with("file", u"@@@SPAM@@@")
+
+    @patch('config_rpm_maker.token.tokenreplacer.open', create=True)
+    def test_should_not_write_file_without_tokens(self, mock_open):
+
+        mock_token_replacer = Mock(TokenReplacer)
+
+        TokenReplacer._perform_filtering_on_bytes(mock_token_replacer, "file", "spam", "utf-8")
+
+        self.assertEqual(0, mock_open.call_count)
+
+
+class IsAsciiCompatibleTests(unittest.TestCase):
+
+    def test_should_return_true_for_ascii_compatible_encodings(self):
+        self.assertTrue(is_ascii_compatible('us-ascii'))
+        self.assertTrue(is_ascii_compatible('utf-8'))
+        self.assertTrue(is_ascii_compatible('iso-8859-15'))
+
+    def test_should_return_false_for_other_encodings(self):
+        self.assertFalse(is_ascii_compatible('utf-16le'))
+        self.assertFalse(is_ascii_compatible('ebcdic'))
+
+
+class ResolveTokenValuesTests(unittest.TestCase):
+
+    def test_should_leave_out_unresolved_values_when_ignoring_them(self):
+        self.assertEquals({"FOO": "foo", "BAR": "foo bar"},
+                          resolve_token_values({"FOO": "foo", "BAR": "@@@FOO@@@ bar", "SPAM": "@@@EGGS@@@"}, ignore_unresolved=True))
+
+    def test_should_leave_out_cycles_when_ignoring_unresolved_values(self):
+        self.assertEquals({"FOO": "foo"},
+                          resolve_token_values({"SPAM": "@@@EGGS@@@", "EGGS": "@@@SPAM@@@"}, {"FOO": "foo"}, ignore_unresolved=True))
+
+    def test_should_raise_exception_when_value_is_unresolved(self):
+        self.assertRaises(MissingOrRedundantTokenException, resolve_token_values, {"SPAM": "@@@EGGS@@@"})
@@ -0,0 +1,81 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from mock import Mock, patch
+from unittest import TestCase
+
+from config_rpm_maker.utilities.encoding import MagicPool, detect_encoding
+
+
+class DetectEncodingTests(TestCase):
+
+    def test_should_detect_ascii(self):
+
+        self.assertEqual('us-ascii', detect_encoding('spam and eggs\n'))
+
+    def test_should_detect_utf8(self):
+
+        self.assertEqual('utf-8', detect_encoding(u'sp\xe4m and eggs\n'.encode('utf-8')))
+
+    def test_should_detect_binary(self):
+
+        self.assertEqual('binary', detect_encoding('\x00\x01\x02\x03\xff\xfe\x00\x00'))
+
+    @patch('config_rpm_maker.utilities.encoding._magic_pool')
+    def test_should_detect_encoding_of_same_content_only_once(self, mock_magic_pool):
+
+        mock_magic = Mock()
+        mock_magic.from_buffer.return_value = 'us-ascii'
+        mock_magic_pool.get.return_value = mock_magic
+
+        detect_encoding('content which has not been detected in another test')
+        actual_encoding = detect_encoding('content which has not been detected in another test')
+
+        self.assertEqual('us-ascii', actual_encoding)
+        self.assertEqual(1, mock_magic.from_buffer.call_count)
+        mock_magic_pool.put.assert_called_with(mock_magic)
+
+
+class MagicPoolTests(TestCase):
+
+    @patch('config_rpm_maker.utilities.encoding.Magic')
+    def test_should_create_magic_detecting_encodings_when_none_is_available(self, mock_magic_class):
+
+        actual_magic = MagicPool().get()
+
+        self.assertEqual(mock_magic_class.return_value, actual_magic)
+        mock_magic_class.assert_called_with(mime_encoding=True)
+
+    @patch('config_rpm_maker.utilities.encoding.Magic')
+    def test_should_reuse_magic_which_has_been_put_back(self, mock_magic_class):
+
+        magic_pool = MagicPool()
+        magic = magic_pool.get()
+        magic_pool.put(magic)
+
+        self.assertEqual(magic, magic_pool.get())
+        self.assertEqual(1, mock_magic_class.call_count)
+
+    @patch('config_rpm_maker.utilities.encoding.Magic')
+    def test_should_create_new_magic_after_pool_has_been_closed(self, mock_magic_class):
+
+        magic_pool = MagicPool()
+        magic_pool.put(magic_pool.get())
+        magic_pool.close()
+        magic_pool.get()
+
+        self.assertEqual(2, mock_magic_class.call_count)
@@ -0,0 +1,200 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import tarfile
+
+from os import chmod, link, makedirs, readlink, stat, symlink
+from os.path import exists, islink, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from config_rpm_maker.utilities.filesystem import break_hard_link, copy_tree, create_tar_file
+
+
+class CopyTreeTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='copy-tree-test.')
+        self.source_directory = join(self.temporary_directory, 'source')
+        self.target_directory = join(self.temporary_directory, 'target')
+        makedirs(join(self.source_directory, 'files'))
+        self.write_file(join(self.source_directory, 'files', 'spam'), 'spam')
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def write_file(self, path, content):
+        with open(path, 'w') as file_to_write:
+            file_to_write.write(content)
+
+    def read_file(self, path):
+        with open(path) as file_to_read:
+            return file_to_read.read()
+
+    def test_should_create_target_directory_and_copy_files(self):
+
+        copy_tree(self.source_directory, self.target_directory)
+
+        self.assertEqual('spam', self.read_file(join(self.target_directory, 'files', 'spam')))
+
+    def test_should_keep_files_which_already_exist_in_target_directory(self):
+
+        makedirs(join(self.target_directory, 'files'))
+        self.write_file(join(self.target_directory, 'files', 'eggs'), 'eggs')
+
+        copy_tree(self.source_directory, self.target_directory)
+
+        self.assertEqual('eggs', self.read_file(join(self.target_directory, 'files', 'eggs')))
+
+    def test_should_replace_existing_file_without_writing_through_hard_link(self):
+
+        makedirs(join(self.target_directory, 'files'))
+        self.write_file(join(self.temporary_directory, 'original'), 'original')
+        link(join(self.temporary_directory, 'original'), join(self.target_directory, 'files', 'spam'))
+
+        copy_tree(self.source_directory, self.target_directory)
+
+        self.assertEqual('spam', self.read_file(join(self.target_directory, 'files', 'spam')))
+        self.assertEqual('original', self.read_file(join(self.temporary_directory, 'original')))
+
+    def test_should_copy_symbolic_links_as_links(self):
+
+        symlink('/foo/bar', join(self.source_directory, 'files', 'link'))
+
+        copy_tree(self.source_directory, self.target_directory)
+
+        self.assertTrue(islink(join(self.target_directory, 'files', 'link')))
+        self.assertEqual('/foo/bar', readlink(join(self.target_directory, 'files', 'link')))
+
+    def test_should_copy_symbolic_links_to_directories_as_links(self):
+
+        symlink('files', join(self.source_directory, 'directory-link'))
+
+        copy_tree(self.source_directory, self.target_directory)
+
+        self.assertTrue(islink(join(self.target_directory, 'directory-link')))
+        self.assertTrue(exists(join(self.target_directory, 'directory-link', 'spam')))
+
+    def test_should_hard_link_files_when_linking_files(self):
+
+        copy_tree(self.source_directory, self.target_directory, link_files=True)
+
+        self.assertEqual(stat(join(self.source_directory, 'files', 'spam')).st_ino,
+                         stat(join(self.target_directory, 'files', 'spam')).st_ino)
+
+
+class BreakHardLinkTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='break-hard-link-test.')
+        self.original_path = join(self.temporary_directory, 'original')
+        self.linked_path = join(self.temporary_directory, 'linked')
+        with open(self.original_path, 'w') as original_file:
+            original_file.write('original')
+        chmod(self.original_path, 0755)
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def test_should_replace_hard_linked_file_by_a_copy_of_its_own(self):
+
+        link(self.original_path, self.linked_path)
+
+        break_hard_link(self.linked_path)
+        with open(self.linked_path, 'w') as linked_file:
+            linked_file.write('changed')
+
+        with open(self.original_path) as original_file:
+            self.assertEqual('original', original_file.read())
+        self.assertEqual(1, stat(self.original_path).st_nlink)
+        self.assertEqual(0755, stat(self.linked_path).st_mode & 0777)
+
+    def test_should_not_replace_file_without_other_links(self):
+
+        inode = stat(self.original_path).st_ino
+
+        break_hard_link(self.original_path)
+
+        self.assertEqual(inode, stat(self.original_path).st_ino)
+
+    def test_should_ignore_missing_file(self):
+
+        break_hard_link(join(self.temporary_directory, 'missing'))
+
+
+class CreateTarFileTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='create-tar-file-test.')
+        self.source_directory = join(self.temporary_directory, 'yadt-config-devweb01')
+        makedirs(join(self.source_directory, 'files'))
+        with open(join(self.source_directory, 'files', 'spam'), 'w') as spam_file:
+            spam_file.write('spam')
+        symlink('spam', join(self.source_directory, 'files', 'eggs'))
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def test_should_write_gzip_compressed_tar_file(self):
+
+        tar_file_path = join(self.temporary_directory, 'yadt-config-devweb01.tar.gz')
+
+        create_tar_file(tar_file_path, self.source_directory, 'yadt-config-devweb01', 9)
+
+        with tarfile.open(tar_file_path, 'r:gz') as archive:
+            self.assertEqual('spam', archive.extractfile('yadt-config-devweb01/files/spam').read())
+
+    def test_should_write_uncompressed_tar_file_when_compression_level_is_zero(self):
+
+        tar_file_path = join(self.temporary_directory, 'yadt-config-devweb01.tar')
+
+        create_tar_file(tar_file_path, self.source_directory, 'yadt-config-devweb01', 0)
+
+        with tarfile.open(tar_file_path, 'r:') as archive:
+            self.assertEqual('spam', archive.extractfile('yadt-config-devweb01/files/spam').read())
+
+    def test_should_use_archive_name_as_top_level_directory(self):
+
+        tar_file_path = join(self.temporary_directory, 'yadt-config-group.tar')
+
+        create_tar_file(tar_file_path, self.source_directory, 'yadt-config-group', 0)
+
+        with tarfile.open(tar_file_path) as archive:
+            self.assertEqual(['yadt-config-group', 'yadt-config-group/files', 'yadt-config-group/files/eggs', 'yadt-config-group/files/spam'],
+                             sorted(archive.getnames()))
+
+    def test_should_keep_symbolic_links(self):
+
+        tar_file_path = join(self.temporary_directory, 'yadt-config-devweb01.tar.gz')
+
+        create_tar_file(tar_file_path, self.source_directory, 'yadt-config-devweb01', 6)
+
+        with tarfile.open(tar_file_path) as archive:
+            link_info = archive.getmember('yadt-config-devweb01/files/eggs')
+            self.assertTrue(link_info.issym())
+            self.assertEqual('spam', link_info.linkname)
+
+
+    def test_should_add_only_given_paths_instead_of_walking_directory(self):
+
+        tar_file_path = join(self.temporary_directory, 'yadt-config-devweb01.tar')
+
+        create_tar_file(tar_file_path, self.source_directory, 'yadt-config-devweb01', 0, ['files', 'files/spam'])
+
+        with tarfile.open(tar_file_path) as archive:
+            self.assertEqual(['yadt-config-devweb01', 'yadt-config-devweb01/files', 'yadt-config-devweb01/files/spam'], archive.getnames())
+            self.assertEqual('spam', archive.extractfile('yadt-config-devweb01/files/spam').read())
@@ -0,0 +1,93 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from unittest import TestCase
+
+from config_rpm_maker.utilities.graph import find_reachable_nodes, find_strongly_connected_components
+
+
+class FindStronglyConnectedComponentsTests(TestCase):
+
+    def test_should_return_no_components_when_graph_is_empty(self):
+
+        self.assertEqual([], find_strongly_connected_components({}))
+
+    def test_should_return_one_component_for_each_node_when_graph_has_no_cycles(self):
+
+        components = find_strongly_connected_components({'foo': ['bar'], 'bar': []})
+
+        self.assertEqual([('bar',), ('foo',)], components)
+
+    def test_should_return_successors_which_are_not_in_graph_as_components(self):
+
+        components = find_strongly_connected_components({'foo': ['bar']})
+
+        self.assertEqual([('bar',), ('foo',)], components)
+
+    def test_should_return_nodes_of_cycle_as_one_component(self):
+
+        components = find_strongly_connected_components({'foo': ['bar'], 'bar': ['baz'], 'baz': ['foo'], 'hello': ['foo']})
+
+        self.assertEqual(2, len(components))
+        self.assertEqual(set(['foo', 'bar', 'baz']), set(components[0]))
+        self.assertEqual(('hello',), components[1])
+
+    def test_should_return_node_with_edge_to_itself_as_single_component(self):
+
+        self.assertEqual([('foo',)], find_strongly_connected_components({'foo': ['foo']}))
+
+    def test_should_return_components_after_the_components_reachable_from_them(self):
+
+        graph = {'a': ['b', 'c'], 'b': ['d'], 'c': ['d', 'e'], 'd': [], 'e': ['c', 'f']}
+
+        components = [set(component) for component in find_strongly_connected_components(graph)]
+
+        self.assertEqual(5, len(components))
+        position = dict((node, number) for (number, component) in enumerate(components) for node in component)
+        self.assertEqual(position['c'], position['e'])
+        self.assertTrue(position['d'] < position['b'] < position['a'])
+        self.assertTrue(position['d'] < position['c'] < position['a'])
+        self.assertTrue(position['f'] < position['c'])
+
+    def test_should_not_hit_recursion_limit_on_long_chain(self):
+
+        graph = dict((number, [number + 1]) for number in range(20000))
+
+        components = find_strongly_connected_components(graph)
+
+        self.assertEqual(20001, len(components))
+        self.assertEqual((20000,), components[0])
+        self.assertEqual((0,), components[-1])
+
+
+class FindReachableNodesTests(TestCase):
+
+    def test_should_return_start_nodes_when_they_have_no_successors(self):
+
+        self.assertEqual(set(['foo']), find_reachable_nodes({}, ['foo']))
+
+    def test_should_return_successors_of_successors(self):
+
+        reachable_nodes = find_reachable_nodes({'foo': ['bar'], 'bar': ['baz'], 'hello': ['world']}, ['foo'])
+
+        self.assertEqual(set(['foo', 'bar', 'baz']), reachable_nodes)
+
+    def test_should_return_nodes_of_cycle_once(self):
+
+        reachable_nodes = find_reachable_nodes({'foo': ['bar'], 'bar': ['foo']}, ['bar'])
+
+        self.assertEqual(set(['foo', 'bar']), reachable_nodes)
@@ -0,0 +1,85 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from mock import Mock, patch
+from unittest import TestCase
+
+from config_rpm_maker.utilities.lrucache import LruCache
+
+
+class LruCacheTests(TestCase):
+
+    @patch('config_rpm_maker.utilities.lrucache.register_cache')
+    def setUp(self, mock_register_cache):
+        self.lru_cache = LruCache('test cache', 2)
+
+    def test_should_compute_value_when_key_is_not_cached(self):
+
+        mock_compute_value = Mock(return_value='spam')
+
+        self.assertEqual('spam', self.lru_cache.get('key', mock_compute_value))
+        mock_compute_value.assert_called_with()
+        self.assertEqual(1, self.lru_cache.count_of_misses)
+
+    def test_should_return_cached_value(self):
+
+        self.lru_cache.get('key', lambda: 'spam')
+        mock_compute_value = Mock(return_value='eggs')
+
+        self.assertEqual('spam', self.lru_cache.get('key', mock_compute_value))
+        self.assertFalse(mock_compute_value.called)
+        self.assertEqual(1, self.lru_cache.count_of_hits)
+
+    def test_should_remove_least_recently_used_entry_when_maximum_size_is_exceeded(self):
+
+        self.lru_cache.get('spam', lambda: 'spam')
+        self.lru_cache.get('eggs', lambda: 'eggs')
+        self.lru_cache.get('spam', lambda: 'not cached')
+        self.lru_cache.get('ham', lambda: 'ham')
+
+        self.assertEqual(2, len(self.lru_cache))
+        self.assertEqual('spam', self.lru_cache.get('spam', lambda: 'not cached'))
+        self.assertEqual('eggs again', self.lru_cache.get('eggs', lambda: 'eggs again'))
+
+    def test_should_register_cache_to_log_summary(self):
+
+        with patch('config_rpm_maker.utilities.lrucache.register_cache') as mock_register_cache:
+            lru_cache = LruCache('test cache', 2)
+
+        mock_register_cache.assert_called_with(lru_cache)
+
+    @patch('config_rpm_maker.utilities.lrucache.register_cache')
+    def test_should_limit_sum_of_sizes_of_values_when_get_size_is_given(self, mock_register_cache):
+
+        lru_cache = LruCache('test cache', 10, get_size=len)
+
+        lru_cache.get('spam', lambda: 'spam')
+        lru_cache.get('eggs', lambda: 'eggs')
+        lru_cache.get('ham', lambda: 'ham')
+
+        self.assertEqual(2, len(lru_cache))
+        self.assertEqual(7, lru_cache.size)
+        self.assertEqual('not cached', lru_cache.get('spam', lambda: 'not cached'))
+
+    @patch('config_rpm_maker.utilities.lrucache.register_cache')
+    def test_should_not_cache_value_bigger_than_maximum_size(self, mock_register_cache):
+
+        lru_cache = LruCache('test cache', 3, get_size=len)
+
+        self.assertEqual('spam', lru_cache.get('spam', lambda: 'spam'))
+        self.assertEqual(0, len(lru_cache))
+        self.assertEqual(0, lru_cache.size)
@@ -17,9 +17,9 @@
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from unittest import TestCase
-from mock import patch
+from mock import Mock, call, patch
 
-from config_rpm_maker.utilities.profiler import measure_execution_time
+from config_rpm_maker.utilities.profiler import log_cache_summaries, measure_execution_time
 
 
 class ProfilerTests(TestCase):
@@ -36,3 +36,33 @@ class ProfilerTests(TestCase):
         actual_function()
 
         self.assertTrue(self.dummy_function_has_been_executed)
+
+
+class LogCacheSummariesTests(TestCase):
+
+    def create_mock_cache(self, name, count_of_hits, count_of_misses):
+        mock_cache = Mock()
+        mock_cache.name = name
+        mock_cache.count_of_hits = count_of_hits
+        mock_cache.count_of_misses = count_of_misses
+        return mock_cache
+
+    @patch('config_rpm_maker.utilities.profiler._caches', [])
+    def test_should_not_log_anything_when_no_cache_has_been_used(self):
+
+        mock_logging_function = Mock()
+
+        log_cache_summaries(mock_logging_function)
+
+        self.assertFalse(mock_logging_function.called)
+
+    def test_should_log_hits_and_misses_of_used_caches(self):
+
+        caches = [self.create_mock_cache('spam', 3, 1), self.create_mock_cache('eggs', 0, 0)]
+        mock_logging_function = Mock()
+
+        with patch('config_rpm_maker.utilities.profiler._caches', caches):
+            log_cache_summaries(mock_logging_function)
+
+        self.assertEqual([call('Cache summary:'),
+                          call('    %7d hits %7d misses : %s', 3, 1, 'spam')], mock_logging_function.call_args_list)
@@ -0,0 +1,168 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from os import makedirs
+from os.path import dirname, isdir, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from mock import Mock
+
+from config_rpm_maker.overlayplanner import ConfigTree
+from config_rpm_maker.variableimpact import VariableImpactAnalyzer
+
+FILES = {'all/VARIABLES/LOC': 'ber',
+         'all/VARIABLES/HTTP_PORT': '80',
+         'all/VARIABLES/LISTEN': '@@@IP@@@:@@@HTTP_PORT@@@',
+         'all/VARIABLES/UNUSED': 'spam',
+         'all/VARIABLES/RPM_REQUIRES': 'httpd',
+         'all/etc/motd': 'Welcome to @@@LOC@@@',
+         'typ/web/etc/httpd.conf': 'Listen @@@LISTEN@@@',
+         'host/berweb01/VARIABLES/LOC': 'berlin'}
+
+
+class VariableImpactAnalyzerTests(TestCase):
+
+    def setUp(self):
+        self.temporary_directory = mkdtemp(prefix='variable-impact-test.')
+        listing = []
+        for path, content in FILES.items():
+            file_path = join(self.temporary_directory, path)
+            if not isdir(dirname(file_path)):
+                makedirs(dirname(file_path))
+            with open(file_path, 'w') as file_to_write:
+                file_to_write.write(content)
+
+            names = path.split('/')
+            listing += [('/'.join(names[:index]), True) for index in range(1, len(names))]
+            listing.append((path, False))
+
+        self.spec_file_path = join(self.temporary_directory, 'default.spec')
+        with open(self.spec_file_path, 'w') as spec_file:
+            spec_file.write('Requires: @@@RPM_REQUIRES@@@')
+
+        self.mock_export_cache = Mock()
+        self.mock_export_cache.get_directory.side_effect = lambda svn_service_queue, svn_path, revision: join(self.temporary_directory, svn_path)
+        self.variable_impact_analyzer = VariableImpactAnalyzer('123', ConfigTree(sorted(set(listing))), Mock(), self.mock_export_cache, self.spec_file_path)
+
+    def tearDown(self):
+        rmtree(self.temporary_directory)
+
+    def test_should_skip_host_when_changed_variable_is_not_referenced(self):
+
+        reason = self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/UNUSED'])
+
+        self.assertEqual('no file references SVNLOG, UNUSED', reason)
+
+    def test_should_not_skip_host_when_file_references_changed_variable(self):
+
+        self.assertEqual(None, self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/LOC']))
+
+    def test_should_not_skip_host_when_referenced_variable_references_changed_variable(self):
+
+        self.assertEqual(None, self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/HTTP_PORT']))
+
+    def test_should_not_skip_host_of_other_type_only_because_of_variables_referenced_by_files_of_web_hosts(self):
+
+        reason = self.variable_impact_analyzer.get_reason_to_skip('berapp01', ['all/VARIABLES/HTTP_PORT'])
+
+        self.assertEqual('no file references HTTP_PORT, SVNLOG', reason)
+
+    def test_should_skip_host_overriding_changed_variable(self):
+
+        reason = self.variable_impact_analyzer.get_reason_to_skip('berweb01', ['all/VARIABLES/LOC'])
+
+        self.assertEqual('changed variables are overridden', reason)
+
+    def test_should_not_skip_host_when_file_has_been_changed(self):
+
+        self.assertEqual(None, self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/UNUSED', 'all/etc/motd']))
+
+    def test_should_not_skip_host_when_variable_used_by_build_has_been_changed(self):
+
+        self.assertEqual(None, self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/RPM_NAME']))
+
+    def test_should_not_skip_host_when_dependency_file_has_been_changed(self):
+
+        self.assertEqual(None, self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/RPM_REQUIRES']))
+
+    def test_should_ignore_changed_paths_outside_of_svn_paths_of_host(self):
+
+        reason = self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/UNUSED', 'typ/app/etc/motd'])
+
+        self.assertEqual('no file references SVNLOG, UNUSED', reason)
+
+    def test_should_not_skip_host_when_a_file_references_patch_info(self):
+
+        with open(join(self.temporary_directory, 'typ', 'web', 'etc', 'httpd.conf'), 'w') as file_to_write:
+            file_to_write.write('# @@@VARIABLES@@@')
+
+        self.assertEqual(None, self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/UNUSED']))
+
+    def test_should_not_skip_host_when_a_file_references_svn_log(self):
+
+        with open(join(self.temporary_directory, 'typ', 'web', 'etc', 'httpd.conf'), 'w') as file_to_write:
+            file_to_write.write('# @@@SVNLOG@@@')
+
+        self.assertEqual(None, self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/UNUSED']))
+
+    def test_should_not_skip_host_overriding_changed_variable_when_spec_file_references_svn_log(self):
+
+        with open(self.spec_file_path, 'w') as spec_file:
+            spec_file.write('%description\n@@@SVNLOG@@@')
+
+        self.assertEqual(None, self.variable_impact_analyzer.get_reason_to_skip('berweb01', ['all/VARIABLES/LOC']))
+
+    def test_should_not_skip_host_when_added_variable_file_changes_referenced_overlaying(self):
+
+        with open(self.spec_file_path, 'w') as spec_file:
+            spec_file.write('%description\n@@@OVERLAYING@@@')
+
+        self.assertEqual(None, self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/UNUSED'], ['all/VARIABLES/UNUSED']))
+
+    def test_should_not_skip_host_when_deleted_variable_file_changes_referenced_overlaying(self):
+
+        with open(self.spec_file_path, 'w') as spec_file:
+            spec_file.write('%description\n@@@OVERLAYING@@@')
+
+        self.assertEqual(None, self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['typ/web/VARIABLES/DELETED'], ['typ/web/VARIABLES/DELETED']))
+
+    def test_should_skip_host_when_modified_variable_file_does_not_change_referenced_overlaying(self):
+
+        with open(self.spec_file_path, 'w') as spec_file:
+            spec_file.write('%description\n@@@OVERLAYING@@@')
+
+        reason = self.variable_impact_analyzer.get_reason_to_skip('berweb02', ['all/VARIABLES/UNUSED'])
+
+        self.assertEqual('no file references SVNLOG, UNUSED', reason)
+
+    def test_should_skip_host_overriding_added_variable_file_although_overlaying_is_referenced(self):
+
+        with open(self.spec_file_path, 'w') as spec_file:
+            spec_file.write('%description\n@@@OVERLAYING@@@')
+
+        reason = self.variable_impact_analyzer.get_reason_to_skip('berweb01', ['all/VARIABLES/LOC'], ['all/VARIABLES/LOC'])
+
+        self.assertEqual('changed variables are overridden', reason)
+
+    def test_should_not_skip_host_when_deleted_variable_uncovers_overridden_variable(self):
+
+        reason = self.variable_impact_analyzer.get_reason_to_skip('berweb01', ['host/berweb01/VARIABLES/HTTP_PORT'], ['host/berweb01/VARIABLES/HTTP_PORT'])
+
+        self.assertEqual(None, reason)
+
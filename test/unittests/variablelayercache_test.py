@@ -0,0 +1,102 @@
+#   yadt-config-rpm-maker
+#   Copyright (C) 2011-2013 Immobilien Scout GmbH
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from config_rpm_maker.variablelayercache import VariableLayer, VariableLayerCache
+
+
+class VariableLayerTests(TestCase):
+
+    def setUp(self):
+        self.variable_layer = VariableLayer({'LOC': 'ber',
+                                             'DOMAIN': '@@@LOC@@@.example.com',
+                                             'GREETING': 'hello @@@HOST@@@',
+                                             'HOST': 'berweb'})
+
+    def test_should_resolve_values_which_do_not_depend_on_overridden_variables(self):
+
+        token_values, resolved_token_values = self.variable_layer.get_token_values(['HOST', 'REVISION'])
+
+        self.assertEqual({'LOC': u'ber', 'DOMAIN': u'ber.example.com'}, resolved_token_values)
+        self.assertEqual({'GREETING': 'hello @@@HOST@@@'}, token_values)
+
+    def test_should_not_return_overridden_variables(self):
+
+        token_values, resolved_token_values = self.variable_layer.get_token_values(['LOC', 'HOST'])
+
+        self.assertEqual({}, resolved_token_values)
+        self.assertEqual({'DOMAIN': '@@@LOC@@@.example.com', 'GREETING': 'hello @@@HOST@@@'}, token_values)
+
+    def test_should_resolve_values_only_once_for_the_same_overridden_variables(self):
+
+        _, first_resolved_token_values = self.variable_layer.get_token_values(['HOST', 'REVISION'])
+        _, second_resolved_token_values = self.variable_layer.get_token_values(['HOST', 'IP'])
+
+        self.assertTrue(first_resolved_token_values is second_resolved_token_values)
+
+    def test_should_leave_cycles_to_be_detected_for_the_host(self):
+
+        variable_layer = VariableLayer({'SPAM': '@@@EGGS@@@', 'EGGS': '@@@SPAM@@@'})
+
+        token_values, resolved_token_values = variable_layer.get_token_values([])
+
+        self.assertEqual({}, resolved_token_values)
+        self.assertEqual({'SPAM': '@@@EGGS@@@', 'EGGS': '@@@SPAM@@@'}, token_values)
+
+
+class VariableLayerCacheTests(TestCase):
+
+    def setUp(self):
+        self.variables_directory = mkdtemp(prefix='variable-layer-cache-test-')
+        self.variable_layer_cache = VariableLayerCache()
+
+    def tearDown(self):
+        rmtree(self.variables_directory)
+
+    def write_variable(self, name, value):
+        with open(join(self.variables_directory, name), 'w') as variable_file:
+            variable_file.write(value)
+
+    def test_should_read_layer_from_variables_directory(self):
+
+        self.write_variable('LOC', 'ber\n')
+
+        actual_layer = self.variable_layer_cache.get(['all', 'typ/web'], self.variables_directory)
+
+        self.assertEqual({'LOC': 'ber'}, actual_layer.token_values)
+
+    def test_should_read_layer_only_once_for_the_same_svn_paths(self):
+
+        self.write_variable('LOC', 'ber')
+        first_layer = self.variable_layer_cache.get(['all', 'typ/web'], self.variables_directory)
+        self.write_variable('LOC', 'ham')
+
+        second_layer = self.variable_layer_cache.get(['all', 'typ/web'], self.variables_directory)
+
+        self.assertTrue(first_layer is second_layer)
+        self.assertEqual(1, self.variable_layer_cache.count_of_reads)
+        self.assertEqual(2, self.variable_layer_cache.count_of_lookups)
+
+    def test_should_return_empty_layer_when_no_variables_have_been_overlaid(self):
+
+        actual_layer = self.variable_layer_cache.get(['all'], join(self.variables_directory, 'VARIABLES'))
+
+        self.assertEqual({}, actual_layer.token_values)